@@ -0,0 +1,256 @@
+# pylint: disable=C0103
+import json
+import os
+import platform
+import random
+import time
+from typing import Any, Callable, Dict, List, Union
+
+from Character import Assault, Health, Magic
+from Engine import STRENGTHS, Engine, Strategy
+from Leaderboard import Leaderboard, ListStore
+
+
+RESULTS_PATH = "benchmarks/latest.json"
+BASELINE_PATH = "benchmarks/baseline.json"
+LEADERBOARD_SIZES = [10**3, 10**4, 10**5, 10**6]
+
+Results = Dict[str, Dict[str, Any]]
+
+
+def measure(function: Callable[[int], Union[float, None]],
+            operations: int,
+            repeat: int = 5) -> Dict[str, float]:
+    """Times a function which performs a number of operations.
+
+    The function is called once to warm up and then timed several times, and
+    the fastest time is used, as slower runs are slowed by other processes
+    rather than by the code being measured.
+
+    Args:
+        function: The function to time. It is passed the number of
+        operations to perform, and may return the time they took if it
+        needs to leave its setup out of the timing.
+        operations: The number of operations per call.
+        repeat: The number of timed calls.
+
+    Returns:
+        The time per operation in seconds and the operations per second.
+    """
+    function(operations)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        elapsed = function(operations)
+        times.append(time.perf_counter() -
+                     start if elapsed is None else elapsed)
+    best = min(times) / operations
+    return {"seconds": best, "per_second": 1 / best if best else 0.0}
+
+
+def bench_attacks() -> Results:
+    """Measures Character.attack for every class and strength."""
+    results = {}
+    for character_class in (Assault, Health, Magic):
+        for strength in STRENGTHS:
+            character = character_class("Attacker", random.Random(1))
+            opponent = Health("Opponent", random.Random(2))
+
+            def attack(count: int,
+                       character=character,
+                       opponent=opponent,
+                       strength=strength) -> None:
+                for _ in range(count):
+                    character.health = opponent.health = 100
+                    opponent.damage_per_round = 0
+                    character.attack(opponent, strength)
+
+            results[f"attack/{character_class.__name__}/{strength}"] = \
+                measure(attack, 20000)
+    return results
+
+
+def bench_games() -> Results:
+    """Measures full games between random strategies in the engine."""
+    engine = Engine(random.Random(1))
+    strategy = Strategy()
+
+    def play(count: int) -> None:
+        for _ in range(count):
+            engine.play_game(strategy, strategy)
+
+    return {"engine/play_game": measure(play, 500)}
+
+
+def bench_leaderboard(sizes: List[int] = None) -> Results:
+    """Measures Leaderboard.new_entry and get_data on leaderboards of
+    several sizes, kept in a private in-memory database so the real
+    leaderboard is never touched."""
+    results = {}
+    for size in LEADERBOARD_SIZES if sizes is None else sizes:
+        leaderboard = Leaderboard(f"benchmark-{size}", ListStore({}))
+        leaderboard.store.add(leaderboard.collection,
+                              {f"Player {x}": 1 + x % 50
+                               for x in range(size)})
+        rng = random.Random(size)
+
+        def new_entry(count: int, leaderboard=leaderboard, rng=rng,
+                      size=size) -> None:
+            for _ in range(count):
+                leaderboard.new_entry(f"Player {rng.randrange(size)}")
+
+        def get_data(count: int, leaderboard=leaderboard) -> None:
+            for _ in range(count):
+                leaderboard.get_data()
+
+        results[f"leaderboard/new_entry/{size}"] = measure(new_entry, 2000)
+        results[f"leaderboard/get_data/{size}"] = measure(get_data, 1000)
+    return results
+
+
+def bench_gui() -> Results:
+    """Measures Driver.render_main_game and clear_display, with a private
+    in-memory leaderboard. Needs a display, such as a virtual one from
+    xvfb-run, and is skipped without one."""
+    try:
+        # pylint: disable=C0415
+        from Driver import Driver
+        from Player import Player
+        driver = Driver(True,
+                        leaderboard=Leaderboard("benchmark-gui",
+                                                ListStore({})))
+    except Exception as error:  # pylint: disable=W0703
+        return {"gui": {"skipped": f"{type(error).__name__}: {error}"}}
+    game = driver.game
+    game.set_players(Player("Player 1"), Player("Player 2"))
+    game.coin_toss("Heads")
+    game.choose_character(game.get_current_player(), "Assault", "")
+    game.swap_player()
+    game.choose_character(game.get_current_player(), "Health", "")
+
+    def render(count: int) -> float:
+        elapsed = 0.0
+        for _ in range(count):
+            start = time.perf_counter()
+            driver.render_main_game()
+            driver.app.update()
+            elapsed += time.perf_counter() - start
+            driver.clear_display()
+        return elapsed
+
+    def clear(count: int) -> float:
+        elapsed = 0.0
+        for _ in range(count):
+            driver.render_main_game()
+            driver.app.update()
+            start = time.perf_counter()
+            driver.clear_display()
+            driver.app.update()
+            elapsed += time.perf_counter() - start
+        return elapsed
+
+    results = {
+        "gui/render_main_game": measure(render, 20),
+        "gui/clear_display": measure(clear, 20)
+    }
+    driver.app.destroy()
+    return results
+
+
+def run(leaderboard_sizes: List[int] = None) -> Dict[str, Any]:
+    """Runs every benchmark.
+
+    Args:
+        leaderboard_sizes: The numbers of entries to measure the leaderboard
+        at.
+
+    Returns:
+        The results of every benchmark by name, with details of the machine
+        they were run on.
+    """
+    results = {}
+    results.update(bench_attacks())
+    results.update(bench_games())
+    results.update(bench_leaderboard(leaderboard_sizes))
+    results.update(bench_gui())
+    return {
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor()
+        },
+        "time": time.time(),
+        "results": results
+    }
+
+
+def save(data: Dict[str, Any], path: str) -> None:
+    """Writes benchmark results to a JSON file.
+
+    Args:
+        data: The results.
+        path: The path of the file, whose directory is created if needed.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(data, file, indent=2, sort_keys=True)
+
+
+def compare(data: Dict[str, Any],
+            baseline: Dict[str, Any],
+            tolerance: float = 0.2) -> List[str]:
+    """Compares benchmark results against a baseline.
+
+    Args:
+        data: The new results.
+        baseline: The baseline results.
+        tolerance: The fraction by which a benchmark may be slower than its
+        baseline before it counts as a regression.
+
+    Returns:
+        A description of each regression.
+    """
+    regressions = []
+    for name, result in sorted(data["results"].items()):
+        before = baseline["results"].get(name)
+        if before is None or "seconds" not in result or \
+                "seconds" not in before or not before["seconds"]:
+            continue
+        ratio = result["seconds"] / before["seconds"]
+        if ratio > 1 + tolerance:
+            regressions.append(f"{name}: {ratio:.2f}x slower than baseline")
+    return regressions
+
+
+def main(save_baseline: bool = False) -> int:
+    """Runs the benchmarks, prints and saves the results, and compares them
+    with the baseline.
+
+    Args:
+        save_baseline: Whether to save the results as the new baseline.
+
+    Returns:
+        1 if any benchmark regressed, otherwise 0.
+    """
+    data = run()
+    for name, result in sorted(data["results"].items()):
+        if "seconds" in result:
+            print(f"{name:40} {result['seconds'] * 1e6:12.2f} us "
+                  f"{result['per_second']:14.0f} /s")
+        else:
+            print(f"{name:40} skipped ({result['skipped']})")
+    save(data, RESULTS_PATH)
+    if save_baseline:
+        save(data, BASELINE_PATH)
+        print(f"Saved baseline to {BASELINE_PATH}")
+        return 0
+    if not os.path.exists(BASELINE_PATH):
+        print(f"No baseline at {BASELINE_PATH}")
+        return 0
+    with open(BASELINE_PATH, encoding="utf-8") as file:
+        regressions = compare(data, json.load(file))
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
@@ -1,7 +1,13 @@
 # pylint: disable=C0103
-from random import randint, uniform
+import random
 from typing import Tuple
 
+from Sampling import get_attack_table
+
+
+# Damage ticks added to the opponent of a Magic character by each attack.
+TICKS = {"con": 1, "bal": 2, "agg": 3}
+
 
 class Character():
     """A character in the game.
@@ -11,11 +17,18 @@ class Character():
     - each having its own strengths and weaknesses.
     """
 
-    def __init__(self, name: str, health: int, damage: int) -> None:
+    __slots__ = ("name", "health", "damage", "damage_per_round", "random")
+
+    def __init__(self,
+                 name: str,
+                 health: int,
+                 damage: int,
+                 rng: random.Random = None) -> None:
         self.name = name
         self.health = health
         self.damage = damage
         self.damage_per_round = 0
+        self.random = rng if rng is not None else random
 
     def get_name(self) -> str:
         """Gets the name of this character.
@@ -89,7 +102,7 @@ class Character():
         Returns:
             The amount of damage to deal to the opponent character.
         """
-        return round(self.damage * uniform(0.4, 0.6))
+        return round(self.damage * self.random.uniform(0.4, 0.6))
 
     def balanced_attack(self) -> int:
         """Generate the amount of damage to deal to the opponent character.
@@ -100,7 +113,7 @@ class Character():
         Returns:
             The amount of damage to deal to the opponent character.
         """
-        return round(self.damage * uniform(0.6, 0.8))
+        return round(self.damage * self.random.uniform(0.6, 0.8))
 
     def aggressive_attack(self) -> int:
         """Generate the amount of damage to deal to the opponent character.
@@ -111,25 +124,39 @@ class Character():
         Returns:
             The amount of damage to deal to the opponent character.
         """
-        return round(self.damage * uniform(0.8, 1))
+        return round(self.damage * self.random.uniform(0.8, 1))
 
     def attack(self, opponent, strength) -> Tuple[int, int]:
         """Calculates damage to deal to opponent and self. Then does the
         calculated damage.
 
+        The damage is drawn from the exact distribution of the rolls made
+        by the attack methods, using a precomputed alias table.
+
         Returns:
             A tuple where the first element is the damage done to the opponent
             and the  second element is the damage done to self.
         """
-        if strength == "agg":
-            damage_opponent = self.aggressive_attack()
-            damage_self = self.balanced_attack()
-        elif strength == "bal":
-            damage_opponent = self.balanced_attack()
-            damage_self = self.conservative_attack()
-        elif strength == "con":
-            damage_opponent = self.conservative_attack()
-            damage_self = 0
+        damage_opponent, damage_self = get_attack_table(
+            self.damage, strength).sample(self.random)
+        return self.resolve_attack(opponent, strength, damage_opponent,
+                                   damage_self)
+
+    def resolve_attack(self, opponent, strength,  # pylint: disable=W0613
+                       damage_opponent, damage_self) -> Tuple[int, int]:
+        """Does the damage of an attack whose damage is already known. Used
+        when replaying a game.
+
+        Args:
+            opponent: The character being attacked.
+            strength: The strength of the attack: "con", "bal" or "agg".
+            damage_opponent: The damage to do to the opponent.
+            damage_self: The damage to do to self.
+
+        Returns:
+            A tuple where the first element is the damage done to the opponent
+            and the second element is the damage done to self.
+        """
         opponent.take_damage(damage_opponent)
         self.take_damage(damage_self)
         return damage_opponent, damage_self
@@ -138,6 +165,8 @@ class Character():
 class Assault(Character):
     """Assault characters have do more damage each round."""
 
+    __slots__ = ()
+
     @staticmethod
     def describe() -> str:
         """Generates a description of this class.
@@ -147,13 +176,15 @@ class Assault(Character):
         """
         return "Assault Class: Does more damage... but that's about it really!"
 
-    def __init__(self, name: str) -> None:
-        super().__init__(name, 100, 30)
+    def __init__(self, name: str, rng: random.Random = None) -> None:
+        super().__init__(name, 100, 30, rng)
 
 
 class Health(Character):
     """Health characters regain some of their health points each round."""
 
+    __slots__ = ()
+
     @staticmethod
     def describe() -> str:
         """Generates a description of this class.
@@ -163,8 +194,8 @@ class Health(Character):
         """
         return "Health Class: Does average damage and heals over time."
 
-    def __init__(self, name: str) -> None:
-        super().__init__(name, 100, 20)
+    def __init__(self, name: str, rng: random.Random = None) -> None:
+        super().__init__(name, 100, 20, rng)
 
     def heal(self) -> int:
         """Regenerate some health.
@@ -172,7 +203,7 @@ class Health(Character):
         Returns:
             The number of health points regenerated.
         """
-        regen = randint(5, 10)
+        regen = self.random.randint(5, 10)
         self.health += regen
         return regen
 
@@ -180,6 +211,8 @@ class Health(Character):
 class Magic(Character):
     """Magic characters deal lasting damage each round."""
 
+    __slots__ = ()
+
     @staticmethod
     def describe() -> str:
         """Generates a description of this class.
@@ -189,8 +222,8 @@ class Magic(Character):
         """
         return "Magic class: Does little damage, but attacks cause lasting damage."  # pylint: disable=C0301
 
-    def __init__(self, name: str) -> None:
-        super().__init__(name, 100, 15)
+    def __init__(self, name: str, rng: random.Random = None) -> None:
+        super().__init__(name, 100, 15, rng)
 
     def attack(self, opponent, strength) -> Tuple[int, int]:
         """Calculates damage to deal to opponent and self. Then does the
@@ -200,19 +233,27 @@ class Magic(Character):
             A tuple where the first element is the damage done to the opponent
             and the second element is the damage done to self.
         """
-        damage_ticks = opponent.get_damage_ticks()
-        if strength == "agg":
-            damage_opponent = self.aggressive_attack() + damage_ticks
-            opponent.increment_damage_ticks(3)
-            damage_self = self.balanced_attack()
-        elif strength == "bal":
-            damage_opponent = self.balanced_attack() + damage_ticks
-            opponent.increment_damage_ticks(2)
-            damage_self = self.conservative_attack()
-        elif strength == "con":
-            damage_opponent = self.conservative_attack() + damage_ticks
-            opponent.increment_damage_ticks(1)
-            damage_self = 0
-        opponent.take_damage(damage_opponent)
-        self.take_damage(damage_self)
-        return damage_opponent, damage_self
+        damage_opponent, damage_self = get_attack_table(
+            self.damage, strength).sample(self.random)
+        return self.resolve_attack(
+            opponent, strength, damage_opponent + opponent.get_damage_ticks(),
+            damage_self)
+
+    def resolve_attack(self, opponent, strength, damage_opponent,
+                       damage_self) -> Tuple[int, int]:
+        """Does the damage of an attack whose damage is already known,
+        including the damage ticks, and adds to the opponent's damage ticks.
+
+        Args:
+            opponent: The character being attacked.
+            strength: The strength of the attack: "con", "bal" or "agg".
+            damage_opponent: The damage to do to the opponent.
+            damage_self: The damage to do to self.
+
+        Returns:
+            A tuple where the first element is the damage done to the opponent
+            and the second element is the damage done to self.
+        """
+        opponent.increment_damage_ticks(TICKS[strength])
+        return super().resolve_attack(opponent, strength, damage_opponent,
+                                      damage_self)
@@ -0,0 +1,97 @@
+# pylint: disable=C0103
+import random
+from typing import List, Union
+
+from Engine import Strategy
+from Game import Game
+from Player import Player
+from Search import MonteCarloSearch
+from Solver import PolicyTable
+
+
+POLICY_PATH = "solver/policy.bin"
+
+Policy = Union[PolicyTable, MonteCarloSearch]
+
+
+def choose_best_character(policy: Policy, available: List[str],
+                          opponent: str = None) -> str:
+    """Chooses the character class with the best expected score.
+
+    Args:
+        policy: The policy to look up expected scores in.
+        available: The names of the available character classes.
+        opponent: The name of the opponent's character class, if they have
+        already chosen one.
+
+    Returns:
+        The name of the chosen character class. If the opponent has not
+        chosen yet, this is the class whose worst matchup is best.
+    """
+    if opponent is not None:
+        return max(available, key=lambda x: policy.get_value(x, opponent))
+    return max(available,
+               key=lambda x: min((policy.get_value(x, y)
+                                  for y in available if y != x),
+                                 default=0.5))
+
+
+class ComputerPlayer(Player):
+    """A player controlled by the computer.
+
+    By default, every attack is chosen with a single lookup in a policy
+    table, which holds the best attack strength in every battle state. A
+    Monte Carlo tree search can be used as the policy instead.
+    """
+
+    __slots__ = ("policy", )
+
+    def __init__(self,
+                 name: str = "Computer",
+                 policy: Policy = None,
+                 rng: random.Random = None) -> None:
+        super().__init__(name, rng)
+        self.policy = policy if policy is not None else \
+            PolicyTable.load_or_solve(POLICY_PATH)
+
+    def choose_character_class(self, opponent: Player,
+                               available: List[str]) -> str:
+        """Chooses the best of the available character classes.
+
+        Args:
+            opponent: The opposing player.
+            available: The names of the available character classes.
+
+        Returns:
+            The name of the chosen character class.
+        """
+        character = opponent.get_character()
+        return choose_best_character(
+            self.policy, available,
+            type(character).__name__ if character is not None else None)
+
+    def choose_attack(self, opponent: Player) -> str:
+        """Chooses the best attack strength against the opponent.
+
+        Args:
+            opponent: The opposing player.
+
+        Returns:
+            The strength of the attack: "con", "bal" or "agg".
+        """
+        return self.policy.choose(self.character, opponent.get_character())
+
+
+class PolicyStrategy(Strategy):
+    """A headless strategy which plays using a policy table or search."""
+
+    def __init__(self, policy: Policy) -> None:
+        self.policy = policy
+
+    def choose_character(self, available: List[str], rng) -> str:
+        return choose_best_character(self.policy, available)
+
+    def choose_attack(self, game: Game, rng) -> str:
+        return self.policy.choose(
+            game.get_current_player().get_character(),
+            game.get_opponent_player().get_character())
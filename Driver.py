@@ -2,10 +2,38 @@
 from guizero import App, Box, Picture, Text, TextBox
 
 from Character import Assault, Health, Magic
+from Computer import POLICY_PATH, ComputerPlayer
 from Game import Game
 from Leaderboard import Leaderboard
+from Metrics import Metrics, count_widgets
 from Player import Player
-from Widgets import Aligner, HoverablePushButton, Padding
+from Replay import ReplayWriter
+from Search import MonteCarloSearch
+from Solver import PolicyTable
+from Tracer import Tracer
+from Widgets import Aligner, HoverablePushButton, ImageCache, Padding
+
+
+TEXTURE = "assets/texture.png"
+
+# Methods timed when metrics are being collected
+HANDLERS = [
+    "do_player_creation", "do_coin_toss", "do_character_choice", "do_attack",
+    "handle_end_game"
+]
+RENDERS = [
+    "render_sign_up", "render_coin_toss", "render_after_coin_toss",
+    "render_character_choice", "render_main_game", "render_leaderboard"
+]
+LEADERBOARD_CALLS = [
+    "new_entry", "record_game", "get_data", "get_rank", "get_page",
+    "get_around"
+]
+# Further methods traced when a trace is being recorded
+TRACED_HANDLERS = HANDLERS + [
+    "handle_character_choice", "handle_computer_turn"
+]
+TRACED_RENDERS = RENDERS + ["clear_display", "update_main_game"]
 
 
 class Driver():
@@ -13,21 +41,85 @@ class Driver():
 
     Controls the GUI components and overall flow of the game.
     """
-    def __init__(self, under_test: bool = False) -> None:
-        # Create Game and Leaderboard controllers
+    def __init__(self,
+                 under_test: bool = False,
+                 computer_opponent: bool = False,
+                 search_budget: float = None,
+                 replay_path: str = None,
+                 *,
+                 metrics: Metrics = None,
+                 tracer: Tracer = None,
+                 leaderboard: Leaderboard = None) -> None:
+        # Create Game and Leaderboard controllers, keeping the leaderboard
+        # and its ratings from the previous game when starting a new one
         self.game = Game()
-        self.leaderboard = Leaderboard()
+        self.leaderboard = leaderboard if leaderboard is not None else \
+            Leaderboard()
+
+        # Remove the wrappers from the previous game when starting a new one
+        for name in TRACED_HANDLERS + TRACED_RENDERS:
+            vars(self).pop(name, None)
+        for name in LEADERBOARD_CALLS:
+            vars(self.leaderboard).pop(name, None)
+
+        # Time event handlers, renders and leaderboard calls if metrics are
+        # being collected. Nothing is wrapped otherwise.
+        self.metrics = metrics
+        if metrics is not None:
+            metrics.instrument(self, HANDLERS)
+            metrics.instrument(
+                self, RENDERS, after=lambda: metrics.set_gauge(
+                    "widgets", count_widgets(self.app)))
+            metrics.instrument(self.leaderboard, LEADERBOARD_CALLS)
+
+        # Trace the same calls, and a few more, if a trace is being recorded
+        self.tracer = tracer
+        if tracer is not None:
+            tracer.instrument(self, TRACED_HANDLERS, "action")
+            tracer.instrument(self, TRACED_RENDERS, "render")
+            tracer.instrument(self.leaderboard, LEADERBOARD_CALLS,
+                              "leaderboard")
+
+        # Record the game to a replay file if one is given
+        self.replay_path = replay_path
+        self.recorder = ReplayWriter(replay_path) if replay_path else None
+
+        # Load the computer's policy for single player games, searching for
+        # each attack if a time budget is given
+        self.computer_opponent = computer_opponent
+        self.search_budget = search_budget
+        self.policy = None
+        if search_budget is not None:
+            self.policy = MonteCarloSearch(search_budget)
+        elif computer_opponent:
+            self.policy = PolicyTable.load_or_solve(POLICY_PATH)
 
         # Create app widget
         self.app = App(title="Battle Game", bg="#333333")
+        ImageCache.preload(self.app, [TEXTURE])
 
         # Render sign up content
         self.render_sign_up()
 
         # Start GUI
+        self.under_test = under_test
         if not under_test:
             self.app.display()
 
+    def after(self, widget, time: int, name: str, function) -> None:
+        """Calls a function once after a delay, tracing the call if a trace
+        is being recorded.
+
+        Args:
+            widget: The widget to schedule the call on.
+            time: The delay in milliseconds.
+            name: The name to trace the call under.
+            function: The function to call.
+        """
+        if self.tracer is not None:
+            function = self.tracer.defer(name, time, function)
+        widget.after(time, function)
+
     def clear_display(self) -> None:
         """Destroys all child widgets in the app."""
         while len(self.app.children) > 0:
@@ -48,7 +140,8 @@ class Driver():
         Text(container, "Player 1 Name:")
         player_1_name = TextBox(container, width=30)
         Padding(container, 20)
-        Text(container, "Player 2 Name:")
+        Text(container, "Computer Name:"
+             if self.computer_opponent else "Player 2 Name:")
         player_2_name = TextBox(container, width=30)
         Padding(container, 20)
         HoverablePushButton(
@@ -99,14 +192,14 @@ class Driver():
         player_name = self.game.get_current_player().get_name()
         # Create GUI widgets
         Padding(container,
-                40 + (3 - len(Player.get_available_characters())) * 40)
+                40 + (3 - len(self.game.get_available_characters())) * 40)
         Text(container, text=player_name, size=24)
         Padding(container, 20)
         Text(container, text="Name Your Character:")
         character_name = TextBox(container, width=30)
         Padding(container, 20)
         Text(container, text="Choose Character Class:")
-        if Assault in Player.get_available_characters():
+        if self.game.is_character_available("Assault"):
             HoverablePushButton(container,
                                 40,
                                 text="Assault Class",
@@ -114,7 +207,7 @@ class Driver():
                                     "Assault", character_name.value))
             Text(container, text=Assault.describe().split(": ")[1], size=10)
             Padding(container, 20)
-        if Health in Player.get_available_characters():
+        if self.game.is_character_available("Health"):
             HoverablePushButton(container,
                                 40,
                                 text="Health Class",
@@ -122,7 +215,7 @@ class Driver():
                                     "Health", character_name.value))
             Text(container, text=Health.describe().split(": ")[1], size=10)
             Padding(container, 20)
-        if Magic in Player.get_available_characters():
+        if self.game.is_character_available("Magic"):
             HoverablePushButton(container,
                                 40,
                                 text="Magic Class",
@@ -155,10 +248,11 @@ class Driver():
         Padding(container, 30, grid=[0, 2, 3, 1])
         Text(container, text=player_1_header, grid=[0, 3])
         Text(container, text=player_2_header, grid=[2, 3])
-        Text(container, text=player_1_hp, grid=[0, 4])
-        Text(container, text=player_2_hp, grid=[2, 4])
-        Picture(container, image="assets/texture.png", grid=[0, 5])
-        Picture(container, image="assets/texture.png", grid=[2, 5])
+        self.player_1_hp = Text(container, text=player_1_hp, grid=[0, 4])
+        self.player_2_hp = Text(container, text=player_2_hp, grid=[2, 4])
+        texture = ImageCache.get(self.app, TEXTURE)
+        Picture(container, image=texture, grid=[0, 5])
+        Picture(container, image=texture, grid=[2, 5])
         Padding(container, 30, grid=[0, 6, 3, 1])
         self.con_attack = HoverablePushButton(container,
                                               11,
@@ -186,6 +280,17 @@ class Driver():
         Box(container, width=150, height=1, grid=[1, 10])
         Box(container, width=150, height=1, grid=[2, 10])
 
+    def update_main_game(self, info: str) -> None:
+        """Updates the text on the main game screen in place after an
+        attack, without rebuilding any widgets."""
+        character_1 = self.game.get_player_1().get_character()
+        character_2 = self.game.get_player_2().get_character()
+        header = f"{self.game.get_current_player().get_name()}'s Turn"
+        self.main_header.value = header
+        self.player_1_hp.value = f"{character_1.get_health()} HP"
+        self.player_2_hp.value = f"{character_2.get_health()} HP"
+        self.sub_text.value = info
+
     def render_leaderboard(self) -> None:
         """Renders the leaderboard screen."""
         # Create container widget
@@ -202,18 +307,42 @@ class Driver():
         HoverablePushButton(container, 20, "New Game", self.handle_new_game)
 
         # Populate leaderboard
-        for index, row in enumerate(self.leaderboard.get_data()):
+        rows = self.leaderboard.get_data()
+        for index, row in enumerate(rows):
             Text(leaderboard_text, text=row[0], width=10, grid=[0, index])
             Text(leaderboard_text, text=row[1], width=10, grid=[1, index])
 
+        # Show the winner's position if they are not in the top five
+        winner = self.game.get_game_winner() if self.game.is_game_over() \
+            else None
+        if winner is not None and winner.get_name() not in [
+                row[0] for row in rows
+        ] and self.leaderboard.get_rank(winner.get_name()) is not None:
+            rank = self.leaderboard.get_rank(winner.get_name())
+            row = self.leaderboard.get_around(winner.get_name(), 0)[0]
+            Text(leaderboard_text,
+                 text=f"#{rank} {row[0]}",
+                 width=10,
+                 grid=[0, len(rows)])
+            Text(leaderboard_text, text=row[1], width=10, grid=[1, len(rows)])
+
     def do_player_creation(self, player_1, player_2) -> None:
         """Handles button presses on sign up screen."""
         # If a player didn't choose a name, set a default
         player_1 = "Player 1" if player_1 == "" else player_1
-        player_2 = "Player 2" if player_2 == "" else player_2
+        if player_2 == "":
+            player_2 = "Computer" if self.computer_opponent else "Player 2"
 
         # Assign players to the game
-        self.game.set_players(Player(player_1), Player(player_2))
+        if self.computer_opponent:
+            self.game.set_players(Player(player_1),
+                                  ComputerPlayer(player_2, self.policy))
+        else:
+            self.game.set_players(Player(player_1), Player(player_2))
+        # Games in the GUI share one random number generator, so no seed is
+        # recorded; every outcome is in the replay instead
+        if self.recorder:
+            self.recorder.start_game(player_1, player_2, game=self.game)
 
         # Change GUI
         self.clear_display()
@@ -223,6 +352,8 @@ class Driver():
         """Handles button presses on coin toss screen."""
         # Do coin flip
         outcome = self.game.coin_toss(choice)
+        if self.recorder:
+            self.recorder.coin_toss(choice, outcome)
 
         # Change GUI
         self.clear_display()
@@ -233,10 +364,10 @@ class Driver():
         self.after_coin_toss.value = text
 
         # Change GUI after 3 seconds
-        self.after_coin_toss.after(
-            3000,
+        self.after(
+            self.after_coin_toss, 3000, "Driver.after.character_choice",
             lambda: [self.clear_display(),
-                     self.render_character_choice()])
+                     self.handle_character_choice()])
 
     def do_character_choice(self, choice, name) -> None:
         """Handles button presses on character selection screen."""
@@ -248,7 +379,11 @@ class Driver():
         name = choice if name == "" else name
 
         # Make character selection in game engine
-        self.game.get_current_player().choose_character(choice, name)
+        player = self.game.get_current_player()
+        if self.game.choose_character(player, choice,
+                                      name) and self.recorder:
+            self.recorder.choose_character(
+                0 if player is self.game.get_player_1() else 1, choice, name)
 
         # Change to next player turn
         self.game.swap_player()
@@ -256,9 +391,10 @@ class Driver():
         # Change GUI
         self.clear_display()
         if self.game.get_current_player().get_character() is None:
-            self.render_character_choice()
+            self.handle_character_choice()
         else:
             self.render_main_game()
+            self.handle_computer_turn()
 
     def do_attack(self, strength) -> None:
         """Handles button presses during gameplay."""
@@ -266,6 +402,8 @@ class Driver():
         damage_opponent, damage_self = self.game.get_current_player(
         ).get_character().attack(
             self.game.get_opponent_player().get_character(), strength)
+        if self.recorder:
+            self.recorder.attack(strength, damage_opponent, damage_self)
         # Update subtext
         player_name = self.game.get_current_player().get_character().get_name()
         info = f"{player_name} dealt {damage_opponent}"
@@ -275,11 +413,14 @@ class Driver():
             info += "."
         # Change to next player turn
         self.game.swap_player()
-        # Regenerate GUI
-        self.clear_display()
-        self.render_main_game()
-        self.sub_text.value = info
+        # Update GUI
+        self.update_main_game(info)
+        round_over = self.game.is_round_over()
         self.handle_end_game()
+        if self.recorder:
+            self.recorder.checkpoint()
+        if not round_over:
+            self.handle_computer_turn()
 
     def handle_end_game(self) -> None:
         """Handles actions when a character dies during gameplay."""
@@ -289,43 +430,73 @@ class Driver():
             self.bal_attack.disable()
             self.agg_attack.disable()
 
-            # Determine winner of game
-            player_1 = self.game.get_player_1()
-            player_2 = self.game.get_player_2()
-            if player_1.get_character().is_dead(
-            ) and self.game.get_player_2().get_character().is_dead():
+            # Determine winner of round
+            winner = self.game.resolve_round()
+            draw = winner is None
+            if draw:
                 self.main_header.value = "It's a Draw."
-                draw = True
-            elif self.game.get_player_2().get_character().is_dead():
-                self.main_header.value = f"{player_1.get_name()} Wins!"
-                self.game.register_round_winner(player_1)
-                draw = False
-            elif self.game.get_player_1().get_character().is_dead():
-                self.main_header.value = f"{player_2} Wins!"
-                self.game.register_round_winner(player_2)
-                draw = False
+            else:
+                self.main_header.value = f"{winner.get_name()} Wins!"
 
             # Detect end of game
             if self.game.is_game_over():
-                # Add winner to leaderboard
-                self.leaderboard.new_entry(
-                    self.game.get_game_winner().get_name())
+                if self.recorder:
+                    self.recorder.end_game()
+                # Add winner to leaderboard and rate both players
+                self.leaderboard.record_game(self.game)
                 # Change GUI
-                self.main_header.after(
-                    3000,
+                self.after(
+                    self.main_header, 3000, "Driver.after.leaderboard",
                     lambda: [self.clear_display(),
                              self.render_leaderboard()])
             else:
                 # Change round
                 self.game.next_round(draw)
                 # Change GUI
-                self.main_header.after(
-                    3000,
-                    lambda: [self.clear_display(),
-                             self.render_main_game()])
+                self.after(
+                    self.main_header, 3000, "Driver.after.next_round",
+                    lambda: [
+                        self.clear_display(),
+                        self.render_main_game(),
+                        self.handle_computer_turn()
+                    ])
+
+    def handle_character_choice(self) -> None:
+        """Shows the character selection screen, or makes the choice straight
+        away if it is the computer's turn to choose."""
+        player = self.game.get_current_player()
+        if isinstance(player, ComputerPlayer):
+            self.do_character_choice(
+                player.choose_character_class(
+                    self.game.get_opponent_player(),
+                    list(self.game.characters)), "")
+        else:
+            self.render_character_choice()
+
+    def handle_computer_turn(self) -> None:
+        """Makes the computer's attack after a short pause if it is the
+        computer's turn, otherwise lets the player attack."""
+        player = self.game.get_current_player()
+        buttons = [self.con_attack, self.bal_attack, self.agg_attack]
+        if isinstance(player, ComputerPlayer):
+            for button in buttons:
+                button.disable()
+            strength = player.choose_attack(self.game.get_opponent_player())
+            self.after(self.main_header, 1000, "Driver.after.computer_attack",
+                       lambda: self.do_attack(strength))
+        else:
+            for button in buttons:
+                button.enable()
 
     def handle_new_game(self) -> None:
         """Handles new game button presses on leaderboard screen."""
         self.app.destroy()
-        Player.reset_available_characters()
-        self.__init__()
+        if self.recorder:
+            self.recorder.close()
+        self.__init__(under_test=self.under_test,
+                      computer_opponent=self.computer_opponent,
+                      search_budget=self.search_budget,
+                      replay_path=self.replay_path,
+                      metrics=self.metrics,
+                      tracer=self.tracer,
+                      leaderboard=self.leaderboard)
@@ -0,0 +1,210 @@
+# pylint: disable=C0103
+import random
+from typing import Dict, List
+
+from Game import Game
+from Player import Player
+from Replay import ReplayWriter
+
+
+STRENGTHS = ["con", "bal", "agg"]
+
+
+class Strategy():
+    """Decides the moves made by one side of a headless game.
+
+    The base strategy makes every choice uniformly at random. Subclasses
+    override the choices they care about.
+    """
+
+    def choose_coin(self, rng) -> str:
+        """Chooses a side of the coin for the coin toss.
+
+        Args:
+            rng: The random number generator to use.
+
+        Returns:
+            The choice: "Heads" or "Tails".
+        """
+        return rng.choice(["Heads", "Tails"])
+
+    def choose_character(self, available: List[str], rng) -> str:
+        """Chooses a character class from the ones still available.
+
+        Args:
+            available: The names of the available character classes.
+            rng: The random number generator to use.
+
+        Returns:
+            The name of the chosen character class.
+        """
+        return rng.choice(available)
+
+    def choose_attack(self, game: Game, rng) -> str:  # pylint: disable=W0613
+        """Chooses the strength of the next attack.
+
+        Args:
+            game: The game being played. It is this strategy's turn.
+            rng: The random number generator to use.
+
+        Returns:
+            The strength of the attack: "con", "bal" or "agg".
+        """
+        return rng.choice(STRENGTHS)
+
+
+class FixedStrategy(Strategy):
+    """A strategy which always makes the same attack, and optionally always
+    picks the same character class."""
+
+    def __init__(self, strength: str, character: str = None) -> None:
+        self.strength = strength
+        self.character = character
+
+    def choose_character(self, available: List[str], rng) -> str:
+        if self.character in available:
+            return self.character
+        return super().choose_character(available, rng)
+
+    def choose_attack(self, game: Game, rng) -> str:
+        return self.strength
+
+
+class Engine():
+    """A headless game engine.
+
+    Plays complete games from the coin toss to the final round without any
+    GUI, so that large numbers of games can be simulated quickly. Games can
+    optionally be recorded to a replay file.
+
+    If the engine is given a seed, each game is played with a random number
+    generator seeded from it and the number of the game, and that seed is
+    recorded with the game, so any recorded game can be played again on its
+    own.
+    """
+
+    def __init__(self,
+                 rng: random.Random = None,
+                 recorder: ReplayWriter = None,
+                 seed: str = None) -> None:
+        if rng is None:
+            rng = random if seed is None else random.Random()
+        self.random = rng
+        self.recorder = recorder
+        self.seed = seed
+        self.games = 0
+
+    def get_game_seed(self) -> str:
+        """Reseeds the random number generator for the next game, if the
+        engine has a seed.
+
+        Returns:
+            The seed of the next game, or an empty string if it is not known.
+        """
+        if self.seed is None:
+            return ""
+        seed = f"{self.seed}:{self.games}"
+        self.games += 1
+        self.random.seed(seed)
+        return seed
+
+    def play_game(self,
+                  strategy_1: Strategy,
+                  strategy_2: Strategy,
+                  player_1: str = "Player 1",
+                  player_2: str = "Player 2") -> Game:
+        """Plays one complete game.
+
+        Args:
+            strategy_1: The strategy used by player 1.
+            strategy_2: The strategy used by player 2.
+            player_1: The name of player 1.
+            player_2: The name of player 2.
+
+        Returns:
+            The finished game.
+        """
+        seed = self.get_game_seed()
+        game = Game(self.random)
+        game.set_players(Player(player_1, self.random),
+                         Player(player_2, self.random))
+        strategies = {
+            game.get_player_1(): strategy_1,
+            game.get_player_2(): strategy_2
+        }
+
+        recorder = self.recorder
+        if recorder:
+            recorder.start_game(player_1, player_2, seed, game)
+
+        # Decide the playing order
+        choice = strategy_1.choose_coin(self.random)
+        outcome = game.coin_toss(choice)
+        if recorder:
+            recorder.coin_toss(choice, outcome)
+
+        # Each player picks a character in turn
+        self.choose_characters(game, strategies)
+
+        # Battle until the final round is over
+        while True:
+            if recorder:
+                recorder.checkpoint()
+            attacker = game.get_current_player()
+            strength = strategies[attacker].choose_attack(game, self.random)
+            damage = attacker.get_character().attack(
+                game.get_opponent_player().get_character(), strength)
+            if recorder:
+                recorder.attack(strength, *damage)
+            game.swap_player()
+            if game.is_round_over():
+                winner = game.resolve_round()
+                if game.is_game_over():
+                    if recorder:
+                        recorder.end_game()
+                    return game
+                game.next_round(winner is None)
+
+    def choose_characters(self, game: Game,
+                          strategies: Dict[Player, Strategy]) -> None:
+        """Lets each player pick a character in turn, starting with the
+        player who won the coin toss.
+
+        Args:
+            game: The game being played.
+            strategies: The strategy used by each player.
+        """
+        for _ in range(2):
+            player = game.get_current_player()
+            choice = strategies[player].choose_character(
+                list(game.characters), self.random)
+            game.choose_character(player, choice, choice)
+            if self.recorder:
+                self.recorder.choose_character(
+                    0 if player is game.get_player_1() else 1, choice, choice)
+            game.swap_player()
+
+    def run(self, strategy_1: Strategy, strategy_2: Strategy,
+            games: int) -> List[int]:
+        """Plays a number of games between two strategies.
+
+        Args:
+            strategy_1: The strategy used by player 1.
+            strategy_2: The strategy used by player 2.
+            games: The number of games to play.
+
+        Returns:
+            A list of the number of games won by player 1, the number of
+            games won by player 2 and the number of drawn games.
+        """
+        results = [0, 0, 0]
+        for _ in range(games):
+            game = self.play_game(strategy_1, strategy_2)
+            winner = game.get_game_winner()
+            if winner is game.get_player_1():
+                results[0] += 1
+            elif winner is game.get_player_2():
+                results[1] += 1
+            else:
+                results[2] += 1
+        return results
@@ -0,0 +1,105 @@
+# pylint: disable=C0103
+from typing import List
+
+
+class FenwickTree():
+    """Counts of items at a fixed range of integer positions, supporting
+    updates, prefix sums and finding the k-th item in O(log n) each.
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.tree: List[int] = [0] * (size + 1)
+        self.total = 0
+        # The highest power of two no greater than the size, for find
+        self.top = 1 << (size.bit_length() - 1) if size > 0 else 0
+
+    def resize(self, size: int) -> None:
+        """Changes the number of positions, keeping the counts at the
+        positions which remain.
+
+        Args:
+            size: The new number of positions.
+        """
+        counts = [
+            self.prefix_sum(index) - self.prefix_sum(index - 1)
+            for index in range(min(size, self.size))
+        ]
+        self.size = size
+        self.tree = [0] * (size + 1)
+        self.total = 0
+        self.top = 1 << (size.bit_length() - 1) if size > 0 else 0
+        for index, count in enumerate(counts):
+            if count:
+                self.add(index, count)
+
+    def add(self, index: int, delta: int = 1) -> None:
+        """Changes the count at a position.
+
+        Args:
+            index: The position, from 0 to size - 1.
+            delta: The amount to add to the count.
+        """
+        self.total += delta
+        index += 1
+        while index <= self.size:
+            self.tree[index] += delta
+            index += index & -index
+
+    def prefix_sum(self, index: int) -> int:
+        """Sums the counts at all positions up to and including one.
+
+        Args:
+            index: The last position to include, or -1 for none.
+
+        Returns:
+            The sum of the counts.
+        """
+        total = 0
+        index = min(index, self.size - 1) + 1
+        while index > 0:
+            total += self.tree[index]
+            index -= index & -index
+        return total
+
+    def find(self, k: int) -> int:
+        """Finds the position of the k-th item, counting from 0 in order of
+        position.
+
+        Args:
+            k: The number of items before the one to find.
+
+        Returns:
+            The position of the item, or size if there are not enough items.
+        """
+        index = 0
+        step = self.top
+        while step > 0:
+            if index + step <= self.size and self.tree[index + step] <= k:
+                index += step
+                k -= self.tree[index]
+            step >>= 1
+        return index
+
+    def get_previous(self, index: int) -> int:
+        """Finds the nearest position at or before one with a count.
+
+        Args:
+            index: The position to search from.
+
+        Returns:
+            The position, or -1 if there is none.
+        """
+        count = self.prefix_sum(index)
+        return self.find(count - 1) if count > 0 else -1
+
+    def get_next(self, index: int) -> int:
+        """Finds the nearest position at or after one with a count.
+
+        Args:
+            index: The position to search from.
+
+        Returns:
+            The position, or size if there is none.
+        """
+        return self.find(self.prefix_sum(index - 1))
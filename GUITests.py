@@ -1,10 +1,21 @@
+import json
+import os
+import shutil
+import tempfile
 import unittest
+from unittest import mock
 
-from guizero import Box, Picture, PushButton, Text, TextBox
+from guizero import App, Box, Picture, PushButton, Text, TextBox
 
-from Driver import Driver
+from Character import Assault, Health
+from Computer import ComputerPlayer
+from Driver import Driver, TEXTURE
+from Leaderboard import Leaderboard, ListStore
+from Metrics import Metrics
 from Player import Player
-from Widgets import Aligner, HoverablePushButton, Padding
+from Solver import PolicySolver, PolicyTable
+from Tracer import Tracer
+from Widgets import Aligner, HoverablePushButton, ImageCache, Padding
 
 
 # pylama:ignore=C0116
@@ -13,10 +24,11 @@ class DriverTest(unittest.TestCase):
         self.driver = Driver(True)
         self.driver.game.set_players(Player("Player 1"), Player("Player 2"))
         self.driver.game.coin_toss("Heads")
-        self.driver.game.get_current_player().choose_character("Assault", "")
+        self.driver.game.choose_character(
+            self.driver.game.get_current_player(), "Assault", "")
         self.driver.game.swap_player()
-        self.driver.game.get_current_player().choose_character("Health", "")
-        Player.reset_available_characters()
+        self.driver.game.choose_character(
+            self.driver.game.get_current_player(), "Health", "")
         self.app = self.driver.app
         self.driver.clear_display()
 
@@ -76,6 +88,7 @@ class DriverTest(unittest.TestCase):
         self.assertTrue(isinstance(elements[1], Text))
 
     def test_render_character_choice(self):
+        self.driver.game.reset_available_characters()
         self.driver.render_character_choice()
         self.assertTrue(len(self.app.children) == 3)
         self.assertTrue(isinstance(self.app.children[0], Box))
@@ -129,6 +142,36 @@ class DriverTest(unittest.TestCase):
         self.assertTrue(isinstance(elements[16], Box))
         self.assertTrue(isinstance(elements[17], Box))
 
+    def test_update_main_game(self):
+        self.driver.render_main_game()
+        widgets = list(self.app.children[2].children)
+        self.driver.do_attack("con")
+        self.assertEqual(self.app.children[2].children, widgets)
+        self.assertTrue(self.driver.sub_text.value.endswith(" dealt " + str(
+            100 - self.driver.game.get_current_player().get_character(
+            ).get_health()) + "."))
+        self.assertEqual(
+            self.driver.main_header.value,
+            f"{self.driver.game.get_current_player().get_name()}'s Turn")
+
+    def test_computer_turn(self):
+        solver = PolicySolver(Assault, Health)
+        solver.solve()
+        policy = PolicyTable()
+        policy.add_solver(solver)
+        game = self.driver.game
+        computer = ComputerPlayer("Computer", policy)
+        computer.character = game.get_current_player().get_character()
+        game.order[game.current_player] = computer
+        self.driver.render_main_game()
+        self.driver.handle_computer_turn()
+        self.assertFalse(self.driver.con_attack.widget.enabled)
+        self.assertFalse(self.driver.bal_attack.widget.enabled)
+        self.assertFalse(self.driver.agg_attack.widget.enabled)
+        game.swap_player()
+        self.driver.handle_computer_turn()
+        self.assertTrue(self.driver.con_attack.widget.enabled)
+
     def test_render_leaderboard(self):
         self.driver.render_leaderboard()
         self.assertTrue(len(self.app.children) == 3)
@@ -145,6 +188,97 @@ class DriverTest(unittest.TestCase):
         self.assertTrue(isinstance(elements[4], Box))
         self.assertTrue(isinstance(elements[5], PushButton))
 
+    def test_render_leaderboard_winner(self):
+        self.driver.leaderboard = Leaderboard("gui-test", ListStore({}))
+        for name in ["A", "B", "C", "D", "E"] * 2 + ["Player 1"]:
+            self.driver.leaderboard.new_entry(name)
+        game = self.driver.game
+        game.round = 3
+        game.wins = [2, 0]
+        game.get_player_2().get_character().health = 0
+        self.driver.render_leaderboard()
+        rows = self.app.children[2].children[3].children
+        self.assertEqual(len(rows), 12)
+        self.assertEqual(rows[10].value, "#6 Player 1")
+
+
+class MetricsTest(unittest.TestCase):
+    def test_metrics(self):
+        metrics = Metrics()
+        driver = Driver(True, metrics=metrics)
+        driver.clear_display()
+        driver.render_leaderboard()
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot["calls"]["Driver.render_sign_up"]["count"],
+                         1)
+        self.assertEqual(snapshot["calls"]["Leaderboard.get_data"]["count"],
+                         1)
+        self.assertGreater(snapshot["gauges"]["widgets"], 1)
+
+    def test_disabled(self):
+        driver = Driver(True)
+        self.assertNotIn("do_attack", vars(driver))
+        self.assertNotIn("get_data", vars(driver.leaderboard))
+
+
+class TracerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "trace.json")
+        self.tracer = Tracer(self.path)
+        self.driver = Driver(True, metrics=Metrics(), tracer=self.tracer)
+
+    def tearDown(self):
+        self.tracer.close()
+        shutil.rmtree(self.directory)
+
+    def get_events(self, name):
+        self.tracer.close()
+        with open(self.path, encoding="utf-8") as file:
+            return [
+                event for event in json.load(file) if event["name"] == name
+            ]
+
+    def test_nesting(self):
+        self.driver.do_player_creation("Player 1", "Player 2")
+        action = self.get_events("Driver.do_player_creation")[0]
+        render = self.get_events("Driver.render_coin_toss")[0]
+        self.assertEqual(action["cat"], "action")
+        self.assertEqual(render["cat"], "render")
+        self.assertGreaterEqual(render["ts"], action["ts"])
+        self.assertLessEqual(render["ts"] + render["dur"],
+                             action["ts"] + action["dur"])
+
+    def test_after(self):
+        scheduled = []
+
+        class Widget():
+            def after(self, time, function):
+                scheduled.append((time, function))
+
+        self.driver.after(Widget(), 3000, "Driver.after.test",
+                          self.driver.render_leaderboard)
+        self.assertEqual(scheduled[0][0], 3000)
+        scheduled[0][1]()
+        events = self.get_events("Driver.after.test")
+        self.assertEqual([event["ph"] for event in events], ["s", "f", "X"])
+        self.assertEqual(events[2]["args"]["delay_ms"], 3000)
+        self.assertEqual(len(self.get_events("Leaderboard.get_data")), 1)
+
+    def test_new_game(self):
+        # Starting the GUI would block the test, so fail instead
+        leaderboard = self.driver.leaderboard
+        with mock.patch.object(App, "display", side_effect=AssertionError):
+            self.driver.handle_new_game()
+        self.assertTrue(self.driver.under_test)
+        # The leaderboard and its ratings are kept for the next game
+        self.assertIs(self.driver.leaderboard, leaderboard)
+        self.driver.render_sign_up()
+        self.driver.leaderboard.get_data()
+        # Wrappers from the first game are replaced rather than nested
+        self.assertEqual(len(self.get_events("Driver.render_sign_up")), 3)
+        self.assertEqual(len(self.get_events("Leaderboard.get_data")), 1)
+
 
 class WidgetsTest(unittest.TestCase):
     def setUp(self):
@@ -170,3 +304,8 @@ class WidgetsTest(unittest.TestCase):
         self.assertFalse(self.HoverablePushButton.widget.enabled)
         self.HoverablePushButton.enable()
         self.assertTrue(self.HoverablePushButton.widget.enabled)
+
+    def test_image_cache(self):
+        image = ImageCache.get(self.app, TEXTURE)
+        self.assertIs(ImageCache.get(self.app, TEXTURE), image)
+        self.assertTrue(TEXTURE in ImageCache.files)
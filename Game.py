@@ -1,23 +1,37 @@
 # pylint: disable=C0103
-from random import choice as choose
-from typing import Union
+import random
+from typing import Dict, List, Type, Union
 
+from Character import Assault, Character, Health, Magic
 from Player import Player
 
 
+# Every character class, by name
+CHARACTERS: Dict[str, Type[Character]] = {
+    x.__name__: x
+    for x in (Assault, Health, Magic)
+}
+
+
 class Game():
     """The main game controller.
 
     Handles all of the logic which makes the game work.
     """
 
-    def __init__(self) -> None:
+    __slots__ = ("random", "player_1", "player_2", "current_player", "order",
+                 "wins", "round", "characters")
+
+    def __init__(self, rng: random.Random = None) -> None:
+        self.random = rng if rng is not None else random
         self.player_1 = None
         self.player_2 = None
         self.current_player = 0
         self.order = [None, None]
-        self.winners = []
+        self.wins = [0, 0]
         self.round = 1
+        # The character classes which have not been chosen yet, by name
+        self.characters = dict(CHARACTERS)
 
     def get_player_1(self) -> Union[Player, None]:
         """Gets player 1 in the current game if one has been set.
@@ -67,6 +81,58 @@ class Game():
         self.player_1 = player_1
         self.player_2 = player_2
 
+    def get_available_characters(self) -> List[Type[Character]]:
+        """Gets a list of character classes which are not currently in use in
+        the game.
+
+        Returns:
+            A list of character classes which are not currently in use in the
+            game.
+        """
+        return list(self.characters.values())
+
+    def is_character_available(self, character: str) -> bool:
+        """Checks whether a character class can still be chosen.
+
+        Args:
+            character: The name of the character class.
+
+        Returns:
+            True if no player has chosen the character class.
+        """
+        return character in self.characters
+
+    def claim_character(self,
+                        character: str) -> Union[Type[Character], None]:
+        """Marks a character class as in use in the game.
+
+        Args:
+            character: The name of the character class.
+
+        Returns:
+            The character class, or None if it was not available.
+        """
+        return self.characters.pop(character, None)
+
+    def choose_character(self, player: Player, character: str,
+                         name: str) -> bool:
+        """Selects a character for a player from the available classes.
+
+        Args:
+            player: The player choosing a character.
+            character: The name of the character class.
+            name: The name to assign the character.
+
+        Returns:
+            True if the assignment was successful.
+            False if the character was unavailable.
+        """
+        return player.choose_character(character, name, self.characters)
+
+    def reset_available_characters(self) -> None:
+        """Makes every character class available again."""
+        self.characters = dict(CHARACTERS)
+
     def coin_toss(self, choice: str) -> str:
         """Flips a coin and compares it against the choice made by player 1 of
         the current game. This will set the order in which players will take
@@ -79,16 +145,41 @@ class Game():
         Returns:
             The result of the coin flip: "Heads" or "Tails".
         """
-        outcome = choose(["Heads", "Tails"])
+        outcome = self.random.choice(["Heads", "Tails"])
+        self.set_coin_toss(choice, outcome)
+        return outcome
+
+    def set_coin_toss(self, choice: str, outcome: str) -> None:
+        """Sets the order in which players will take their turns from a known
+        coin toss result. Used when replaying a game.
+
+        Args:
+            choice: The choice made by player 1 of the current game: "Heads"
+            or "Tails".
+            outcome: The result of the coin flip: "Heads" or "Tails".
+        """
         self.current_player = 0
         self.order = [self.player_1, self.player_2] if outcome == choice else [
             self.player_2, self.player_1
         ]
-        return outcome
 
     def register_round_winner(self, player: Player):
         """Registers the winner of a round."""
-        self.winners.append(player)
+        self.wins[0 if player is self.player_1 else 1] += 1
+
+    def resolve_round(self) -> Union[Player, None]:
+        """Registers the winner of a round which has just ended.
+
+        Returns:
+            The player who won the round, or None if it was a draw.
+        """
+        character_1_dead = self.player_1.get_character().is_dead()
+        character_2_dead = self.player_2.get_character().is_dead()
+        if character_1_dead and character_2_dead:
+            return None
+        winner = self.player_1 if character_2_dead else self.player_2
+        self.register_round_winner(winner)
+        return winner
 
     def next_round(self, draw: bool) -> None:
         """Resets the players' health points.
@@ -107,11 +198,9 @@ class Game():
         Returns:
             The player who won the game, or None.
         """
-        player_1_wins = self.winners.count(self.player_1)
-        player_2_wins = self.winners.count(self.player_2)
-        if player_1_wins > player_2_wins:
+        if self.wins[0] > self.wins[1]:
             return self.player_1
-        if player_2_wins > player_1_wins:
+        if self.wins[1] > self.wins[0]:
             return self.player_2
         return None
 
@@ -1,23 +1,1461 @@
-# pylint: disable=C0103
-from typing import List, Union
+# pylint: disable=C0103,C0302
+import atexit
+import itertools
+import socket
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Tuple, Union
 from replit import db
 
+from FenwickTree import FenwickTree
+from Game import Game
+from Rating import DEFAULT_RATING, RatingEngine
+
 
 if db is None:
     db = {}
 
 
+class ScoreBucket():
+    """The names which share a score on the leaderboard."""
+
+    def __init__(self, score: int) -> None:
+        self.score = score
+        self.names = {}
+        self.higher = None
+        self.lower = None
+
+
+class ScoreIndex():
+    """An index of leaderboard scores.
+
+    Keeps a map from each name to its score, and groups the names into
+    buckets of equal score. The buckets form a linked list in descending
+    order of score, so a score can be increased by one in O(1) time and the
+    top K entries can be read in O(K) time.
+
+    A Fenwick tree also counts the names at each score, so the rank of a
+    name, or the bucket holding any position in the order, is found in
+    O(log S) time, where S is the highest score. Names with equal scores are
+    in the order they reached the score.
+    """
+
+    def __init__(self) -> None:
+        self.scores = {}
+        self.buckets = {}
+        self.highest = None
+        self.lowest = None
+        self.counts = FenwickTree(64)
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def get_score(self, name: str) -> int:
+        """Gets the score of a name.
+
+        Args:
+            name: The name to look up.
+
+        Returns:
+            The score of the name, or 0 if it is not in the index.
+        """
+        return self.scores.get(name, 0)
+
+    def increment(self, name: str, amount: int = 1) -> int:
+        """Increases the score of a name, adding it if it is not already in
+        the index.
+
+        Args:
+            name: The name whose score should be increased.
+            amount: The amount to increase the score by. Must be positive.
+
+        Returns:
+            The new score of the name.
+        """
+        score = self.scores.get(name)
+        if score is None:
+            bucket = None
+            new_score = amount
+            below = self.lowest
+            if below is not None and below.score > new_score:
+                below = None
+        else:
+            bucket = self.buckets[score]
+            new_score = score + amount
+            below = bucket
+
+        # Find the bucket that the name is moving to
+        while (below is not None and below.higher is not None
+               and below.higher.score <= new_score):
+            below = below.higher
+        if below is not None and below.score == new_score:
+            target = below
+        else:
+            target = self._insert_bucket(new_score, below)
+
+        if bucket is not None:
+            del bucket.names[name]
+            if not bucket.names:
+                self._remove_bucket(bucket)
+            self.counts.add(score, -1)
+        target.names[name] = None
+        self.scores[name] = new_score
+        if new_score >= self.counts.size:
+            self.counts.resize(max(self.counts.size * 2, new_score + 1))
+        self.counts.add(new_score)
+        return new_score
+
+    def get_rank(self, name: str) -> Union[int, None]:
+        """Gets the rank of a name, where names with equal scores share a
+        rank.
+
+        Args:
+            name: The name to look up.
+
+        Returns:
+            One more than the number of names with a higher score, or None if
+            the name is not in the index.
+        """
+        score = self.scores.get(name)
+        if score is None:
+            return None
+        return self.counts.total - self.counts.prefix_sum(score) + 1
+
+    def get_page(self, offset: int,
+                 limit: int) -> List[List[Union[str, int]]]:
+        """Gets a page of names in descending order of score.
+
+        Finding the first bucket takes O(log S) time, then names within it
+        are skipped up to the offset, and the page is read in O(limit) time.
+
+        Args:
+            offset: The number of names before the page.
+            limit: The maximum number of names on the page.
+
+        Returns:
+            A list of lists, where the first element in the sub list is the
+            name and the second element is the score.
+        """
+        if offset < 0 or offset >= len(self.scores) or limit <= 0:
+            return []
+        score = self.counts.find(self.counts.total - 1 - offset)
+        bucket = self.buckets[score]
+        skip = offset - (self.counts.total - self.counts.prefix_sum(score))
+        data = []
+        names = itertools.islice(bucket.names, skip, None)
+        while len(data) < limit:
+            for name in names:
+                if len(data) == limit:
+                    break
+                data.append([name, bucket.score])
+            bucket = bucket.lower
+            if bucket is None:
+                break
+            names = iter(bucket.names)
+        return data
+
+    def get_top(self, count: int) -> List[List[Union[str, int]]]:
+        """Gets the names with the highest scores.
+
+        Args:
+            count: The maximum number of names to return.
+
+        Returns:
+            A list of lists, where the first element in the sub list is the
+            name and the second element is the score, with the highest scores
+            first.
+        """
+        data = []
+        bucket = self.highest
+        while bucket is not None and len(data) < count:
+            for name in bucket.names:
+                if len(data) == count:
+                    break
+                data.append([name, bucket.score])
+            bucket = bucket.lower
+        return data
+
+    def _insert_bucket(self, score: int,
+                       below: Union[ScoreBucket, None]) -> ScoreBucket:
+        """Creates an empty bucket for a score, placed directly above the
+        given bucket, or at the bottom of the list if no bucket is given."""
+        bucket = ScoreBucket(score)
+        self.buckets[score] = bucket
+        if below is None:
+            bucket.higher = self.lowest
+            self.lowest = bucket
+        else:
+            bucket.lower = below
+            bucket.higher = below.higher
+            below.higher = bucket
+        if bucket.lower is not None:
+            bucket.lower.higher = bucket
+        if bucket.higher is None:
+            self.highest = bucket
+        else:
+            bucket.higher.lower = bucket
+        return bucket
+
+    def _remove_bucket(self, bucket: ScoreBucket) -> None:
+        """Unlinks an empty bucket from the list."""
+        del self.buckets[bucket.score]
+        if bucket.higher is None:
+            self.highest = bucket.lower
+        else:
+            bucket.higher.lower = bucket.lower
+        if bucket.lower is None:
+            self.lowest = bucket.higher
+        else:
+            bucket.lower.higher = bucket.higher
+
+
+# Indexes of each collection, shared by every ListStore in this process
+indexes: Dict[str, Tuple[ScoreIndex, Dict[str, int]]] = {}
+
+
+def write(key: str, value: Any, database: Any = None) -> None:
+    """Writes a value to ReplitDB, or to the in-memory fallback.
+
+    Args:
+        key: The key to write to.
+        value: The value to write.
+        database: The database to write to, or None for ReplitDB.
+    """
+    database = db if database is None else database
+    try:
+        database.set(key, value)
+    except AttributeError:
+        database[key] = value
+
+
+def get_keys(prefix: str, database: Any = None) -> List[str]:
+    """Gets every key in ReplitDB, or in the in-memory fallback, which starts
+    with a prefix.
+
+    Args:
+        prefix: The prefix to search for.
+        database: The database to search, or None for ReplitDB.
+
+    Returns:
+        The matching keys.
+    """
+    database = db if database is None else database
+    try:
+        return list(database.prefix(prefix))
+    except AttributeError:
+        return [key for key in database if key.startswith(prefix)]
+
+
+class ListStore():
+    """Stores each collection as a single list of entries in ReplitDB, or in
+    memory if ReplitDB is unavailable.
+
+    The list is indexed once per process, so scores can be updated and
+    read without searching or sorting the whole list. The index is rebuilt
+    if an update finds that another process has changed the list.
+
+    A dictionary can be given to use as the database instead, such as to
+    keep test or benchmark data apart from the real leaderboard.
+    """
+
+    def __init__(self, database: Dict[str, Any] = None) -> None:
+        self.db = db if database is None else database
+        # Indexes of the shared database are shared by every ListStore
+        self.indexes = indexes if database is None else {}
+
+    def open(self, collection: str) -> None:
+        """Creates a collection if it does not already exist.
+
+        Args:
+            collection: The name of the collection.
+        """
+        if self.db.get(collection, None) is None:
+            write(collection, [], self.db)
+            self.indexes.pop(collection, None)
+
+    def load_index(
+            self,
+            collection: str,
+            entries: List[Dict[str, Any]] = None
+    ) -> Tuple[ScoreIndex, Dict[str, int]]:
+        """Gets the index of a stored collection, building it if needed.
+
+        Args:
+            collection: The name of the collection.
+            entries: The stored list, if it has already been read.
+
+        Returns:
+            The score index, and a map from each name to the position of its
+            entry in the stored list.
+        """
+        if collection not in self.indexes:
+            if entries is None:
+                entries = self.db.get(collection, None) or []
+            positions = {
+                entry["name"]: position
+                for position, entry in enumerate(entries)
+            }
+            # Adding the highest scores first means no bucket list walks
+            index = ScoreIndex()
+            for entry in sorted(entries,
+                                key=lambda x: x["score"],
+                                reverse=True):
+                index.increment(entry["name"], entry["score"])
+            self.indexes[collection] = (index, positions)
+        return self.indexes[collection]
+
+    def add(self, collection: str, scores: Dict[str, int]) -> None:
+        """Adds points to the scores of players in a collection. Players who
+        are not in the collection are added.
+
+        Args:
+            collection: The name of the collection.
+            scores: A map from each player's name to the points to add.
+        """
+        index, positions = self.load_index(collection)
+        entries = self.db.get(collection, None) or []
+        if not isinstance(entries, list):
+            # ReplitDB lists write themselves back on every change, so
+            # change a plain copy and write the whole batch back once
+            entries = list(entries)
+        # Rebuild the index if another process has added, removed or
+        # changed entries since it was built
+        if len(entries) != len(positions) or not all(
+                self.is_indexed(entries, index, positions, name)
+                for name in scores):
+            self.indexes.pop(collection, None)
+            index, positions = self.load_index(collection, entries)
+        for name, amount in scores.items():
+            position = positions.get(name)
+            if position is not None:
+                entries[position] = {
+                    "name": name,
+                    "score": entries[position]["score"] + amount
+                }
+            else:
+                positions[name] = len(entries)
+                entries.append({"name": name, "score": amount})
+            index.increment(name, amount)
+        write(collection, entries, self.db)
+
+    @staticmethod
+    def is_indexed(entries: List[Dict[str, Any]], index: ScoreIndex,
+                   positions: Dict[str, int], name: str) -> bool:
+        """Checks that the index agrees with the stored entry of a player.
+
+        Args:
+            entries: The stored list.
+            index: The score index.
+            positions: The map from each name to the position of its entry.
+            name: The name of the player.
+
+        Returns:
+            Whether the player's entry is where the index expects, with the
+            score the index expects.
+        """
+        position = positions.get(name)
+        if position is None:
+            return True
+        if position >= len(entries):
+            return False
+        entry = entries[position]
+        return entry["name"] == name and entry["score"] == index.get_score(
+            name)
+
+    def get_score(self, collection: str, name: str) -> int:
+        """Gets the score of a player in a collection.
+
+        Args:
+            collection: The name of the collection.
+            name: The name of the player.
+
+        Returns:
+            The score of the player, or 0 if they are not in the collection.
+        """
+        return self.load_index(collection)[0].get_score(name)
+
+    def get_top(self, collection: str,
+                count: int) -> List[List[Union[str, int]]]:
+        """Gets the players with the highest scores in a collection.
+
+        Args:
+            collection: The name of the collection.
+            count: The maximum number of players to return.
+
+        Returns:
+            A list of lists, where the first element in the sub list is the
+            player's name and the second element is the player's score, with
+            the highest scores first.
+        """
+        return self.load_index(collection)[0].get_top(count)
+
+    def get_rank(self, collection: str, name: str) -> Union[int, None]:
+        """Gets the rank of a player in a collection, where players with
+        equal scores share a rank.
+
+        Args:
+            collection: The name of the collection.
+            name: The name of the player.
+
+        Returns:
+            One more than the number of players with a higher score, or None
+            if the player is not in the collection.
+        """
+        return self.load_index(collection)[0].get_rank(name)
+
+    def get_page(self, collection: str, offset: int,
+                 limit: int) -> List[List[Union[str, int]]]:
+        """Gets a page of the players in a collection in descending order of
+        score.
+
+        Args:
+            collection: The name of the collection.
+            offset: The number of players before the page.
+            limit: The maximum number of players on the page.
+
+        Returns:
+            A list of lists, where the first element in the sub list is the
+            player's name and the second element is the player's score.
+        """
+        return self.load_index(collection)[0].get_page(offset, limit)
+
+    @staticmethod
+    def get_ratings_key(collection: str, name: str) -> str:
+        """Gets the key which holds the rating of a player in a collection.
+
+        Args:
+            collection: The name of the collection.
+            name: The name of the player, or an empty string for the prefix
+            of every rating.
+
+        Returns:
+            The key of the rating.
+        """
+        return f"{collection}/ratings/{name}"
+
+    def get_ratings(self, collection: str,
+                    names: List[str]) -> Dict[str, float]:
+        """Gets the ratings of some players in a collection.
+
+        Args:
+            collection: The name of the collection.
+            names: The names of the players.
+
+        Returns:
+            A map from the name of each of the players who has a rating to
+            their rating.
+        """
+        ratings = {}
+        for name in names:
+            rating = self.db.get(self.get_ratings_key(collection, name), None)
+            if rating is not None:
+                ratings[name] = rating
+        return ratings
+
+    def set_ratings(self, collection: str, ratings: Dict[str, float]) -> None:
+        """Stores the ratings of players in a collection, each under its own
+        key.
+
+        Args:
+            collection: The name of the collection.
+            ratings: A map from each player's name to their new rating.
+        """
+        for name, rating in ratings.items():
+            write(self.get_ratings_key(collection, name), rating, self.db)
+
+    def clear(self, collection: str) -> None:
+        """Removes all data from a collection.
+
+        Args:
+            collection: The name of the collection.
+        """
+        write(collection, None, self.db)
+        for key in get_keys(self.get_ratings_key(collection, ""), self.db):
+            del self.db[key]
+        self.indexes.pop(collection, None)
+
+
+class ShardView():
+    """What one process has read of the shards of a collection."""
+
+    def __init__(self, generation: int) -> None:
+        # The number of times the collection had been cleared when read
+        self.generation = generation
+        self.index = ScoreIndex()
+        # The points each writer has given each player, and the batch which
+        # last changed them
+        self.points: Dict[str, Dict[str, Tuple[int, int]]] = {}
+        # The last batch read from each writer
+        self.seen: Dict[str, int] = {}
+        self.refreshed = None
+
+    def apply(self, writer: str, name: str, total: int, batch: int) -> None:
+        """Updates the points a writer has given a player, unless the update
+        has already been read. Updates may be read more than once, and in
+        any order.
+
+        Args:
+            writer: The id of the writer.
+            name: The name of the player.
+            total: The points the writer has given the player.
+            batch: The batch which set the points.
+        """
+        points = self.points.setdefault(writer, {})
+        old, old_batch = points.get(name, (0, 0))
+        if batch <= old_batch:
+            return
+        points[name] = (total, batch)
+        if total > old:
+            self.index.increment(name, total - old)
+
+
+class ShardedStore():
+    """Stores scores in ReplitDB, or in memory if ReplitDB is unavailable,
+    in one shard per writer.
+
+    Each store is a writer with its own id, and only writes keys in its own
+    shard: the points it has given each player, a summary of its TOP_SIZE
+    highest points, a log of its last LOG_SIZE batches of updates, and the
+    number of batches it has written. Apart from the list of writers, no key
+    is written by two processes, so writers never overwrite each other's
+    updates, however many processes share the database. A writer keeps its
+    id when it is restarted, so the number of shards stays the same.
+
+    A player's score is the sum of their points in every shard, so a score
+    is read from one key per writer, and the top of the leaderboard from the
+    writers' summaries. Ranks and pages need every score, so each process
+    builds a ScoreIndex by reading every shard the first time one is asked
+    for, then catches up with other writers by reading their logs, at most
+    once per refresh interval, in O(log S + k) time.
+
+    Points are only ever added, so a writer's summary stays exact as it is
+    updated.
+    """
+
+    # The number of recent batches kept in each writer's log
+    LOG_SIZE = 100
+    # The number of players in each writer's summary
+    TOP_SIZE = 10
+
+    def __init__(self,
+                 refresh_interval: float = 1.0,
+                 database: Dict[str, Any] = None,
+                 writer: str = None,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.refresh_interval = refresh_interval
+        self.db = db if database is None else database
+        # Processes sharing a database must be given different writer ids
+        self.writer = socket.gethostname() if writer is None else writer
+        self.clock = clock
+        self.views: Dict[str, ShardView] = {}
+        self.lock = threading.RLock()
+
+    @staticmethod
+    def get_key(collection: str, kind: str, *parts: Any) -> str:
+        """Gets a key in a collection.
+
+        Args:
+            collection: The name of the collection.
+            kind: The kind of data, such as "shards" or "ratings".
+            parts: The rest of the key, such as the writer and the player.
+
+        Returns:
+            The key.
+        """
+        return "/".join([collection, kind, *map(str, parts)])
+
+    def get_values(self, prefix: str) -> Dict[str, Any]:
+        """Gets every value whose key starts with a prefix.
+
+        Args:
+            prefix: The prefix, which is removed from the keys returned.
+
+        Returns:
+            A map from the rest of each key to its value.
+        """
+        values = {}
+        for key in get_keys(prefix, self.db):
+            value = self.db.get(key, None)
+            if value is not None:
+                values[key[len(prefix):]] = value
+        return values
+
+    def get_generation(self, collection: str) -> int:
+        """Gets the number of times a collection has been cleared.
+
+        Args:
+            collection: The name of the collection.
+
+        Returns:
+            The number of times.
+        """
+        return self.db.get(self.get_key(collection, "generation"), None) or 0
+
+    def get_batches(self, collection: str) -> Dict[str, int]:
+        """Gets the number of batches each writer has written to a
+        collection.
+
+        Args:
+            collection: The name of the collection.
+
+        Returns:
+            A map from the id of each writer to its number of batches.
+        """
+        batches = {}
+        for writer in self.db.get(self.get_key(collection, "writers"),
+                                  None) or []:
+            batch = self.db.get(self.get_key(collection, "batches", writer),
+                                None)
+            if batch is not None:
+                batches[writer] = batch
+        return batches
+
+    def get_points(self, collection: str, writer: str, name: str) -> int:
+        """Gets the points one writer has given a player.
+
+        Args:
+            collection: The name of the collection.
+            writer: The id of the writer.
+            name: The name of the player.
+
+        Returns:
+            The points, or 0 if the writer has not given the player any.
+        """
+        points = self.db.get(self.get_key(collection, "shards", writer, name),
+                             None)
+        return 0 if points is None else points[0]
+
+    def read_shard(self, view: ShardView, collection: str,
+                   writer: str) -> None:
+        """Reads all of one writer's points in a collection.
+
+        Args:
+            view: The view to update.
+            collection: The name of the collection.
+            writer: The id of the writer.
+        """
+        shard = self.get_values(self.get_key(collection, "shards", writer,
+                                             ""))
+        for name, (total, batch) in shard.items():
+            view.apply(writer, name, total, batch)
+
+    def read_log(self, view: ShardView, collection: str, writer: str,
+                 first: int, last: int) -> bool:
+        """Reads a range of one writer's batches in a collection from its
+        log.
+
+        Args:
+            view: The view to update.
+            collection: The name of the collection.
+            writer: The id of the writer.
+            first: The first batch to read.
+            last: The last batch to read.
+
+        Returns:
+            False if any of the batches have left the log.
+        """
+        for batch in range(first, last + 1):
+            entry = self.db.get(
+                self.get_key(collection, "log", writer, batch), None)
+            if entry is None:
+                return False
+            for name, total in entry.items():
+                view.apply(writer, name, total, batch)
+        return True
+
+    def get_view(self, collection: str) -> ShardView:
+        """Gets this process's view of a collection, reading every shard if
+        it has not been read yet or the collection has been cleared, and
+        otherwise reading any batches written by other writers since the
+        last refresh.
+
+        Args:
+            collection: The name of the collection.
+
+        Returns:
+            The view.
+        """
+        view = self.views.get(collection)
+        now = self.clock()
+        if view is not None and now - view.refreshed < self.refresh_interval:
+            return view
+        generation = self.get_generation(collection)
+        # Batch counts are written after the batches, so every batch counted
+        # here has been written in full
+        batches = self.get_batches(collection)
+        if view is None or view.generation != generation or any(
+                batches.get(writer, 0) < seen
+                for writer, seen in view.seen.items()):
+            # Start again if this is the first read or the collection was
+            # cleared
+            view = self.views[collection] = ShardView(generation)
+            for writer, batch in batches.items():
+                self.read_shard(view, collection, writer)
+                view.seen[writer] = batch
+        for writer, batch in batches.items():
+            seen = view.seen.get(writer, 0)
+            if writer == self.writer or batch <= seen:
+                continue
+            if batch - seen > self.LOG_SIZE or not self.read_log(
+                    view, collection, writer, seen + 1, batch):
+                # Batches have left the log, so read the whole shard
+                self.read_shard(view, collection, writer)
+            view.seen[writer] = batch
+        view.refreshed = now
+        return view
+
+    def open(self, collection: str) -> None:
+        """Collections do not need creating in a sharded store."""
+
+    def add(self, collection: str, scores: Dict[str, int]) -> None:
+        """Adds points to the scores of players in a collection. Players who
+        are not in the collection are added.
+
+        The update is written to this writer's shard as one batch: first to
+        the log, then to each player's points and the summary, then to the
+        batch count. Only the keys of the players in the batch are read.
+
+        Args:
+            collection: The name of the collection.
+            scores: A map from each player's name to the points to add.
+        """
+        with self.lock:
+            batch = (self.db.get(
+                self.get_key(collection, "batches", self.writer), None)
+                     or 0) + 1
+            totals = {
+                name: self.get_points(collection, self.writer, name) + amount
+                for name, amount in scores.items()
+            }
+            summary = dict(
+                self.db.get(self.get_key(collection, "top", self.writer),
+                            None) or [])
+            summary.update(totals)
+            write(self.get_key(collection, "log", self.writer, batch),
+                  totals, self.db)
+            for name, total in totals.items():
+                write(self.get_key(collection, "shards", self.writer, name),
+                      [total, batch], self.db)
+            write(self.get_key(collection, "top", self.writer),
+                  [[name, total] for name, total in sorted(
+                      summary.items(), key=lambda x: (-x[1], x[0]))
+                   [:self.TOP_SIZE]], self.db)
+            write(self.get_key(collection, "batches", self.writer), batch,
+                  self.db)
+            # Writers list themselves after writing their first batch. If
+            # two add themselves at once and one is lost, it adds itself
+            # again on its next batch
+            writers = list(
+                self.db.get(self.get_key(collection, "writers"), None) or [])
+            if self.writer not in writers:
+                write(self.get_key(collection, "writers"),
+                      writers + [self.writer], self.db)
+            old = self.get_key(collection, "log", self.writer,
+                               batch - self.LOG_SIZE)
+            if batch > self.LOG_SIZE and self.db.get(old, None) is not None:
+                del self.db[old]
+            view = self.views.get(collection)
+            if view is not None:
+                for name, total in totals.items():
+                    view.apply(self.writer, name, total, batch)
+                view.seen[self.writer] = batch
+
+    def get_score(self, collection: str, name: str) -> int:
+        """Gets the score of a player in a collection, from each writer's
+        points.
+
+        Args:
+            collection: The name of the collection.
+            name: The name of the player.
+
+        Returns:
+            The score of the player, or 0 if they are not in the collection.
+        """
+        with self.lock:
+            return sum(
+                self.get_points(collection, writer, name)
+                for writer in self.get_batches(collection))
+
+    def get_top(self, collection: str,
+                count: int) -> List[List[Union[str, int]]]:
+        """Gets the players with the highest scores in a collection.
+
+        The players in the writers' summaries are scored, and any other
+        player has at most the sum of the lowest points in each full
+        summary. If enough of them beat that, they are the top, and
+        otherwise the top is read from the index.
+
+        Args:
+            collection: The name of the collection.
+            count: The maximum number of players to return.
+
+        Returns:
+            A list of lists, where the first element in the sub list is the
+            player's name and the second element is the player's score, with
+            the highest scores first.
+        """
+        with self.lock:
+            if count > self.TOP_SIZE:
+                return self.get_view(collection).index.get_top(count)
+            writers = list(self.get_batches(collection))
+            names = set()
+            bound = 0
+            for writer in writers:
+                summary = self.db.get(self.get_key(collection, "top", writer),
+                                      None) or []
+                names.update(name for name, _ in summary)
+                if len(summary) == self.TOP_SIZE:
+                    bound += summary[-1][1]
+            data = [[
+                name,
+                sum(self.get_points(collection, writer, name)
+                    for writer in writers)
+            ] for name in names]
+            data = sorted(data, key=lambda x: (-x[1], x[0]))[:count]
+            if bound == 0 or (len(data) == count and data[-1][1] > bound):
+                return data
+            return self.get_view(collection).index.get_top(count)
+
+    def get_rank(self, collection: str, name: str) -> Union[int, None]:
+        """Gets the rank of a player in a collection, where players with
+        equal scores share a rank.
+
+        Args:
+            collection: The name of the collection.
+            name: The name of the player.
+
+        Returns:
+            One more than the number of players with a higher score, or None
+            if the player is not in the collection.
+        """
+        with self.lock:
+            return self.get_view(collection).index.get_rank(name)
+
+    def get_page(self, collection: str, offset: int,
+                 limit: int) -> List[List[Union[str, int]]]:
+        """Gets a page of the players in a collection in descending order of
+        score.
+
+        Args:
+            collection: The name of the collection.
+            offset: The number of players before the page.
+            limit: The maximum number of players on the page.
+
+        Returns:
+            A list of lists, where the first element in the sub list is the
+            player's name and the second element is the player's score.
+        """
+        with self.lock:
+            return self.get_view(collection).index.get_page(offset, limit)
+
+    def get_ratings(self, collection: str,
+                    names: List[str]) -> Dict[str, float]:
+        """Gets the ratings of some players in a collection.
+
+        Args:
+            collection: The name of the collection.
+            names: The names of the players.
+
+        Returns:
+            A map from the name of each of the players who has a rating to
+            their rating.
+        """
+        ratings = {}
+        for name in names:
+            rating = self.db.get(self.get_key(collection, "ratings", name),
+                                 None)
+            if rating is not None:
+                ratings[name] = rating
+        return ratings
+
+    def set_ratings(self, collection: str, ratings: Dict[str, float]) -> None:
+        """Stores the ratings of players in a collection, each under its own
+        key.
+
+        Args:
+            collection: The name of the collection.
+            ratings: A map from each player's name to their new rating.
+        """
+        for name, rating in ratings.items():
+            write(self.get_key(collection, "ratings", name), rating, self.db)
+
+    def clear(self, collection: str) -> None:
+        """Removes all data from a collection, written by any writer.
+
+        Args:
+            collection: The name of the collection.
+        """
+        with self.lock:
+            for kind in ["batches", "log", "shards", "top", "ratings"]:
+                for key in get_keys(self.get_key(collection, kind, ""),
+                                    self.db):
+                    del self.db[key]
+            write(self.get_key(collection, "writers"), None, self.db)
+            # Other processes read the collection again when they see it has
+            # been cleared, even if a writer has written to it since
+            write(self.get_key(collection, "generation"),
+                  self.get_generation(collection) + 1, self.db)
+            self.views.pop(collection, None)
+
+
+class SQLiteStore():
+    """Stores collections in a local SQLite database.
+
+    The database uses write-ahead logging, and scores are updated with
+    single UPSERT statements, so it can be shared by several processes.
+
+    A Fenwick tree of the number of players at each score is kept in the
+    score_counts table and updated in the same transaction as the scores,
+    so a rank is found by reading O(log S) rows and the start of a page in
+    O(log S) lookups, however many players there are.
+    """
+
+    # Scores from 0 to TREE_SIZE - 1 are counted in the tree
+    TREE_SIZE = 1 << 32
+
+    def __init__(self, path: str = "leaderboard.db",
+                 timeout: float = 30) -> None:
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path,
+                                          timeout=timeout,
+                                          isolation_level=None,
+                                          check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS scores (collection TEXT NOT NULL, "
+            "name TEXT NOT NULL, score INTEGER NOT NULL)")
+        self.connection.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS scores_name "
+            "ON scores (collection, name)")
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS scores_score "
+            "ON scores (collection, score)")
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS scores_rank "
+            "ON scores (collection, score DESC, name)")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS ratings (collection TEXT NOT NULL, "
+            "name TEXT NOT NULL, rating REAL NOT NULL)")
+        self.connection.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS ratings_name "
+            "ON ratings (collection, name)")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS score_counts (collection TEXT NOT "
+            "NULL, node INTEGER NOT NULL, count INTEGER NOT NULL)")
+        self.connection.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS score_counts_node "
+            "ON score_counts (collection, node)")
+
+    @staticmethod
+    def get_nodes(score: int) -> List[int]:
+        """Gets the nodes of the tree which count a score.
+
+        Args:
+            score: The score.
+
+        Returns:
+            The nodes to update when a player reaches or leaves the score.
+        """
+        nodes = []
+        node = score + 1
+        while node <= SQLiteStore.TREE_SIZE:
+            nodes.append(node)
+            node += node & -node
+        return nodes
+
+    def count_at_most(self, collection: str, score: int) -> int:
+        """Counts the players in a collection with at most a score. Must be
+        called with the lock held.
+
+        Args:
+            collection: The name of the collection.
+            score: The score.
+
+        Returns:
+            The number of players.
+        """
+        nodes = []
+        node = min(score + 1, self.TREE_SIZE)
+        while node > 0:
+            nodes.append(node)
+            node -= node & -node
+        if not nodes:
+            return 0
+        return self.connection.execute(
+            "SELECT COALESCE(SUM(count), 0) FROM score_counts WHERE "
+            f"collection = ? AND node IN ({', '.join('?' * len(nodes))})",
+            (collection, *nodes)).fetchone()[0]
+
+    def find_score(self, collection: str, position: int) -> int:
+        """Finds the score of the player at a position in ascending order of
+        score. Must be called with the lock held.
+
+        Args:
+            collection: The name of the collection.
+            position: The number of players before the player.
+
+        Returns:
+            The score of the player.
+        """
+        node = 0
+        step = self.TREE_SIZE
+        while step > 0:
+            row = self.connection.execute(
+                "SELECT count FROM score_counts WHERE collection = ? AND "
+                "node = ?", (collection, node + step)).fetchone()
+            count = 0 if row is None else row[0]
+            if count <= position:
+                node += step
+                position -= count
+            step >>= 1
+        return node
+
+    def update_counts(self, collection: str,
+                      moves: List[Tuple[Union[int, None], int]]) -> None:
+        """Moves players between scores in the tree. Must be called inside a
+        transaction.
+
+        Args:
+            collection: The name of the collection.
+            moves: The old score of each player, or None if they are new,
+            and their new score.
+        """
+        deltas: Dict[int, int] = {}
+        for old, new in moves:
+            if old is not None:
+                for node in self.get_nodes(old):
+                    deltas[node] = deltas.get(node, 0) - 1
+            for node in self.get_nodes(new):
+                deltas[node] = deltas.get(node, 0) + 1
+        self.connection.executemany(
+            "INSERT INTO score_counts (collection, node, count) "
+            "VALUES (?, ?, ?) ON CONFLICT (collection, node) "
+            "DO UPDATE SET count = count + excluded.count",
+            [(collection, node, delta) for node, delta in deltas.items()
+             if delta])
+
+    def open(self, collection: str) -> None:
+        """Counts the scores of a collection in the tree, if a database
+        written without the tree holds scores for it.
+
+        Args:
+            collection: The name of the collection.
+        """
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                counted = self.connection.execute(
+                    "SELECT 1 FROM score_counts WHERE collection = ? LIMIT 1",
+                    (collection, )).fetchone()
+                if counted is None:
+                    self.update_counts(collection, [
+                        (None, row[0]) for row in self.connection.execute(
+                            "SELECT score FROM scores WHERE collection = ?",
+                            (collection, ))
+                    ])
+            except sqlite3.Error:
+                self.connection.execute("ROLLBACK")
+                raise
+            self.connection.execute("COMMIT")
+
+    def add(self, collection: str, scores: Dict[str, int]) -> None:
+        """Adds points to the scores of players in a collection. Players who
+        are not in the collection are added.
+
+        Args:
+            collection: The name of the collection.
+            scores: A map from each player's name to the points to add.
+        """
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                moves = []
+                for name, amount in scores.items():
+                    row = self.connection.execute(
+                        "SELECT score FROM scores WHERE collection = ? AND "
+                        "name = ?", (collection, name)).fetchone()
+                    old = None if row is None else row[0]
+                    moves.append((old, (old or 0) + amount))
+                self.update_counts(collection, moves)
+                self.connection.executemany(
+                    "INSERT INTO scores (collection, name, score) "
+                    "VALUES (?, ?, ?) ON CONFLICT (collection, name) "
+                    "DO UPDATE SET score = score + excluded.score",
+                    [(collection, name, amount)
+                     for name, amount in scores.items()])
+            except sqlite3.Error:
+                self.connection.execute("ROLLBACK")
+                raise
+            self.connection.execute("COMMIT")
+
+    def get_score(self, collection: str, name: str) -> int:
+        """Gets the score of a player in a collection.
+
+        Args:
+            collection: The name of the collection.
+            name: The name of the player.
+
+        Returns:
+            The score of the player, or 0 if they are not in the collection.
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT score FROM scores WHERE collection = ? AND name = ?",
+                (collection, name)).fetchone()
+        return 0 if row is None else row[0]
+
+    def get_top(self, collection: str,
+                count: int) -> List[List[Union[str, int]]]:
+        """Gets the players with the highest scores in a collection.
+
+        Args:
+            collection: The name of the collection.
+            count: The maximum number of players to return.
+
+        Returns:
+            A list of lists, where the first element in the sub list is the
+            player's name and the second element is the player's score, with
+            the highest scores first.
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT name, score FROM scores WHERE collection = ? "
+                "ORDER BY score DESC LIMIT ?", (collection, count)).fetchall()
+        return [list(row) for row in rows]
+
+    def get_rank(self, collection: str, name: str) -> Union[int, None]:
+        """Gets the rank of a player in a collection, where players with
+        equal scores share a rank.
+
+        Args:
+            collection: The name of the collection.
+            name: The name of the player.
+
+        Returns:
+            One more than the number of players with a higher score, or None
+            if the player is not in the collection.
+        """
+        with self.lock:
+            # Read the score and the counts from one snapshot
+            self.connection.execute("BEGIN")
+            try:
+                row = self.connection.execute(
+                    "SELECT score FROM scores WHERE collection = ? AND "
+                    "name = ?", (collection, name)).fetchone()
+                if row is None:
+                    return None
+                total = self.count_at_most(collection, self.TREE_SIZE - 1)
+                return total - self.count_at_most(collection, row[0]) + 1
+            finally:
+                self.connection.execute("COMMIT")
+
+    def get_page(self, collection: str, offset: int,
+                 limit: int) -> List[List[Union[str, int]]]:
+        """Gets a page of the players in a collection in descending order of
+        score.
+
+        The score of the first player on the page is found in the tree, so
+        only players with that score are skipped to reach the page.
+
+        Args:
+            collection: The name of the collection.
+            offset: The number of players before the page.
+            limit: The maximum number of players on the page.
+
+        Returns:
+            A list of lists, where the first element in the sub list is the
+            player's name and the second element is the player's score.
+        """
+        with self.lock:
+            self.connection.execute("BEGIN")
+            try:
+                total = self.count_at_most(collection, self.TREE_SIZE - 1)
+                if offset < 0 or offset >= total or limit <= 0:
+                    return []
+                score = self.find_score(collection, total - 1 - offset)
+                skip = offset - (total -
+                                 self.count_at_most(collection, score))
+                rows = self.connection.execute(
+                    "SELECT name, score FROM scores WHERE collection = ? "
+                    "AND score <= ? ORDER BY score DESC, name LIMIT ? "
+                    "OFFSET ?", (collection, score, limit, skip)).fetchall()
+            finally:
+                self.connection.execute("COMMIT")
+        return [list(row) for row in rows]
+
+    def get_ratings(self, collection: str,
+                    names: List[str]) -> Dict[str, float]:
+        """Gets the ratings of some players in a collection.
+
+        Args:
+            collection: The name of the collection.
+            names: The names of the players.
+
+        Returns:
+            A map from the name of each of the players who has a rating to
+            their rating.
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT name, rating FROM ratings WHERE collection = ? "
+                f"AND name IN ({', '.join('?' * len(names))})",
+                (collection, *names)).fetchall()
+        return dict(rows)
+
+    def set_ratings(self, collection: str, ratings: Dict[str, float]) -> None:
+        """Stores the ratings of players in a collection.
+
+        Args:
+            collection: The name of the collection.
+            ratings: A map from each player's name to their new rating.
+        """
+        with self.lock:
+            self.connection.executemany(
+                "INSERT INTO ratings (collection, name, rating) "
+                "VALUES (?, ?, ?) ON CONFLICT (collection, name) "
+                "DO UPDATE SET rating = excluded.rating",
+                [(collection, name, rating)
+                 for name, rating in ratings.items()])
+
+    def clear(self, collection: str) -> None:
+        """Removes all data from a collection.
+
+        Args:
+            collection: The name of the collection.
+        """
+        with self.lock:
+            # The scores and their counts must be cleared together
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                for table in ["scores", "ratings", "score_counts"]:
+                    self.connection.execute(
+                        f"DELETE FROM {table} WHERE collection = ?",
+                        (collection, ))
+            except sqlite3.Error:
+                self.connection.execute("ROLLBACK")
+                raise
+            self.connection.execute("COMMIT")
+
+    def close(self) -> None:
+        """Closes the database connection."""
+        with self.lock:
+            self.connection.close()
+
+
+class WriteBehindStore():
+    """Buffers score updates in memory and writes them to another store in
+    batches.
+
+    Buffered updates are written when the buffer reaches a number of
+    updates, when a timer runs out, and when the process exits. Reads
+    include updates which have not been written yet.
+    """
+
+    def __init__(self,
+                 store: Union[ListStore, ShardedStore, SQLiteStore],
+                 flush_interval: float = 5,
+                 flush_threshold: int = 100) -> None:
+        self.store = store
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.pending: Dict[str, Dict[str, int]] = {}
+        self.pending_count = 0
+        self.lock = threading.RLock()
+        self.timer = None
+        atexit.register(self.flush)
+
+    def open(self, collection: str) -> None:
+        """Creates a collection if it does not already exist.
+
+        Args:
+            collection: The name of the collection.
+        """
+        self.store.open(collection)
+
+    def add(self, collection: str, scores: Dict[str, int]) -> None:
+        """Buffers points to add to the scores of players in a collection.
+
+        Args:
+            collection: The name of the collection.
+            scores: A map from each player's name to the points to add.
+        """
+        with self.lock:
+            pending = self.pending.setdefault(collection, {})
+            for name, amount in scores.items():
+                pending[name] = pending.get(name, 0) + amount
+            self.pending_count += len(scores)
+            if self.pending_count >= self.flush_threshold:
+                self.flush()
+            elif self.timer is None:
+                self.timer = threading.Timer(self.flush_interval, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def flush(self) -> None:
+        """Writes all buffered updates to the underlying store."""
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            while self.pending:
+                collection, scores = self.pending.popitem()
+                try:
+                    self.store.add(collection, scores)
+                except Exception:
+                    self.pending[collection] = scores
+                    raise
+            self.pending_count = 0
+
+    def get_score(self, collection: str, name: str) -> int:
+        """Gets the score of a player in a collection.
+
+        Args:
+            collection: The name of the collection.
+            name: The name of the player.
+
+        Returns:
+            The score of the player, or 0 if they are not in the collection.
+        """
+        with self.lock:
+            pending = self.pending.get(collection, {}).get(name, 0)
+            return self.store.get_score(collection, name) + pending
+
+    def get_top(self, collection: str,
+                count: int) -> List[List[Union[str, int]]]:
+        """Gets the players with the highest scores in a collection.
+
+        Args:
+            collection: The name of the collection.
+            count: The maximum number of players to return.
+
+        Returns:
+            A list of lists, where the first element in the sub list is the
+            player's name and the second element is the player's score, with
+            the highest scores first.
+        """
+        with self.lock:
+            pending = self.pending.get(collection, {})
+            # At most one stored entry is pushed out of the top for each
+            # buffered player
+            scores = dict(
+                self.store.get_top(collection, count + len(pending)))
+            for name, amount in pending.items():
+                if name not in scores:
+                    scores[name] = self.store.get_score(collection, name)
+                scores[name] += amount
+        data = sorted(map(list, scores.items()),
+                      key=lambda x: x[1],
+                      reverse=True)
+        return data[:count]
+
+    def get_rank(self, collection: str, name: str) -> Union[int, None]:
+        """Gets the rank of a player in a collection, where players with
+        equal scores share a rank.
+
+        Buffered updates are written first.
+
+        Args:
+            collection: The name of the collection.
+            name: The name of the player.
+
+        Returns:
+            One more than the number of players with a higher score, or None
+            if the player is not in the collection.
+        """
+        with self.lock:
+            self.flush()
+            return self.store.get_rank(collection, name)
+
+    def get_page(self, collection: str, offset: int,
+                 limit: int) -> List[List[Union[str, int]]]:
+        """Gets a page of the players in a collection in descending order of
+        score.
+
+        Buffered updates are written first.
+
+        Args:
+            collection: The name of the collection.
+            offset: The number of players before the page.
+            limit: The maximum number of players on the page.
+
+        Returns:
+            A list of lists, where the first element in the sub list is the
+            player's name and the second element is the player's score.
+        """
+        with self.lock:
+            self.flush()
+            return self.store.get_page(collection, offset, limit)
+
+    def get_ratings(self, collection: str,
+                    names: List[str]) -> Dict[str, float]:
+        """Gets the ratings of some players in a collection.
+
+        Args:
+            collection: The name of the collection.
+            names: The names of the players.
+
+        Returns:
+            A map from the name of each of the players who has a rating to
+            their rating.
+        """
+        return self.store.get_ratings(collection, names)
+
+    def set_ratings(self, collection: str, ratings: Dict[str, float]) -> None:
+        """Stores the ratings of players in a collection. Ratings are not
+        buffered.
+
+        Args:
+            collection: The name of the collection.
+            ratings: A map from each player's name to their new rating.
+        """
+        self.store.set_ratings(collection, ratings)
+
+    def clear(self, collection: str) -> None:
+        """Removes all data from a collection, including buffered updates.
+
+        Args:
+            collection: The name of the collection.
+        """
+        with self.lock:
+            self.pending.pop(collection, None)
+            self.store.clear(collection)
+
+    def close(self) -> None:
+        """Writes all buffered updates and stops the flush timer."""
+        self.flush()
+        atexit.unregister(self.flush)
+
+
 class Leaderboard():
     """A controller for the leaderboard - handles getting existing
-    entries and adding new ones."""
+    entries and adding new ones.
 
-    def __init__(self, collection: str = "scoreboard") -> None:
+    Scores are kept in ReplitDB by default. Pass a ShardedStore to give
+    each writing process its own keys in ReplitDB, or a SQLiteStore to keep
+    them in a local SQLite database. Any store can be wrapped in a
+    WriteBehindStore to write scores in batches.
+
+    Players are also rated by the results of their games, including draws,
+    so that the strength of their opponents counts. Ratings are kept in the
+    same store as the scores, one per player, and the players' current
+    ratings are read from the store whenever a game is recorded, so several
+    processes can rate players in the same collection.
+    """
+
+    def __init__(
+            self,
+            collection: str = "scoreboard",
+            store: Union[ListStore, ShardedStore, SQLiteStore,
+                         WriteBehindStore] = None,
+            ratings: RatingEngine = None) -> None:
         self.collection = collection
-        if db.get(self.collection, None) is None:
-            try:
-                db.set(self.collection, [])
-            except AttributeError:
-                db[self.collection] = []
+        self.store = store if store is not None else ListStore()
+        self.store.open(self.collection)
+        # The ratings of the players this leaderboard has rated
+        self.ratings = ratings if ratings is not None else RatingEngine()
 
     def new_entry(self, player_name: str) -> None:
         """Add a new entry to the leaderboard. If the player is already
@@ -27,16 +1465,44 @@ class Leaderboard():
         Args:
             player_name: The name of the player to be added.
         """
-        existing_names = list(
-            map(lambda x: x["name"], db.get(self.collection, [])))
-        if player_name in existing_names:
-            index = existing_names.index(player_name)
-            db.get(self.collection, [])[index]["score"] += 1
-        else:
-            db.get(self.collection, []).append({
-                "name": player_name,
-                "score": 1
-            })
+        self.store.add(self.collection, {player_name: 1})
+
+    def record_game(self, game: Game) -> None:
+        """Records the result of a finished game. The winner, if there is
+        one, gets an additional point, and both players are rated.
+
+        Args:
+            game: The finished game.
+        """
+        winner = game.get_game_winner()
+        if winner is not None:
+            self.new_entry(winner.get_name())
+        # Start from the stored ratings, which other processes may have
+        # changed, and only write back the two players' new ratings
+        names = [
+            game.get_player_1().get_name(),
+            game.get_player_2().get_name()
+        ]
+        for name in names:
+            self.ratings.set_rating(name, self.get_rating(name))
+        rating_1, rating_2 = self.ratings.record_game(game)
+        self.store.set_ratings(self.collection, {
+            names[0]: rating_1,
+            names[1]: rating_2
+        })
+
+    def get_rating(self, player_name: str) -> float:
+        """Gets the stored rating of a player.
+
+        Args:
+            player_name: The name of the player.
+
+        Returns:
+            The player's rating, or the default rating if they have not
+            played.
+        """
+        return self.store.get_ratings(self.collection, [player_name]).get(
+            player_name, DEFAULT_RATING)
 
     def get_data(self) -> List[Union[str, int]]:
         """Gets the current scoreboard data as a list of lists, where the first
@@ -47,17 +1513,60 @@ class Leaderboard():
         Returns:
             The leaderboard data.
         """
-        data = sorted(map(lambda x: [x["name"], x["score"]],
-                          db.get(self.collection, [])),
-                      key=lambda x: x[1],
-                      reverse=True)
-        if len(data) < 6:
-            return data
-        return data[:5]
+        return self.store.get_top(self.collection, 5)
+
+    def get_rank(self, player_name: str) -> Union[int, None]:
+        """Gets the position of a player on the leaderboard, where players
+        with equal scores share a position.
+
+        Args:
+            player_name: The name of the player.
+
+        Returns:
+            The player's position, from 1, or None if they have no score.
+        """
+        return self.store.get_rank(self.collection, player_name)
+
+    def get_page(self, offset: int,
+                 limit: int) -> List[List[Union[str, int]]]:
+        """Gets a page of the leaderboard, in the same form as get_data.
+
+        Args:
+            offset: The number of entries before the page.
+            limit: The maximum number of entries on the page.
+
+        Returns:
+            The entries on the page.
+        """
+        return self.store.get_page(self.collection, offset, limit)
+
+    def get_around(self, player_name: str,
+                   count: int) -> List[List[Union[str, int]]]:
+        """Gets the entries around a player on the leaderboard: up to count
+        entries above them, the player, and up to count entries below them.
+        The player is placed first among players with equal scores.
+
+        Args:
+            player_name: The name of the player.
+            count: The number of entries to get on each side of the player.
+
+        Returns:
+            The entries, in the same form as get_data, or an empty list if
+            the player has no score.
+        """
+        rank = self.get_rank(player_name)
+        if rank is None:
+            return []
+        above = min(count, rank - 1)
+        data = self.get_page(rank - 1 - above, above)
+        below = [
+            row for row in self.get_page(rank - 1, count + 1)
+            if row[0] != player_name
+        ]
+        score = self.store.get_score(self.collection, player_name)
+        return data + [[player_name, score]] + below[:count]
 
     def clear_data(self) -> None:
-        """Removes all data from the scoreboard."""
-        try:
-            db.set(self.collection, None)
-        except AttributeError:
-            db[self.collection] = None
+        """Removes all data from the scoreboard, including ratings."""
+        self.store.clear(self.collection)
+        self.ratings = RatingEngine(self.ratings.k_factor)
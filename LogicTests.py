@@ -1,12 +1,53 @@
+import asyncio
+import json
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
 import unittest
+from concurrent.futures import ProcessPoolExecutor
+from fractions import Fraction
+from unittest import mock
 
+import numpy as np
+
+import Benchmark
 from Character import Character, Assault, Health, Magic
+from Computer import ComputerPlayer, choose_best_character
+from Engine import Engine, FixedStrategy, Strategy
 from Game import Game
-from Leaderboard import Leaderboard
+from FenwickTree import FenwickTree
+from Leaderboard import (Leaderboard, ListStore, ScoreIndex, ShardedStore,
+                         SQLiteStore, WriteBehindStore)
+from Matchmaking import MatchmakingQueue
+from Metrics import Histogram, Metrics
 from Player import Player
+from Rating import RankIndex, RatingEngine, expected_score
+from Replay import (ATTACK, END, GAME, SNAPSHOT, ReplayReader,
+                    ReplayWriter, decode_varint, encode_varint, get_snapshot,
+                    replay_game, restore_snapshot)
+from Sampling import (AliasTable, AliasTableSet, attack_distribution,
+                      get_attack_table, roll_distribution)
+from Search import MonteCarloSearch
+from Server import Client, GameServer, Session
+from SessionStore import SessionStore
+from Simulator import BattleSimulator
+from StateTable import GameStateTable
+from Solver import STRENGTHS, BattleSolver, PolicySolver, PolicyTable
+from Tournament import Tournament
+from Tracer import Tracer
+
+
+# pylama:ignore=C0116,C0302
+def add_sqlite_entries(path: str) -> None:
+    store = SQLiteStore(path)
+    for _ in range(50):
+        Leaderboard("test", store).new_entry("Player 1")
+    store.close()
 
 
-# pylama:ignore=C0116
 class TestCharacter(unittest.TestCase):
     CHARACTER_NAME = "Character"
     CHARACTER_HEALTH = 100
@@ -128,53 +169,68 @@ class TestPlayer(unittest.TestCase):
 
     def setUp(self):
         self.player = Player(TestPlayer.PLAYER_NAME)
-        Player.reset_available_characters()
+        self.game = Game()
 
     def test_name_getter(self):
         self.assertEqual(self.player.get_name(), TestPlayer.PLAYER_NAME)
 
     def test_available_characters(self):
-        self.assertTrue(Assault in Player.get_available_characters())
-        self.assertTrue(Health in Player.get_available_characters())
-        self.assertTrue(Magic in Player.get_available_characters())
+        self.assertTrue(Assault in self.game.get_available_characters())
+        self.assertTrue(Health in self.game.get_available_characters())
+        self.assertTrue(Magic in self.game.get_available_characters())
 
     def test_reset_available_characters(self):
-        self.player.choose_character("Assault", None)
-        Player.reset_available_characters()
-        self.assertTrue(Assault in Player.get_available_characters())
-        self.assertTrue(Health in Player.get_available_characters())
-        self.assertTrue(Magic in Player.get_available_characters())
+        self.player.choose_character("Assault", None,
+                                     self.game.characters)
+        self.game.reset_available_characters()
+        self.assertTrue(Assault in self.game.get_available_characters())
+        self.assertTrue(Health in self.game.get_available_characters())
+        self.assertTrue(Magic in self.game.get_available_characters())
 
     def test_choose_assault(self):
-        result = self.player.choose_character("Assault", None)
+        result = self.player.choose_character("Assault", None,
+                                              self.game.characters)
         self.assertTrue(result)
-        self.assertTrue(Assault not in Player.get_available_characters())
-        self.assertTrue(Health in Player.get_available_characters())
-        self.assertTrue(Magic in Player.get_available_characters())
+        self.assertTrue(Assault not in self.game.get_available_characters())
+        self.assertTrue(Health in self.game.get_available_characters())
+        self.assertTrue(Magic in self.game.get_available_characters())
         self.assertTrue(isinstance(self.player.get_character(), Assault))
 
     def test_choose_health(self):
-        result = self.player.choose_character("Health", None)
+        result = self.player.choose_character("Health", None,
+                                              self.game.characters)
         self.assertTrue(result)
-        self.assertTrue(Assault in Player.get_available_characters())
-        self.assertTrue(Health not in Player.get_available_characters())
-        self.assertTrue(Magic in Player.get_available_characters())
+        self.assertTrue(Assault in self.game.get_available_characters())
+        self.assertTrue(Health not in self.game.get_available_characters())
+        self.assertTrue(Magic in self.game.get_available_characters())
         self.assertTrue(isinstance(self.player.get_character(), Health))
 
     def test_choose_magic(self):
-        result = self.player.choose_character("Magic", None)
+        result = self.player.choose_character("Magic", None,
+                                              self.game.characters)
         self.assertTrue(result)
-        self.assertTrue(Assault in Player.get_available_characters())
-        self.assertTrue(Health in Player.get_available_characters())
-        self.assertTrue(Magic not in Player.get_available_characters())
+        self.assertTrue(Assault in self.game.get_available_characters())
+        self.assertTrue(Health in self.game.get_available_characters())
+        self.assertTrue(Magic not in self.game.get_available_characters())
         self.assertTrue(isinstance(self.player.get_character(), Magic))
 
+    def test_separate_games(self):
+        other = Game()
+        self.assertTrue(self.game.choose_character(self.player, "Magic", ""))
+        self.assertFalse(self.game.is_character_available("Magic"))
+        self.assertTrue(other.is_character_available("Magic"))
+        self.assertTrue(other.choose_character(Player("Player 2"), "Magic",
+                                               ""))
+        self.assertFalse(self.game.choose_character(Player("Player 3"),
+                                                    "Magic", ""))
+
     def test_choose_invalid(self):
-        result = self.player.choose_character("", None)
+        result = self.player.choose_character("", None,
+                                              self.game.characters)
         self.assertFalse(result)
-        self.assertTrue(Assault in Player.get_available_characters())
-        self.assertTrue(Health in Player.get_available_characters())
-        self.assertTrue(Magic in Player.get_available_characters())
+        self.assertTrue(Assault in self.game.get_available_characters())
+        self.assertTrue(Health in self.game.get_available_characters())
+        self.assertTrue(Magic in self.game.get_available_characters())
         self.assertEqual(self.player.get_character(), None)
 
 
@@ -186,9 +242,8 @@ class TestGame(unittest.TestCase):
         self.game = Game()
         self.player_1 = Player(TestGame.PLAYER_1_NAME)
         self.player_2 = Player(TestGame.PLAYER_2_NAME)
-        self.player_1.choose_character("Assault", "")
-        self.player_2.choose_character("Health", "")
-        Player.reset_available_characters()
+        self.game.choose_character(self.player_1, "Assault", "")
+        self.game.choose_character(self.player_2, "Health", "")
 
     def test_player_1_getter(self):
         self.assertEqual(self.game.get_player_1(), None)
@@ -257,6 +312,974 @@ class TestGame(unittest.TestCase):
         self.game.get_player_1().get_character().take_damage(100)
         self.assertTrue(self.game.is_game_over())
 
+    def test_resolve_round(self):
+        self.game.set_players(self.player_1, self.player_2)
+        self.game.get_player_2().get_character().take_damage(100)
+        self.assertEqual(self.game.resolve_round(), self.player_1)
+        self.game.get_player_1().get_character().take_damage(100)
+        self.assertEqual(self.game.resolve_round(), None)
+        self.assertEqual(self.game.get_game_winner(), self.player_1)
+
+
+class TestGameStateTable(unittest.TestCase):
+    def setUp(self):
+        self.table = GameStateTable()
+        self.game = Engine(random.Random(1)).play_game(Strategy(), Strategy())
+
+    def test_round_trip(self):
+        self.table.append(Game())
+        index = self.table.append(self.game)
+        self.assertEqual(len(self.table), 2)
+        self.assertEqual(self.table.get_size(), 30)
+        game = self.table.get_game(index)
+        self.assertEqual(game.round, self.game.round)
+        self.assertEqual(game.wins, self.game.wins)
+        self.assertEqual(game.get_current_player().get_name(),
+                         self.game.get_current_player().get_name())
+        for player in ("get_player_1", "get_player_2"):
+            character = getattr(game, player)().get_character()
+            original = getattr(self.game, player)().get_character()
+            self.assertIs(type(character), type(original))
+            self.assertEqual(character.get_health(), original.get_health())
+            self.assertEqual(character.get_damage_ticks(),
+                             original.get_damage_ticks())
+        self.assertEqual(self.table.get_game(0).order, [None, None])
+
+    def test_slots(self):
+        player = self.game.get_player_1()
+        for value in (self.game, player, player.get_character()):
+            with self.assertRaises(AttributeError):
+                setattr(value, "extra", None)
+
+
+class TestReplay(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "replay.bin")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_varint(self):
+        for value in (0, 1, 127, 128, 300, 2**40):
+            buffer = bytearray()
+            encode_varint(value, buffer)
+            self.assertEqual(decode_varint(buffer, 0), (value, len(buffer)))
+        buffer = bytearray()
+        encode_varint(300, buffer)
+        self.assertEqual(buffer, b"\xac\x02")
+
+    def test_replay(self):
+        writer = ReplayWriter(self.path)
+        engine = Engine(random.Random(1), writer)
+        games = [engine.play_game(Strategy(), Strategy()) for _ in range(20)]
+        writer.close()
+        replays = list(ReplayReader(self.path).read_games())
+        self.assertEqual(len(replays), 20)
+        for game, events in zip(games, replays):
+            self.assertEqual(events[0][0], GAME)
+            self.assertEqual(events[-1][0], END)
+            self.assertEqual(events[4][0], ATTACK)
+            replayed = replay_game(events)
+            self.assertEqual(replayed.wins, game.wins)
+            self.assertEqual(replayed.round, game.round)
+            for player in ("get_player_1", "get_player_2"):
+                character = getattr(replayed, player)().get_character()
+                original = getattr(game, player)().get_character()
+                self.assertIs(type(character), type(original))
+                self.assertEqual(character.get_health(),
+                                 original.get_health())
+                self.assertEqual(character.get_damage_ticks(),
+                                 original.get_damage_ticks())
+
+    def test_seed(self):
+        writer = ReplayWriter(self.path)
+        engine = Engine(recorder=writer, seed="test")
+        games = [engine.play_game(Strategy(), Strategy()) for _ in range(5)]
+        writer.close()
+        replays = list(ReplayReader(self.path).read_games())
+        self.assertEqual([x[0][1] for x in replays],
+                         [f"test:{x}" for x in range(5)])
+        # Each recorded seed plays its game again on its own
+        for game, events in zip(games, replays):
+            again = Engine(random.Random(events[0][1])).play_game(
+                Strategy(), Strategy())
+            self.assertEqual(again.wins, game.wins)
+            self.assertEqual(again.round, game.round)
+
+    def test_seek(self):
+        writer = ReplayWriter(self.path, 5)
+        engine = Engine(random.Random(1), writer)
+        for _ in range(10):
+            engine.play_game(Strategy(), Strategy())
+        writer.close()
+        reader = ReplayReader(self.path)
+        events = [x for x in reader.read_events() if x[0] != SNAPSHOT]
+        self.assertEqual(reader.count_events(), len(events))
+        self.assertGreater(os.path.getsize(reader.index_path) // 17, 10)
+        start = 0
+        for number, event in enumerate(events):
+            if event[0] == GAME:
+                start = number
+            expected = replay_game(events[start:number + 1])
+            game = reader.get_game(number)
+            self.assertEqual(game.wins, expected.wins)
+            self.assertEqual(game.round, expected.round)
+            self.assertEqual(game.current_player, expected.current_player)
+            for player in ("player_1", "player_2"):
+                character = getattr(game, player).get_character()
+                original = getattr(expected, player).get_character()
+                if original is None:
+                    self.assertIsNone(character)
+                    continue
+                self.assertEqual(character.get_name(), original.get_name())
+                self.assertEqual(character.get_health(),
+                                 original.get_health())
+                self.assertEqual(character.get_damage_ticks(),
+                                 original.get_damage_ticks())
+        with self.assertRaises(IndexError):
+            reader.get_game(len(events))
+
+    def test_rebuild_index(self):
+        writer = ReplayWriter(self.path, 5)
+        Engine(random.Random(1), writer).play_game(Strategy(), Strategy())
+        writer.close()
+        with open(self.path + ".idx", "rb") as file:
+            index = file.read()
+        os.remove(self.path + ".idx")
+        writer = ReplayWriter(self.path, 5)
+        with open(self.path + ".idx", "rb") as file:
+            self.assertEqual(file.read(), index)
+        self.assertEqual(writer.events, ReplayReader(self.path).count_events())
+        writer.close()
+
+    def test_append(self):
+        for _ in range(2):
+            writer = ReplayWriter(self.path)
+            Engine(random.Random(1), writer).play_game(Strategy(), Strategy())
+            writer.close()
+        self.assertEqual(len(list(ReplayReader(self.path).read_games())), 2)
+
+
+class TestSessionStore(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.evicted = {}
+        self.store = SessionStore(3, 10.0, self.evicted.__setitem__,
+                                  lambda x: self.evicted.pop(x, None),
+                                  lambda: self.now)
+
+    def test_lru(self):
+        for session_id in "abc":
+            self.store.put(session_id, session_id.upper())
+        self.assertEqual(self.store.get("a"), "A")
+        self.store.put("d", "D")
+        # b was the least recently used
+        self.assertEqual(self.evicted, {"b": "B"})
+        self.assertEqual(list(self.store.sessions), ["c", "a", "d"])
+        self.assertEqual(len(self.store), 3)
+
+    def test_ttl(self):
+        self.store.put("a", "A")
+        self.now = 6.0
+        self.store.put("b", "B")
+        self.now = 12.0
+        self.assertEqual(self.store.expire(), 1)
+        self.assertNotIn("a", self.store)
+        self.now = 17.0
+        self.store.loader = None
+        self.assertIsNone(self.store.get("b"))
+        self.assertEqual(self.evicted, {"a": "A", "b": "B"})
+
+    def test_resume(self):
+        self.store.put("a", "A")
+        self.now = 11.0
+        self.assertEqual(self.store.get("a"), "A")
+        self.assertIn("a", self.store)
+        self.assertIsNone(self.store.get("z"))
+        self.assertEqual(self.store.remove("a"), "A")
+        self.assertEqual(self.evicted, {})
+        self.assertEqual(
+            self.store.get_stats(), {
+                "hits": 0,
+                "misses": 2,
+                "loads": 1,
+                "evictions": 1,
+                "expirations": 1,
+                "size": 0
+            })
+
+
+class TestMatchmakingQueue(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.queue = MatchmakingQueue(clock=lambda: self.now)
+
+    def test_fenwick_tree(self):
+        tree = FenwickTree(10)
+        for index in (2, 2, 5, 9):
+            tree.add(index)
+        self.assertEqual(tree.prefix_sum(4), 2)
+        self.assertEqual([tree.find(k) for k in range(5)], [2, 2, 5, 9, 10])
+        self.assertEqual(tree.get_previous(4), 2)
+        self.assertEqual(tree.get_previous(1), -1)
+        self.assertEqual(tree.get_next(6), 9)
+        tree.add(9, -1)
+        self.assertEqual(tree.get_next(6), 10)
+
+    def test_pair(self):
+        self.queue.enqueue("A", 1500)
+        self.queue.enqueue("B", 1800)
+        self.queue.enqueue("C", 1530)
+        self.assertEqual(self.queue.find_match("B"), None)
+        self.assertEqual(self.queue.pair("C"), ("C", "A"))
+        self.assertEqual(len(self.queue), 1)
+        self.assertTrue(self.queue.dequeue("B"))
+        self.assertFalse(self.queue.dequeue("B"))
+        with self.assertRaises(ValueError):
+            self.queue.enqueue("D", 1000)
+            self.queue.enqueue("D", 1000)
+
+    def test_widening(self):
+        self.queue.enqueue("A", 1000)
+        self.queue.enqueue("B", 1200)
+        self.assertEqual(self.queue.find_match("A"), None)
+        # Both ranges have grown to 150 but not yet to 200
+        self.now = 10.0
+        self.assertEqual(self.queue.find_match("A"), None)
+        self.now = 15.0
+        self.assertEqual(self.queue.find_match("A"), "B")
+        # A newcomer's range has not grown
+        self.queue.enqueue("C", 1080)
+        self.assertEqual(self.queue.find_match("C"), None)
+
+    def test_pair_batch(self):
+        for index, rating in enumerate([1000, 1600, 1020, 1630, 2500]):
+            self.queue.enqueue(str(index), rating)
+        self.assertEqual(self.queue.pair_batch(), [("0", "2"), ("1", "3")])
+        self.assertEqual(len(self.queue), 1)
+        self.assertIn("4", self.queue)
+
+
+class TestGameServer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.leaderboard = Leaderboard("server-test")
+        self.leaderboard.clear_data()
+        self.server = GameServer(self.leaderboard)
+        server = await self.server.start("127.0.0.1", 0)
+        self.port = server.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        await self.server.close()
+        self.leaderboard.clear_data()
+
+    async def connect(self):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+
+        async def send(**request):
+            writer.write(json.dumps(request).encode() + b"\n")
+            return json.loads(await reader.readline())
+
+        return send, writer
+
+    async def play(self, names):
+        send_1, writer_1 = await self.connect()
+        send_2, writer_2 = await self.connect()
+        reply = await send_1(op="create", players=names)
+        session = reply["session"]
+        reply = await send_2(op="join", session=session, token=reply["token"])
+        self.assertTrue(reply["ok"])
+        clients = dict(zip(names, [send_1, send_2]))
+        reply = await send_2(op="toss", session=session, choice="Heads")
+        self.assertEqual(reply["error"], "It is not your turn.")
+        reply = await send_1(op="toss", session=session, choice="Heads")
+        self.assertIn(reply["outcome"], ["Heads", "Tails"])
+        send = clients[reply["state"]["turn"]]
+        reply = await send(op="choose", session=session, character="Magic")
+        self.assertTrue(reply["ok"])
+        other = clients[reply["state"]["turn"]]
+        reply = await send(op="choose", session=session, character="Health")
+        self.assertEqual(reply["error"], "It is not your turn.")
+        send = other
+        reply = await send(op="choose", session=session, character="Magic")
+        self.assertFalse(reply["ok"])
+        reply = await send(op="choose", session=session, character="Health")
+        self.assertTrue(reply["ok"])
+        while not reply["state"]["finished"]:
+            send = clients[reply["state"]["turn"]]
+            reply = await send(op="attack", session=session, strength="agg")
+            self.assertTrue(reply["ok"])
+        # Finished games are removed once their result is recorded
+        self.assertEqual(
+            (await send_state(self.port, session))["error"],
+            "Unknown session.")
+        writer_1.close()
+        writer_2.close()
+        return reply["state"]
+
+    async def test_game(self):
+        state = await self.play(["Player 1", "Player 2"])
+        self.assertTrue(state["finished"])
+        self.assertEqual(state["round"], 3)
+        self.assertEqual(
+            {x["class"] for x in state["players"]}, {"Magic", "Health"})
+        if state["winner"] is not None:
+            self.assertEqual(self.leaderboard.get_data()[0][0],
+                             state["winner"])
+
+    async def test_record_error(self):
+        client = Client()
+
+        async def send(**request):
+            return await self.server.handle_line(
+                json.dumps(request).encode(), client)
+
+        reply = await send(op="create", players=["A", "B"])
+        session = reply["session"]
+        await send(op="join", session=session, token=reply["token"])
+        await send(op="toss", session=session, choice="Heads")
+        await send(op="choose", session=session, character="Magic")
+        await send(op="choose", session=session, character="Health")
+        error = sqlite3.OperationalError("database is locked")
+        with mock.patch.object(self.leaderboard, "record_game",
+                               side_effect=error):
+            while reply.get("ok", True) and not reply.get(
+                    "state", {}).get("finished"):
+                reply = await send(op="attack", session=session,
+                                   strength="agg")
+        self.assertEqual(reply["error"], "The result could not be recorded.")
+        # The finished session is removed even though recording failed
+        self.assertIsNone(self.server.sessions.get(session))
+
+    async def test_join(self):
+        send_1, writer_1 = await self.connect()
+        send_2, writer_2 = await self.connect()
+        reply = await send_1(op="create", players=["A", "B"])
+        session = reply["session"]
+        self.assertEqual(
+            (await send_2(op="join", session=session, token="guess"))["error"],
+            "The token is not valid for this game.")
+        await send_2(op="join", session=session, token=reply["token"])
+        self.assertFalse((await send_1(op="join", session=session,
+                                       token=reply["token"]))["ok"])
+        writer_1.close()
+        writer_2.close()
+
+    async def test_concurrent_games(self):
+        states = await asyncio.gather(
+            *[self.play([f"A{x}", f"B{x}"]) for x in range(50)])
+        self.assertEqual(len({x["session"] for x in states}), 50)
+        self.assertEqual(
+            sum(x["winner"] is not None for x in states),
+            sum(x[1] for x in self.leaderboard.store.get_top(
+                "server-test", 100)))
+
+    async def test_errors(self):
+        client = Client()
+        self.assertEqual(
+            (await self.server.handle_line(b"nonsense", client))["ok"],
+            False)
+        reply = await self.server.handle_line(b'{"op": "fly"}', client)
+        self.assertEqual(reply["error"], "Unknown op 'fly'.")
+        reply = await self.server.handle_line(b'{"op": "state"}', client)
+        self.assertEqual(reply["error"], "Unknown session.")
+
+    async def test_queue(self):
+        client_a, client_b = Client(), Client()
+        replies = await asyncio.gather(
+            self.server.handle_line(
+                b'{"op": "queue", "player": "A", "rating": 1500}', client_a),
+            self.server.handle_line(
+                b'{"op": "queue", "player": "B", "rating": 1520}', client_b))
+        self.assertEqual(replies[0]["session"], replies[1]["session"])
+        self.assertEqual(
+            [x["name"] for x in replies[0]["state"]["players"]], ["A", "B"])
+        # Only player 1 can call the coin toss
+        toss = json.dumps({"op": "toss", "session": replies[0]["session"],
+                           "choice": "Tails"}).encode()
+        reply = await self.server.handle_line(toss, client_b)
+        self.assertEqual(reply["error"], "It is not your turn.")
+        self.assertTrue((await self.server.handle_line(toss, client_a))["ok"])
+        reply = await self.server.handle_line(
+            b'{"op": "queue", "player": "C", "timeout": 0.01}', Client())
+        self.assertEqual(reply["error"], "No opponent was found.")
+        self.assertNotIn("C", self.server.matchmaker)
+        for value in [b"NaN", b"Infinity", b"1e400"]:
+            reply = await self.server.handle_line(
+                b'{"op": "queue", "player": "D", "rating": ' + value + b"}",
+                Client())
+            self.assertEqual(reply["error"],
+                             "The rating and timeout must be numbers.")
+        self.assertEqual(self.server.waiting, {})
+
+    async def test_evicted_session(self):
+        snapshots = {}
+
+        def persist(session_id, session):
+            snapshots[session_id] = get_snapshot(session.game)
+
+        def resume(session_id):
+            session = Session(session_id, "", "")
+            session.game = restore_snapshot((SNAPSHOT, ) +
+                                            snapshots.pop(session_id))
+            session.tossed = True
+            return session
+
+        server = GameServer(self.leaderboard, SessionStore(1, None, persist,
+                                                           resume))
+        client = Client()
+
+        async def send(line):
+            return await server.handle_line(line, client)
+
+        reply = await send(b'{"op": "create", "players": ["A", "B"]}')
+        session = reply["session"]
+        # One client can play both players by joining its own game
+        for request in ({"op": "join", "token": reply["token"]},
+                        {"op": "toss", "choice": "Heads"},
+                        {"op": "choose", "character": "Magic"},
+                        {"op": "choose", "character": "Health"},
+                        {"op": "attack", "strength": "bal"}):
+            reply = await send(
+                json.dumps(dict(request, session=session)).encode())
+        await send(b'{"op": "create"}')
+        self.assertIn(session, snapshots)
+        resumed = await send(
+            json.dumps({"op": "state", "session": session}).encode())
+        self.assertEqual(resumed["state"]["players"],
+                         reply["state"]["players"])
+        stats = (await send(b'{"op": "stats"}'))["stats"]
+        self.assertEqual((stats["loads"], stats["evictions"]), (1, 2))
+
+
+async def send_state(port, session):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(json.dumps({"op": "state", "session": session}).encode() +
+                 b"\n")
+    reply = json.loads(await reader.readline())
+    writer.close()
+    return reply
+
+
+class TestEngine(unittest.TestCase):
+    def setUp(self):
+        self.engine = Engine()
+
+    def test_play_game(self):
+        game = self.engine.play_game(FixedStrategy("agg", "Assault"),
+                                     FixedStrategy("con", "Magic"))
+        self.assertTrue(game.is_game_over())
+        self.assertTrue(
+            isinstance(game.get_player_1().get_character(), Assault))
+        self.assertTrue(
+            isinstance(game.get_player_2().get_character(), Magic))
+        self.assertEqual(game.get_available_characters(), [Health])
+
+    def test_character_clash(self):
+        game = self.engine.play_game(FixedStrategy("bal", "Health"),
+                                     FixedStrategy("bal", "Health"))
+        characters = {
+            type(game.get_player_1().get_character()),
+            type(game.get_player_2().get_character())
+        }
+        self.assertEqual(len(characters), 2)
+        self.assertTrue(Health in characters)
+
+    def test_run(self):
+        results = self.engine.run(Strategy(), Strategy(), 50)
+        self.assertEqual(sum(results), 50)
+
+    def test_seeded_run(self):
+        results = Engine(random.Random(1)).run(Strategy(), Strategy(), 50)
+        self.assertEqual(
+            Engine(random.Random(1)).run(Strategy(), Strategy(), 50),
+            results)
+
+
+class TestSampling(unittest.TestCase):
+    def test_roll_distribution(self):
+        distribution = roll_distribution(20, *map(Fraction, ["0.6", "0.8"]))
+        self.assertEqual(sum(distribution.values()), 1)
+        self.assertEqual(min(distribution), 12)
+        self.assertEqual(max(distribution), 16)
+        self.assertEqual(distribution[12], Fraction(1, 8))
+
+    def test_alias_table(self):
+        table = AliasTable([1, 2, 3], [Fraction(1, 2), 0, Fraction(1, 2)])
+        rng = random.Random(1)
+        draws = [table.sample(rng) for _ in range(10000)]
+        self.assertNotIn(2, draws)
+        self.assertAlmostEqual(draws.count(1) / 10000, 0.5, delta=0.02)
+
+    def test_attack_table(self):
+        distribution = attack_distribution(30, "agg")
+        table = get_attack_table(30, "agg")
+        self.assertIs(get_attack_table(30, "agg"), table)
+        draws = table.sample_many(np.random.default_rng(1), 50000)
+        for outcome, probability in distribution.items():
+            self.assertAlmostEqual(np.mean(np.all(draws == outcome, axis=1)),
+                                   float(probability),
+                                   delta=0.005)
+
+    def test_alias_table_set(self):
+        tables = AliasTableSet(
+            [get_attack_table(15, "con"),
+             get_attack_table(30, "agg")])
+        rows = np.array([0, 1] * 500)
+        draws = tables.sample_many(np.random.default_rng(1), rows)
+        self.assertTrue(np.all(draws[rows == 0, 1] == 0))
+        self.assertTrue(np.all((draws[rows == 0, 0] >= 6)
+                               & (draws[rows == 0, 0] <= 9)))
+        self.assertTrue(np.all(draws[rows == 1, 0] >= 24))
+
+    def test_character_attack(self):
+        character = Character("Character", 100, 20, random.Random(1))
+        distribution = attack_distribution(20, "bal")
+        for _ in range(200):
+            opponent = Character("Opponent", 100, 20)
+            self.assertIn(character.attack(opponent, "bal"), distribution)
+            character.reset_health()
+
+
+class TestBattleSolver(unittest.TestCase):
+    def setUp(self):
+        self.solver = BattleSolver(Assault, Health, {"agg": 1}, {"bal": 1})
+        self.solver.solve()
+
+    def test_probabilities(self):
+        for turn in (0, 1):
+            probabilities = self.solver.get_round_probabilities(turn=turn)
+            self.assertAlmostEqual(sum(probabilities), 1)
+        self.assertAlmostEqual(sum(self.solver.get_game_probabilities()), 1)
+        self.assertAlmostEqual(
+            self.solver.get_round_probabilities(100, 10, 0, 0, 0)[0], 1)
+
+    def test_matches_simulator(self):
+        simulator = BattleSimulator(Assault, Health, 20000,
+                                    np.random.default_rng(1))
+        simulator.reset(0)
+        results = simulator.run("agg", "bal")
+        probabilities = self.solver.get_round_probabilities()
+        for outcome in range(3):
+            self.assertAlmostEqual(np.mean(results == outcome),
+                                   probabilities[outcome],
+                                   delta=0.02)
+
+    def test_save(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "solver.pickle")
+        self.solver.save(path)
+        loaded = BattleSolver.load(path)
+        self.assertEqual(loaded.table, self.solver.table)
+        self.assertEqual(loaded.character_2, Health)
+        shutil.rmtree(directory)
+
+
+class TestComputerPlayer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.solver = PolicySolver(Assault, Health)
+        cls.solver.solve()
+        cls.policy = PolicyTable()
+        cls.policy.add_solver(cls.solver)
+
+    def test_policy_table(self):
+        assault = Assault("Assault")
+        health = Health("Health")
+        for state, code in self.solver.actions.items():
+            assault.health, health.health = state[:2]
+            if state[4] == 0:
+                self.assertEqual(self.policy.choose(assault, health),
+                                 STRENGTHS[code])
+            else:
+                self.assertEqual(self.policy.choose(health, assault),
+                                 STRENGTHS[code])
+
+    def test_values(self):
+        self.assertAlmostEqual(
+            self.policy.get_value("Assault", "Health") +
+            self.policy.get_value("Health", "Assault"), 1)
+        self.assertGreater(self.policy.get_value("Assault", "Health"), 0.5)
+        self.assertEqual(self.policy.get_value("Magic", "Health"), 0.5)
+
+    def test_choose_character(self):
+        self.assertEqual(
+            choose_best_character(self.policy, ["Assault", "Health"]),
+            "Assault")
+        game = Game()
+        opponent = Player("Player 1")
+        game.choose_character(opponent, "Health", "")
+        computer = ComputerPlayer("Computer", self.policy)
+        choice = computer.choose_character_class(opponent,
+                                                 list(game.characters))
+        self.assertEqual(choice, "Assault")
+        game.choose_character(computer, choice, "")
+        self.assertIn(computer.choose_attack(opponent), STRENGTHS)
+
+    def test_save(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "policy.bin")
+        self.policy.save(path)
+        loaded = PolicyTable.load(path)
+        self.assertEqual(loaded.tables, self.policy.tables)
+        self.assertEqual(loaded.values, self.policy.values)
+        shutil.rmtree(directory)
+
+
+class TestMonteCarloSearch(unittest.TestCase):
+    def setUp(self):
+        self.search = MonteCarloSearch(0.02, rng=random.Random(1))
+        self.assault = Assault("Assault")
+        self.health = Health("Health")
+
+    def test_step(self):
+        state = MonteCarloSearch.get_state(self.assault, self.health)
+        self.assertEqual(state, (0, 1, 100, 100, 0, 0))
+        state, score = self.search.step(state, 0)
+        self.assertEqual(score, 0)
+        self.assertEqual(state[:2], (1, 0))
+        self.assertTrue(82 <= state[2] <= 88)
+        self.assertEqual(state[3:], (100, 0, 0))
+        self.assertEqual(self.search.step((0, 1, 100, 5, 0, 0), 0),
+                         (None, 1.0))
+
+    def test_search(self):
+        start = time.perf_counter()
+        self.assertIn(self.search.search(self.assault, self.health),
+                      STRENGTHS)
+        self.assertLess(time.perf_counter() - start, 0.5)
+        root = MonteCarloSearch.get_state(self.assault, self.health)
+        # The first iteration only adds the root to the table
+        self.assertEqual(self.search.table[root][0] + 1,
+                         self.search.iterations)
+        # Any attack but a conservative one would be suicide
+        self.assault.health = 10
+        self.assertEqual(self.search.search(self.assault, self.health), "con")
+
+    def test_computer_player(self):
+        game = Game()
+        opponent = Player("Player 1")
+        game.choose_character(opponent, "Health", "")
+        computer = ComputerPlayer("Computer", self.search)
+        game.choose_character(
+            computer,
+            computer.choose_character_class(opponent, list(game.characters)),
+            "")
+        self.assertIn(computer.choose_attack(opponent), STRENGTHS)
+
+
+class TestTournament(unittest.TestCase):
+    def setUp(self):
+        self.strategies = {
+            "random": Strategy(),
+            "aggressive": FixedStrategy("agg")
+        }
+
+    def test_pairings(self):
+        tournament = Tournament(self.strategies)
+        self.assertEqual(len(tournament.get_pairings()), 24)
+
+    def test_worker_count_independence(self):
+        serial = Tournament(self.strategies, 7, 1, 4).run(10)
+        parallel = Tournament(self.strategies, 7, 2, 4).run(10)
+        self.assertEqual(serial, parallel)
+        for counts in serial.values():
+            self.assertEqual(sum(counts), 10)
+        for rate in Tournament.get_win_rates(serial).values():
+            self.assertGreaterEqual(rate, 0)
+            self.assertLessEqual(rate, 1)
+
+
+class TestBattleSimulator(unittest.TestCase):
+    BATTLES = 20000
+
+    def setUp(self):
+        self.simulator = BattleSimulator(Health, Magic,
+                                         TestBattleSimulator.BATTLES,
+                                         np.random.default_rng(1))
+
+    def test_run(self):
+        results = self.simulator.run("bal", "agg")
+        self.assertTrue(np.all(results >= 0))
+        self.assertTrue(np.all(self.simulator.is_dead().any(axis=1)))
+        self.assertTrue(np.all(self.simulator.health >= 0))
+        self.assertGreaterEqual(self.simulator.attacks,
+                                TestBattleSimulator.BATTLES)
+
+    def test_single_step(self):
+        self.simulator.reset(1)
+        self.simulator.set_strengths("con", "agg")
+        self.simulator.step()
+        self.assertTrue(np.all(self.simulator.damage_per_round[:, 0] == 3))
+        self.assertTrue(np.all(self.simulator.health[:, 0] >= 100 - 15))
+        self.assertTrue(np.all(self.simulator.health[:, 1] <= 100 - 9))
+        self.assertTrue(np.all(self.simulator.current == 0))
+        self.assertTrue(np.all(self.simulator.get_results() == -1))
+
+    def test_matches_characters(self):
+        random.seed(1)
+        wins = 0
+        for _ in range(2000):
+            health = Health("Health")
+            magic = Magic("Magic")
+            attacker, defender = (health, magic) if random.randint(
+                0, 1) == 0 else (magic, health)
+            while not health.is_dead() and not magic.is_dead():
+                attacker.attack(defender,
+                                "bal" if attacker is health else "agg")
+                attacker, defender = defender, attacker
+            wins += magic.is_dead() and not health.is_dead()
+        results = self.simulator.run("bal", "agg")
+        self.assertAlmostEqual(np.mean(results == 0), wins / 2000, delta=0.05)
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_measure(self):
+        calls = []
+        result = Benchmark.measure(calls.append, 10, repeat=3)
+        self.assertEqual(calls, [10] * 4)
+        self.assertGreater(result["per_second"], 0)
+        self.assertEqual(Benchmark.measure(lambda x: 0.5, 10)["seconds"],
+                         0.05)
+
+    def test_compare(self):
+        baseline = {"results": {"a": {"seconds": 1.0}, "b": {"seconds": 1.0},
+                                "c": {"skipped": "No display"}}}
+        data = {"results": {"a": {"seconds": 1.1}, "b": {"seconds": 1.5},
+                            "c": {"seconds": 9.0}, "d": {"seconds": 9.0}}}
+        self.assertEqual(Benchmark.compare(data, baseline),
+                         ["b: 1.50x slower than baseline"])
+
+    def test_leaderboard(self):
+        with mock.patch("Leaderboard.db", {}) as shared:
+            results = Benchmark.bench_leaderboard([100])
+        self.assertEqual(set(results), {"leaderboard/new_entry/100",
+                                        "leaderboard/get_data/100"})
+        # The benchmark never writes to the shared database
+        self.assertEqual(shared, {})
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.metrics = Metrics([0.01, 0.1])
+
+    def test_histogram(self):
+        histogram = Histogram([1, 2])
+        for value in [0.5, 1, 1.5, 3]:
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [2, 1, 1])
+        self.assertEqual(histogram.get_cumulative(), [2, 3, 4])
+        self.assertEqual(histogram.total, 6)
+
+    def test_instrument(self):
+        leaderboard = Leaderboard("metrics-test")
+        self.metrics.instrument(leaderboard, ["new_entry", "get_data"])
+        self.metrics.instrument(leaderboard, ["new_entry"], "Board")
+        leaderboard.new_entry("Player 1")
+        self.assertEqual(leaderboard.get_data(), [["Player 1", 1]])
+        with self.assertRaises(ZeroDivisionError):
+            self.metrics.wrap("Leaderboard.get_data", lambda: 1 / 0)()
+        calls = self.metrics.snapshot()["calls"]
+        # Instrumenting again replaces the wrapper rather than nesting it
+        self.assertEqual(set(calls), {"Board.new_entry",
+                                      "Leaderboard.get_data"})
+        self.assertEqual(calls["Leaderboard.get_data"]["count"], 2)
+        self.assertEqual(calls["Leaderboard.get_data"]["errors"], 1)
+        self.assertEqual(calls["Board.new_entry"]["buckets"][float("inf")],
+                         1)
+        self.assertNotIn("new_entry", vars(Leaderboard("metrics-test")))
+        leaderboard.clear_data()
+
+    def test_prometheus(self):
+        self.metrics.observe("Driver.do_attack", 0.05)
+        self.metrics.add_error("Driver.do_attack")
+        self.metrics.set_gauge("widgets", 12)
+        text = self.metrics.to_prometheus()
+        self.assertIn('battle_game_call_seconds_bucket{call="Driver.do_attack"'
+                      ',le="0.01"} 0\n', text)
+        self.assertIn('battle_game_call_seconds_bucket{call="Driver.do_attack"'
+                      ',le="+Inf"} 1\n', text)
+        self.assertIn('battle_game_call_seconds_count{call="Driver.do_attack"'
+                      '} 1\n', text)
+        self.assertIn('battle_game_call_errors_total{call="Driver.do_attack"'
+                      '} 1\n', text)
+        self.assertIn("battle_game_widgets 12\n", text)
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "metrics.prom")
+        self.metrics.flush(path)
+        with open(path, encoding="utf-8") as file:
+            self.assertEqual(file.read(), text)
+        shutil.rmtree(directory)
+
+
+class TestTracer(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "trace.json")
+        self.now = 0.0
+        self.tracer = Tracer(self.path, clock=lambda: self.now)
+
+    def tearDown(self):
+        self.tracer.close()
+        shutil.rmtree(self.directory)
+
+    def read(self):
+        self.tracer.close()
+        with open(self.path, encoding="utf-8") as file:
+            return [event for event in json.load(file) if event["ph"] != "M"]
+
+    def tick(self, seconds):
+        self.now += seconds
+
+    def test_span(self):
+        with self.tracer.span("outer", "action"):
+            self.tick(0.001)
+            with self.tracer.span("inner", "render", {"widgets": 3}):
+                self.tick(0.002)
+        with self.assertRaises(ValueError):
+            with self.tracer.span("failed", "action"):
+                raise ValueError("Bad")
+        inner, outer, failed = self.read()
+        self.assertEqual((inner["ts"], inner["dur"]), (1000, 2000))
+        self.assertEqual((outer["ts"], outer["dur"]), (0, 3000))
+        self.assertEqual(inner["args"], {"widgets": 3})
+        self.assertEqual(failed["args"], {"error": "ValueError('Bad')"})
+        self.assertEqual(outer["pid"], os.getpid())
+
+    def test_defer(self):
+        function = self.tracer.defer("later", 1000, lambda: self.tick(0.5))
+        self.tick(1.25)
+        function()
+        start, finish, call = self.read()
+        self.assertEqual((start["ph"], start["ts"]), ("s", 0))
+        self.assertEqual((finish["ph"], finish["ts"]), ("f", 1250000))
+        self.assertEqual(start["id"], finish["id"])
+        self.assertEqual((call["ph"], call["dur"]), ("X", 500000))
+        self.assertEqual(call["args"], {"delay_ms": 1000, "late_ms": 250})
+
+    def test_instrument(self):
+        leaderboard = Leaderboard("tracer-test")
+        self.tracer.instrument(leaderboard, ["new_entry"], "leaderboard")
+        leaderboard.new_entry("Player 1")
+        leaderboard.clear_data()
+        self.assertEqual([event["name"] for event in self.read()],
+                         ["Leaderboard.new_entry"])
+
+    def test_streaming(self):
+        tracer = Tracer(os.path.join(self.directory, "small.json"), 1024)
+        for _ in range(100):
+            with tracer.span("call", "action"):
+                pass
+        # Events are written out as the buffer fills rather than kept
+        self.assertGreater(os.path.getsize(tracer.path), 1024)
+        tracer.close()
+        tracer.close()
+        with tracer.span("ignored", "action"):
+            pass
+        with open(tracer.path, encoding="utf-8") as file:
+            self.assertEqual(len(json.load(file)), 101)
+
+
+class TestScoreIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = ScoreIndex()
+        for name in ["A", "B", "B", "C", "C", "C"]:
+            self.index.increment(name)
+
+    def test_get_score(self):
+        self.assertEqual(self.index.get_score("C"), 3)
+        self.assertEqual(self.index.get_score("D"), 0)
+        self.assertEqual(len(self.index), 3)
+
+    def test_get_top(self):
+        self.assertEqual(self.index.get_top(2), [["C", 3], ["B", 2]])
+        self.index.increment("A", 5)
+        self.assertEqual(self.index.get_top(5), [["A", 6], ["C", 3],
+                                                 ["B", 2]])
+
+    def test_get_rank(self):
+        self.index.increment("D", 2)
+        self.assertEqual([self.index.get_rank(x) for x in "ABCD"],
+                         [4, 2, 1, 2])
+        self.assertEqual(self.index.get_rank("E"), None)
+        self.index.increment("A", 200)
+        self.assertEqual(self.index.get_rank("A"), 1)
+        self.assertEqual(self.index.get_rank("D"), 3)
+
+    def test_get_page(self):
+        self.index.increment("D", 2)
+        self.index.increment("E")
+        self.assertEqual(self.index.get_page(1, 2), [["B", 2], ["D", 2]])
+        self.assertEqual(self.index.get_page(2, 10), [["D", 2], ["A", 1],
+                                                      ["E", 1]])
+        self.assertEqual(self.index.get_page(5, 1), [])
+        self.assertEqual(self.index.get_page(0, 0), [])
+
+
+class TestRatingEngine(unittest.TestCase):
+    def setUp(self):
+        self.engine = RatingEngine()
+
+    def test_expected_score(self):
+        self.assertEqual(expected_score(1500, 1500), 0.5)
+        self.assertAlmostEqual(expected_score(1900, 1500), 10 / 11)
+        self.assertAlmostEqual(
+            expected_score(1400, 1700) + expected_score(1700, 1400), 1)
+
+    def test_record(self):
+        self.assertEqual(self.engine.record("A", "B", "A"), (1516, 1484))
+        rating_a, rating_b = self.engine.record("A", "B", None)
+        self.assertLess(rating_a, 1516)
+        self.assertAlmostEqual(rating_a + rating_b, 3000)
+        self.assertEqual(self.engine.get_rating("C"), 1500)
+
+    def test_record_game(self):
+        game = Engine(random.Random(3)).play_game(
+            FixedStrategy("agg", "Assault"), FixedStrategy("agg", "Magic"))
+        winner = game.get_game_winner()
+        rating_1, rating_2 = self.engine.record_game(game)
+        if winner is None:
+            self.assertEqual(rating_1, 1500)
+        else:
+            self.assertEqual(
+                self.engine.get_rating(winner.get_name()), 1516)
+        self.assertAlmostEqual(rating_1 + rating_2, 3000)
+
+    def test_record_batch(self):
+        results = [("A", "B", "A"), ("B", "C", None), ("C", "A", "C")]
+        self.engine.record_batch(results)
+        other = RatingEngine()
+        other.record_batch(reversed(results))
+        self.assertEqual(self.engine.ratings, other.ratings)
+        self.assertEqual(self.engine.get_rating("A"), 1500)
+        self.assertEqual(self.engine.get_rating("B"), 1484)
+        self.assertEqual(self.engine.get_rank("C"), 1)
+        self.assertEqual(self.engine.get_rank("A"), 2)
+        self.assertEqual(self.engine.get_rank("D"), None)
+
+    def test_rank_index(self):
+        index = RankIndex(100)
+        for name, points in [("A", 50), ("B", 70), ("C", 50), ("D", 500)]:
+            index.update(name, points)
+        self.assertEqual(index.get_top(3), [("D", 100), ("B", 70),
+                                            ("A", 50)])
+        self.assertEqual([index.get_rank(x) for x in "ABCD"], [3, 2, 3, 1])
+        index.update("D", 0)
+        index.remove("B")
+        self.assertEqual(index.get_top(5), [("A", 50), ("C", 50),
+                                            ("D", 0)])
+        self.assertEqual(len(index), 3)
+
+    def test_save(self):
+        self.engine.record("A", "B", "B")
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "ratings.bin")
+        self.engine.save(path)
+        loaded = RatingEngine.load(path)
+        self.assertEqual(loaded.ratings, self.engine.ratings)
+        self.assertEqual(loaded.get_top(2), self.engine.get_top(2))
+        shutil.rmtree(directory)
+
 
 class LeaderboardTest(unittest.TestCase):
     def setUp(self):
@@ -284,5 +1307,239 @@ class LeaderboardTest(unittest.TestCase):
         self.leaderboard.new_entry("Player 7")
         self.assertLessEqual(len(self.leaderboard.get_data()), 5)
 
+    def test_leaderboard_order(self):
+        self.leaderboard.new_entry("Player 3")
+        self.leaderboard.new_entry("Player 3")
+        scoreboard = self.leaderboard.get_data()
+        self.assertEqual(scoreboard[0], ["Player 3", 3])
+        self.assertEqual(scoreboard[1], ["Player 1", 2])
+        self.assertEqual(
+            Leaderboard("test", self.leaderboard.store).get_data(),
+            scoreboard)
+
+    def test_rank(self):
+        self.assertEqual(self.leaderboard.get_rank("Player 1"), 1)
+        self.assertEqual(self.leaderboard.get_rank("Player 3"), 2)
+        self.assertEqual(self.leaderboard.get_rank("Player 4"), None)
+
+    def test_pages(self):
+        self.assertEqual(self.leaderboard.get_page(0, 1), [["Player 1", 2]])
+        self.assertEqual(
+            sorted(self.leaderboard.get_page(1, 5)),
+            [["Player 2", 1], ["Player 3", 1]])
+        self.assertEqual(self.leaderboard.get_page(3, 5), [])
+        self.assertEqual(self.leaderboard.get_around("Player 3", 1),
+                         [["Player 1", 2], ["Player 3", 1], ["Player 2", 1]])
+        self.assertEqual(self.leaderboard.get_around("Player 1", 0),
+                         [["Player 1", 2]])
+        self.assertEqual(self.leaderboard.get_around("Player 4", 2), [])
+
+    def test_record_game(self):
+        game = Engine(random.Random(1)).play_game(
+            FixedStrategy("agg", "Assault"), FixedStrategy("con", "Health"))
+        winner = game.get_game_winner()
+        name = winner.get_name() if winner else "Player 1"
+        score = self.leaderboard.store.get_score("test", name)
+        self.leaderboard.record_game(game)
+        self.assertEqual(self.leaderboard.store.get_score("test", name),
+                         score + (winner is not None))
+        self.assertEqual(self.leaderboard.ratings.get_rank(name), 1)
+        # Ratings are stored with the scores and read again by another
+        # leaderboard, which rates from them rather than its own copy
+        other = Leaderboard("test", self.leaderboard.store)
+        for player in ["Player 1", "Player 2"]:
+            self.assertEqual(other.get_rating(player),
+                             self.leaderboard.ratings.get_rating(player))
+        other.record_game(game)
+        expected = RatingEngine()
+        expected.record_game(game)
+        expected.record_game(game)
+        for player in ["Player 1", "Player 2"]:
+            self.assertEqual(self.leaderboard.get_rating(player),
+                             expected.get_rating(player))
+        self.leaderboard.clear_data()
+        self.assertEqual(
+            Leaderboard("test", self.leaderboard.store).get_rating(name),
+            1500)
+
     def tearDown(self):
         self.leaderboard.clear_data()
+
+
+class ListStoreTest(unittest.TestCase):
+    def test_changed_elsewhere(self):
+        database = {}
+        store = ListStore(database)
+        other = ListStore(database)
+        store.add("test", {"X": 1})
+        other.add("test", {"Z": 1})
+        store.add("test", {"Z": 1})
+        self.assertEqual(database["test"], [{
+            "name": "X",
+            "score": 1
+        }, {
+            "name": "Z",
+            "score": 2
+        }])
+        self.assertEqual(store.get_top("test", 2), [["Z", 2], ["X", 1]])
+        other.clear("test")
+        store.add("test", {"Z": 1})
+        self.assertEqual(database["test"], [{"name": "Z", "score": 1}])
+        other.add("test", {"Z": 2})
+        store.add("test", {"Z": 1})
+        self.assertEqual(store.get_score("test", "Z"), 4)
+
+
+class SQLiteLeaderboardTest(LeaderboardTest):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "leaderboard.db")
+        self.store = SQLiteStore(self.path)
+        self.leaderboard = Leaderboard("test", self.store)
+        self.leaderboard.new_entry("Player 1")
+        self.leaderboard.new_entry("Player 1")
+        self.leaderboard.new_entry("Player 2")
+        self.leaderboard.new_entry("Player 3")
+
+    def test_leaderboard_order(self):
+        super().test_leaderboard_order()
+        self.assertEqual(Leaderboard("other", self.store).get_data(), [])
+
+    def test_counts(self):
+        rng = random.Random(1)
+        for _ in range(300):
+            self.leaderboard.store.add(
+                "test", {f"Player {rng.randrange(60)}": rng.randrange(1, 4)})
+        data = sorted(self.leaderboard.get_page(0, 100),
+                      key=lambda x: (-x[1], x[0]))
+        self.assertEqual(len(data), 60)
+        for offset in [0, 7, 31, 59]:
+            self.assertEqual(self.leaderboard.get_page(offset, 5),
+                             data[offset:offset + 5])
+        for name, score in data:
+            self.assertEqual(self.leaderboard.get_rank(name),
+                             sum(row[1] > score for row in data) + 1)
+        # Databases written without the counts have them rebuilt on open
+        self.store.connection.execute("DELETE FROM score_counts")
+        self.assertEqual(Leaderboard("test", self.store).get_page(7, 5),
+                         data[7:12])
+
+    def test_multiple_processes(self):
+        with ProcessPoolExecutor(2) as executor:
+            list(executor.map(add_sqlite_entries, [self.path, self.path]))
+        self.assertEqual(self.leaderboard.get_data()[0], ["Player 1", 102])
+
+    def tearDown(self):
+        super().tearDown()
+        self.store.close()
+        shutil.rmtree(self.directory)
+
+
+class WriteBehindLeaderboardTest(LeaderboardTest):
+    def setUp(self):
+        self.store = WriteBehindStore(ListStore(), 0.05, 10)
+        self.leaderboard = Leaderboard("test", self.store)
+        for name in ["Player 1", "Player 1", "Player 2", "Player 3"]:
+            self.leaderboard.new_entry(name)
+
+    def test_buffered_writes(self):
+        self.assertEqual(self.store.store.get_score("test", "Player 1"), 0)
+        self.assertEqual(self.store.get_score("test", "Player 1"), 2)
+        self.store.flush()
+        self.leaderboard.new_entry("Player 2")
+        self.leaderboard.new_entry("Player 2")
+        self.assertEqual(self.store.store.get_score("test", "Player 2"), 1)
+        self.assertEqual(self.leaderboard.get_data()[0], ["Player 2", 3])
+
+    def test_flush_threshold(self):
+        for _ in range(6):
+            self.leaderboard.new_entry("Player 4")
+        self.assertEqual(self.store.pending, {})
+        self.assertEqual(self.store.store.get_score("test", "Player 4"), 6)
+
+    def test_flush_timer(self):
+        time.sleep(0.2)
+        self.assertEqual(self.store.pending, {})
+        self.assertEqual(self.store.store.get_score("test", "Player 1"), 2)
+
+    def tearDown(self):
+        super().tearDown()
+        self.store.close()
+
+
+class ShardedLeaderboardTest(LeaderboardTest):
+    def setUp(self):
+        self.database = {}
+        self.now = 0.0
+        self.store = ShardedStore(1, self.database, "a", lambda: self.now)
+        self.leaderboard = Leaderboard("test", self.store)
+        for name in ["Player 1", "Player 1", "Player 2", "Player 3"]:
+            self.leaderboard.new_entry(name)
+        self.other = ShardedStore(1, self.database, "b", lambda: self.now)
+
+    def test_writers(self):
+        self.other.add("test", {"Player 2": 5})
+        self.store.add("test", {"Player 2": 1})
+        self.now += 1
+        self.assertEqual(self.store.get_top("test", 2),
+                         [["Player 2", 7], ["Player 1", 2]])
+        self.assertEqual(self.other.get_rank("test", "Player 1"), 2)
+        self.assertEqual(self.other.get_score("test", "Player 2"), 7)
+        # Each writer only writes keys in its own shard
+        self.assertEqual(self.database["test/shards/a/Player 2"], [2, 5])
+        self.assertEqual(self.database["test/shards/b/Player 2"], [5, 1])
+
+    def test_refresh(self):
+        self.assertEqual(self.store.get_rank("test", "Player 3"), 2)
+        self.other.add("test", {"Player 3": 5})
+        # Scores are read from the shards, while ranks are read from the
+        # index, which catches up at the next refresh
+        self.assertEqual(self.store.get_score("test", "Player 3"), 6)
+        self.assertEqual(self.store.get_rank("test", "Player 3"), 2)
+        self.now += 1
+        self.assertEqual(self.store.get_rank("test", "Player 3"), 1)
+        # Batches which have left the log are read from the shard
+        for _ in range(ShardedStore.LOG_SIZE + 5):
+            self.other.add("test", {"Player 3": 1})
+        self.assertNotIn("test/log/b/1", self.database)
+        self.now += 1
+        self.assertEqual(self.store.get_page("test", 0, 1),
+                         [["Player 3", ShardedStore.LOG_SIZE + 11]])
+        restarted = ShardedStore(0, self.database, "a")
+        self.assertEqual(restarted.get_top("test", 3),
+                         self.store.get_top("test", 3))
+        restarted.add("test", {"Player 1": 1})
+        self.assertEqual(self.database["test/batches/a"], 5)
+        self.assertEqual(self.database["test/shards/a/Player 1"], [3, 5])
+
+    def test_summaries(self):
+        for number in range(ShardedStore.TOP_SIZE):
+            self.store.add("test", {f"A{number}": 5})
+            self.other.add("test", {f"B{number}": 5})
+        self.assertEqual(len(self.database["test/top/a"]),
+                         ShardedStore.TOP_SIZE)
+        # A player in no summary can still have the highest score
+        self.store.add("test", {"Player 4": 4})
+        self.other.add("test", {"Player 4": 4})
+        self.assertEqual(self.store.get_top("test", 1), [["Player 4", 8]])
+        # The summaries are enough when their players beat every other one
+        self.other.add("test", {"Player 5": 20})
+        with mock.patch.object(self.store, "get_view",
+                               side_effect=AssertionError):
+            self.assertEqual(self.store.get_top("test", 1),
+                             [["Player 5", 20]])
+
+    def test_cleared_elsewhere(self):
+        reader = ShardedStore(1, self.database, "c", lambda: self.now)
+        self.other.add("test", {"Player 2": 1})
+        self.assertEqual(reader.get_top("test", 1), [["Player 1", 2]])
+        self.assertEqual(reader.get_rank("test", "Player 2"), 1)
+        self.other.clear("test")
+        self.other.add("test", {"Player 4": 3})
+        self.now += 1
+        # The reader has never written, and starts again from the shards
+        for store in [reader, self.store]:
+            self.assertEqual(store.get_top("test", 5), [["Player 4", 3]])
+            self.assertEqual(store.get_page("test", 0, 5), [["Player 4", 3]])
+            self.assertIsNone(store.get_rank("test", "Player 1"))
+        self.assertNotIn("test/batches/c", self.database)
@@ -0,0 +1,209 @@
+# pylint: disable=C0103
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Tuple, Union
+
+from FenwickTree import FenwickTree
+from Rating import MAX_RATING
+
+
+class MatchmakingQueue():
+    """Pairs waiting players with opponents of a similar rating.
+
+    Players are kept in buckets of ratings, each holding its players in the
+    order they joined, and a Fenwick tree counts the players in each bucket.
+    The nearest occupied bucket on either side of a rating is found in
+    O(log n), so joining, leaving and finding an opponent each cost O(log n)
+    however many players are waiting.
+
+    A player accepts opponents whose rating is within their search range,
+    which starts at the initial range and widens the longer they wait, up to
+    the maximum range. Two players are only paired if each is within the
+    other's range.
+    """
+
+    def __init__(self,
+                 bucket_size: int = 25,
+                 initial_range: float = 50.0,
+                 widen_rate: float = 10.0,
+                 max_range: float = 400.0,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.bucket_size = bucket_size
+        self.initial_range = initial_range
+        self.widen_rate = widen_rate
+        self.max_range = max_range
+        self.clock = clock
+        size = MAX_RATING // bucket_size + 1
+        self.buckets: List["OrderedDict[str, Tuple[float, float]]"] = [
+            OrderedDict() for _ in range(size)
+        ]
+        self.counts = FenwickTree(size)
+        # The bucket of each waiting player
+        self.players: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.players)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.players
+
+    def get_bucket(self, rating: float) -> int:
+        """Gets the index of the bucket which holds a rating."""
+        return min(max(int(rating // self.bucket_size), 0),
+                   len(self.buckets) - 1)
+
+    def enqueue(self, name: str, rating: float, now: float = None) -> None:
+        """Adds a player to the queue.
+
+        Args:
+            name: The name of the player.
+            rating: The rating of the player.
+            now: The time the player joined on the queue's clock.
+
+        Raises:
+            ValueError: The player is already waiting.
+        """
+        if name in self.players:
+            raise ValueError(f"{name} is already in the queue.")
+        bucket = self.get_bucket(rating)
+        self.buckets[bucket][name] = (rating,
+                                      self.clock() if now is None else now)
+        self.players[name] = bucket
+        self.counts.add(bucket)
+
+    def dequeue(self, name: str) -> bool:
+        """Removes a player from the queue.
+
+        Args:
+            name: The name of the player.
+
+        Returns:
+            True if the player was waiting.
+        """
+        bucket = self.players.pop(name, None)
+        if bucket is None:
+            return False
+        del self.buckets[bucket][name]
+        self.counts.add(bucket, -1)
+        return True
+
+    def get_range(self, joined: float, now: float) -> float:
+        """Gets the search range of a player.
+
+        Args:
+            joined: The time the player joined the queue.
+            now: The current time on the queue's clock.
+
+        Returns:
+            The largest difference in rating the player accepts.
+        """
+        return min(self.initial_range + self.widen_rate * (now - joined),
+                   self.max_range)
+
+    def find_match(self, name: str, now: float = None) -> Union[str, None]:
+        """Finds the best opponent for a waiting player, without removing
+        either from the queue.
+
+        Only the nearest occupied buckets below and above the player's are
+        searched, and the player who has waited longest is taken from each.
+
+        Args:
+            name: The name of the player.
+            now: The current time on the queue's clock.
+
+        Returns:
+            The name of the opponent with the closest rating that both
+            players accept, or None if there is none yet.
+        """
+        now = self.clock() if now is None else now
+        rating, joined = self.buckets[self.players[name]][name]
+        limit = self.get_range(joined, now)
+        best = None
+        best_difference = None
+        for other in self.get_candidates(name):
+            other_rating, other_joined = self.buckets[self.players[other]][
+                other]
+            difference = abs(rating - other_rating)
+            if difference > min(limit, self.get_range(other_joined, now)):
+                continue
+            if best is None or difference < best_difference:
+                best, best_difference = other, difference
+        return best
+
+    def get_candidates(self, name: str) -> List[str]:
+        """Gets the player who has waited longest in a player's bucket and
+        in the nearest occupied buckets below and above it.
+
+        Args:
+            name: The name of the player.
+
+        Returns:
+            The names of up to three other players.
+        """
+        bucket = self.players[name]
+        candidates = []
+        for other in self.buckets[bucket]:
+            if other != name:
+                candidates.append(other)
+                break
+        below = self.counts.get_previous(bucket - 1)
+        if below >= 0:
+            candidates.append(next(iter(self.buckets[below])))
+        above = self.counts.get_next(bucket + 1)
+        if above < len(self.buckets):
+            candidates.append(next(iter(self.buckets[above])))
+        return candidates
+
+    def pair(self, name: str, now: float = None) -> Union[Tuple[str, str],
+                                                          None]:
+        """Pairs a waiting player with the best opponent, if there is one,
+        and removes both from the queue.
+
+        Args:
+            name: The name of the player.
+            now: The current time on the queue's clock.
+
+        Returns:
+            The names of the player and the opponent, or None.
+        """
+        other = self.find_match(name, now)
+        if other is None:
+            return None
+        self.dequeue(name)
+        self.dequeue(other)
+        return name, other
+
+    def pair_batch(self, now: float = None) -> List[Tuple[str, str]]:
+        """Pairs as many waiting players as possible in one pass.
+
+        Players are taken in order of rating, and each is paired with the
+        next one if both accept the other. Running this at intervals, rather
+        than on every join, gives better matches when many players join at
+        once.
+
+        Args:
+            now: The current time on the queue's clock.
+
+        Returns:
+            The names of each pair of players, who are removed from the
+            queue.
+        """
+        now = self.clock() if now is None else now
+        waiting = sorted(
+            ((rating, joined, name) for bucket in self.buckets
+             for name, (rating, joined) in bucket.items()))
+        pairs = []
+        index = 0
+        while index < len(waiting) - 1:
+            rating, joined, name = waiting[index]
+            other_rating, other_joined, other = waiting[index + 1]
+            if other_rating - rating <= min(
+                    self.get_range(joined, now),
+                    self.get_range(other_joined, now)):
+                pairs.append((name, other))
+                self.dequeue(name)
+                self.dequeue(other)
+                index += 2
+            else:
+                index += 1
+        return pairs
@@ -0,0 +1,259 @@
+# pylint: disable=C0103
+import bisect
+import functools
+import os
+import threading
+import time
+import types
+from typing import Any, Callable, Dict, Iterable, List, Sequence
+
+
+# Upper bounds of the latency histogram buckets, in seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5)
+PREFIX = "battle_game"
+
+
+class Histogram():
+    """Counts observed values in buckets with fixed upper bounds."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = list(buckets)
+        # The count of each bucket, then of values above every bound
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """Adds a value to the histogram.
+
+        Args:
+            value: The value.
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def get_cumulative(self) -> List[int]:
+        """Gets the number of values at or below each bound, and in total.
+
+        Returns:
+            The cumulative counts, ending with the count of every value.
+        """
+        counts = []
+        running = 0
+        for count in self.counts:
+            running += count
+            counts.append(running)
+        return counts
+
+
+def count_widgets(widget: Any) -> int:
+    """Counts a widget and every widget inside it.
+
+    Args:
+        widget: The guizero widget, usually the app.
+
+    Returns:
+        The number of widgets.
+    """
+    return 1 + sum(
+        count_widgets(child) for child in getattr(widget, "children", []))
+
+
+class Metrics():
+    """Collects latency histograms, call counts and gauges in process.
+
+    Methods are instrumented by replacing them on one object with timed
+    wrappers, so nothing is added to any call unless an object is
+    instrumented. Metrics can be read as a snapshot, or written to a file in
+    the Prometheus text format, optionally at intervals on a background
+    thread.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self.histograms: Dict[str, Histogram] = {}
+        self.errors: Dict[str, int] = {}
+        self.gauges: Dict[str, float] = {}
+        self.lock = threading.Lock()
+        self.timer = None
+
+    def observe(self, call: str, seconds: float) -> None:
+        """Records the latency of a call.
+
+        Args:
+            call: The name of the call.
+            seconds: The time the call took.
+        """
+        with self.lock:
+            histogram = self.histograms.get(call)
+            if histogram is None:
+                histogram = self.histograms[call] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def add_error(self, call: str) -> None:
+        """Counts a call which raised an exception.
+
+        Args:
+            call: The name of the call.
+        """
+        with self.lock:
+            self.errors[call] = self.errors.get(call, 0) + 1
+
+    def set_gauge(self, name: str, value: float) -> None:
+        """Sets the current value of a gauge.
+
+        Args:
+            name: The name of the gauge.
+            value: The value.
+        """
+        with self.lock:
+            self.gauges[name] = value
+
+    def wrap(self,
+             call: str,
+             function: Callable,
+             after: Callable[[], None] = None) -> Callable:
+        """Wraps a function so that every call to it is timed.
+
+        Args:
+            call: The name to record the calls under.
+            function: The function.
+            after: Called after each call, such as to update a gauge.
+
+        Returns:
+            The wrapped function.
+        """
+
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            except Exception:
+                self.add_error(call)
+                raise
+            finally:
+                self.observe(call, time.perf_counter() - start)
+                if after is not None:
+                    after()
+
+        return timed
+
+    def instrument(self,
+                   target: Any,
+                   names: Iterable[str],
+                   prefix: str = None,
+                   after: Callable[[], None] = None) -> None:
+        """Times calls to methods of one object. The methods of the object's
+        class are wrapped, so instrumenting an object again replaces the
+        wrappers rather than nesting them.
+
+        Args:
+            target: The object.
+            names: The names of the methods.
+            prefix: The prefix of the names the calls are recorded under, or
+            None to use the name of the object's class.
+            after: Called after each call.
+        """
+        prefix = type(target).__name__ if prefix is None else prefix
+        for name in names:
+            method = types.MethodType(getattr(type(target), name), target)
+            setattr(target, name, self.wrap(f"{prefix}.{name}", method,
+                                            after))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Gets a copy of every metric.
+
+        Returns:
+            The count, total seconds, mean seconds, bucket counts and errors
+            of each call, and the value of each gauge.
+        """
+        with self.lock:
+            calls = {
+                call: {
+                    "count": histogram.count,
+                    "seconds": histogram.total,
+                    "mean": histogram.total / histogram.count,
+                    "buckets": dict(zip(
+                        [*histogram.buckets, float("inf")],
+                        histogram.get_cumulative())),
+                    "errors": self.errors.get(call, 0)
+                }
+                for call, histogram in self.histograms.items()
+            }
+            return {"calls": calls, "gauges": dict(self.gauges)}
+
+    def to_prometheus(self) -> str:
+        """Formats every metric in the Prometheus text format.
+
+        Returns:
+            The metrics.
+        """
+        snapshot = self.snapshot()
+        lines = [
+            f"# HELP {PREFIX}_call_seconds Latency of instrumented calls.",
+            f"# TYPE {PREFIX}_call_seconds histogram"
+        ]
+        for call, data in sorted(snapshot["calls"].items()):
+            for bound, count in data["buckets"].items():
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{PREFIX}_call_seconds_bucket{{call="{call}",'
+                             f'le="{le}"}} {count}')
+            lines.append(f'{PREFIX}_call_seconds_sum{{call="{call}"}} '
+                         f'{data["seconds"]!r}')
+            lines.append(f'{PREFIX}_call_seconds_count{{call="{call}"}} '
+                         f'{data["count"]}')
+        lines += [
+            f"# HELP {PREFIX}_call_errors_total Instrumented calls which "
+            "raised an exception.",
+            f"# TYPE {PREFIX}_call_errors_total counter"
+        ]
+        for call, data in sorted(snapshot["calls"].items()):
+            lines.append(f'{PREFIX}_call_errors_total{{call="{call}"}} '
+                         f'{data["errors"]}')
+        for name, value in sorted(snapshot["gauges"].items()):
+            lines += [
+                f"# TYPE {PREFIX}_{name} gauge", f"{PREFIX}_{name} {value!r}"
+            ]
+        return "\n".join(lines) + "\n"
+
+    def flush(self, path: str) -> None:
+        """Writes every metric to a file in the Prometheus text format. The
+        file is replaced in one step, so readers never see part of it.
+
+        Args:
+            path: The path of the file.
+        """
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            file.write(self.to_prometheus())
+        os.replace(temporary, path)
+
+    def start(self, path: str, interval: float = 10) -> None:
+        """Writes the metrics to a file at intervals on a background thread
+        until stopped.
+
+        Args:
+            path: The path of the file.
+            interval: The time between writes in seconds.
+        """
+
+        def tick():
+            self.flush(path)
+            if self.timer is None:
+                return
+            self.timer = threading.Timer(interval, tick)
+            self.timer.daemon = True
+            self.timer.start()
+
+        self.timer = threading.Timer(interval, tick)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def stop(self) -> None:
+        """Stops writing the metrics at intervals."""
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
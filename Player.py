@@ -1,7 +1,8 @@
 # pylint: disable=C0103
-from typing import List, Union
+import random
+from typing import Dict, Type, Union
 
-from Character import Assault, Health, Magic
+from Character import Assault, Character, Health, Magic
 
 
 class Player():
@@ -11,27 +12,12 @@ class Player():
     choose a character which will have a name of the player's choosing.
     """
 
-    characters = [Assault, Health, Magic]
+    __slots__ = ("name", "character", "random")
 
-    @staticmethod
-    def get_available_characters() -> List[Union[Assault, Health, Magic]]:
-        """Gets a list of character classes which are not currently
-        in use in the game.
-
-        Returns:
-            A list of character classes which are not currently
-            in use in the game.
-        """
-        return Player.characters
-
-    @staticmethod
-    def reset_available_characters() -> None:
-        """Reset the list of available characters in a game."""
-        Player.characters = [Assault, Health, Magic]
-
-    def __init__(self, name: str) -> None:
+    def __init__(self, name: str, rng: random.Random = None) -> None:
         self.name = name
         self.character = None
+        self.random = rng
 
     def get_name(self) -> str:
         """Gets the name of this player.
@@ -49,21 +35,22 @@ class Player():
         """
         return self.character
 
-    def choose_character(self, character: str, name: str) -> bool:
+    def choose_character(self, character: str, name: str,
+                         available: Dict[str, Type[Character]]) -> bool:
         """Selects a character for this player.
 
         Args:
             character: The character to assign to this player.
             name: The name to assign the character.
+            available: The character classes still available in the game,
+            by name. The chosen class is claimed from it.
 
         Returns:
             True if the assignment was successful.
             False if the character was unavailable.
         """
-        if character in map(lambda x: x.__name__, Player.characters):
-            index = list(map(lambda x: x.__name__,
-                             Player.characters)).index(character)
-            self.character = Player.characters[index](name)
-            del Player.characters[index]
-            return True
-        return False
+        character_class = available.pop(character, None)
+        if character_class is None:
+            return False
+        self.character = character_class(name, self.random)
+        return True
@@ -0,0 +1,275 @@
+# pylint: disable=C0103
+import pickle
+from typing import Dict, Iterable, List, Tuple, Union
+
+from FenwickTree import FenwickTree
+from Game import Game
+
+
+DEFAULT_RATING = 1500.0
+# Ratings are ranked in whole points from 0 to MAX_RATING, and ratings
+# outside that range are ranked at its ends
+MAX_RATING = 4000
+
+# Player 1, player 2 and the winner, or None for a draw
+Result = Tuple[str, str, Union[str, None]]
+
+
+def expected_score(rating: float, opponent: float) -> float:
+    """Calculates the expected score of a player against an opponent, counting
+    a win as 1 and a draw as 0.5.
+
+    Args:
+        rating: The rating of the player.
+        opponent: The rating of the opponent.
+
+    Returns:
+        The expected score, from 0 to 1.
+    """
+    return 1 / (1 + 10**((opponent - rating) / 400))
+
+
+class RankIndex():
+    """Ranks names by integer points from 0 to a maximum.
+
+    A Fenwick tree counts the names at each number of points, and the names
+    at each number of points are kept in the order they reached it. Moving a
+    name and finding its rank each cost O(log m), where m is the maximum,
+    whatever the number of names, and the top k names are read in
+    O(k log m).
+    """
+
+    def __init__(self, maximum: int = MAX_RATING) -> None:
+        self.maximum = maximum
+        self.counts = FenwickTree(maximum + 1)
+        self.names: List[Dict[str, None]] = [{} for _ in range(maximum + 1)]
+        self.points: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.points
+
+    def update(self, name: str, points: int) -> None:
+        """Moves a name to a number of points, adding it if needed.
+
+        Args:
+            name: The name.
+            points: The points, which are clamped to the range of the index.
+        """
+        points = min(max(points, 0), self.maximum)
+        old = self.points.get(name)
+        if old == points:
+            return
+        if old is not None:
+            self.remove(name)
+        self.points[name] = points
+        self.names[points][name] = None
+        self.counts.add(points)
+
+    def remove(self, name: str) -> None:
+        """Removes a name from the index, if it is there.
+
+        Args:
+            name: The name.
+        """
+        points = self.points.pop(name, None)
+        if points is not None:
+            del self.names[points][name]
+            self.counts.add(points, -1)
+
+    def get_rank(self, name: str) -> Union[int, None]:
+        """Gets the rank of a name, where names with equal points share a
+        rank.
+
+        Args:
+            name: The name.
+
+        Returns:
+            One more than the number of names with more points, or None if
+            the name is not in the index.
+        """
+        points = self.points.get(name)
+        if points is None:
+            return None
+        return self.counts.total - self.counts.prefix_sum(points) + 1
+
+    def get_top(self, count: int) -> List[Tuple[str, int]]:
+        """Gets the names with the most points.
+
+        Args:
+            count: The maximum number of names to return.
+
+        Returns:
+            Pairs of a name and its points, with the most points first.
+        """
+        data = []
+        points = self.counts.get_previous(self.maximum)
+        while points >= 0 and len(data) < count:
+            for name in self.names[points]:
+                if len(data) == count:
+                    break
+                data.append((name, points))
+            points = self.counts.get_previous(points - 1)
+        return data
+
+
+class RatingEngine():
+    """Rates players by the Elo system from the results of their games.
+
+    A result moves both players' ratings towards their actual score, by the
+    K-factor times the difference from their expected score, so each result
+    costs O(1) to apply and O(log m) to re-rank. Players are ranked by
+    their rating rounded to a whole point.
+    """
+
+    def __init__(self, k_factor: float = 32.0) -> None:
+        self.k_factor = k_factor
+        self.ratings: Dict[str, float] = {}
+        self.index = RankIndex()
+
+    def get_rating(self, name: str) -> float:
+        """Gets the rating of a player.
+
+        Args:
+            name: The name of the player.
+
+        Returns:
+            The rating of the player, or the default rating if they have not
+            played.
+        """
+        return self.ratings.get(name, DEFAULT_RATING)
+
+    def get_changes(self, player_1: str, player_2: str,
+                    winner: Union[str, None]) -> Tuple[float, float]:
+        """Calculates the rating changes of a result, without applying them.
+
+        Args:
+            player_1: The name of player 1.
+            player_2: The name of player 2.
+            winner: The name of the winner, or None if it was a draw.
+
+        Returns:
+            The changes to the ratings of player 1 and player 2.
+        """
+        score = 0.5 if winner is None else float(winner == player_1)
+        change = self.k_factor * (score - expected_score(
+            self.get_rating(player_1), self.get_rating(player_2)))
+        return change, -change
+
+    def set_rating(self, name: str, rating: float) -> None:
+        """Sets the rating of a player and re-ranks them.
+
+        Args:
+            name: The name of the player.
+            rating: The new rating.
+        """
+        self.ratings[name] = rating
+        self.index.update(name, round(rating))
+
+    def record(self, player_1: str, player_2: str,
+               winner: Union[str, None]) -> Tuple[float, float]:
+        """Updates the ratings of both players from the result of a game.
+
+        Args:
+            player_1: The name of player 1.
+            player_2: The name of player 2.
+            winner: The name of the winner, or None if it was a draw.
+
+        Returns:
+            The new ratings of player 1 and player 2.
+        """
+        change_1, change_2 = self.get_changes(player_1, player_2, winner)
+        self.set_rating(player_1, self.get_rating(player_1) + change_1)
+        self.set_rating(player_2, self.get_rating(player_2) + change_2)
+        return self.ratings[player_1], self.ratings[player_2]
+
+    def record_game(self, game: Game) -> Tuple[float, float]:
+        """Updates the ratings of both players from a finished game.
+
+        Args:
+            game: The finished game.
+
+        Returns:
+            The new ratings of player 1 and player 2.
+        """
+        winner = game.get_game_winner()
+        return self.record(game.get_player_1().get_name(),
+                           game.get_player_2().get_name(),
+                           winner.get_name() if winner else None)
+
+    def record_batch(self, results: Iterable[Result]) -> None:
+        """Updates ratings from many results in one pass, as a single rating
+        period.
+
+        Every result is rated against the ratings from before the batch, so
+        the order of the results does not matter, and each player is
+        re-ranked once however many games they played.
+
+        Args:
+            results: The player 1, player 2 and winner of each game, with
+            the winner None for a draw.
+        """
+        changes: Dict[str, float] = {}
+        for player_1, player_2, winner in results:
+            change_1, change_2 = self.get_changes(player_1, player_2, winner)
+            changes[player_1] = changes.get(player_1, 0.0) + change_1
+            changes[player_2] = changes.get(player_2, 0.0) + change_2
+        for name, change in changes.items():
+            self.set_rating(name, self.get_rating(name) + change)
+
+    def get_rank(self, name: str) -> Union[int, None]:
+        """Gets the rank of a player by rating.
+
+        Args:
+            name: The name of the player.
+
+        Returns:
+            The rank of the player, from 1, or None if they have not played.
+        """
+        return self.index.get_rank(name)
+
+    def get_top(self, count: int) -> List[List[Union[str, float]]]:
+        """Gets the players with the highest ratings.
+
+        Args:
+            count: The maximum number of players to return.
+
+        Returns:
+            A list of lists, where the first element in the sub list is the
+            player's name and the second element is their rating, with the
+            highest ratings first.
+        """
+        return [[name, self.ratings[name]]
+                for name, _ in self.index.get_top(count)]
+
+    def save(self, path: str) -> None:
+        """Saves the ratings to a file.
+
+        Args:
+            path: The path of the file to save to.
+        """
+        with open(path, "wb") as file:
+            pickle.dump(
+                {
+                    "k_factor": self.k_factor,
+                    "ratings": self.ratings
+                }, file, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(path: str) -> "RatingEngine":
+        """Loads ratings from a file.
+
+        Args:
+            path: The path of the file to load from.
+
+        Returns:
+            A rating engine holding the loaded ratings.
+        """
+        with open(path, "rb") as file:
+            data = pickle.load(file)
+        engine = RatingEngine(data["k_factor"])
+        for name, rating in data["ratings"].items():
+            engine.set_rating(name, rating)
+        return engine
@@ -0,0 +1,538 @@
+# pylint: disable=C0103
+import mmap
+import os
+import struct
+from typing import Iterator, List, Tuple, Union
+
+from Character import Assault, Health, Magic
+from Game import Game
+from Player import Player
+
+
+MAGIC = b"BGR1"
+
+# Kinds of event, each followed by its fields:
+# GAME: seed, player 1 name, player 2 name
+# TOSS: player 1's choice, the outcome
+# CHOOSE: the choosing player (0 or 1), character class, character name
+# ATTACK: strength, damage to the opponent, damage to self
+# END: no fields
+# SNAPSHOT: player names, round, first player, current player, rounds won by
+# each player, then each player's character class (plus one, or 0 for none),
+# character name, health and damage ticks
+GAME = 0
+TOSS = 1
+CHOOSE = 2
+ATTACK = 3
+END = 4
+SNAPSHOT = 5
+
+COINS = ["Heads", "Tails"]
+CHARACTERS = ["Assault", "Health", "Magic"]
+CHARACTER_CLASSES = [Assault, Health, Magic]
+STRENGTHS = ["con", "bal", "agg"]
+
+# Entries of the index file: the number of the event at an offset, the
+# offset in the replay file and the kind of event (GAME or SNAPSHOT). Events
+# are numbered from 0 across the whole file, not counting snapshots.
+INDEX_ENTRY = struct.Struct("<QQB")
+
+# The fields of each kind of event: "s" for a string, "n" for a number
+EVENT_FIELDS = {
+    GAME: "sss",
+    TOSS: "nn",
+    CHOOSE: "nns",
+    ATTACK: "nnn",
+    END: "",
+    SNAPSHOT: "ssnnnnn" + "nsnn" * 2
+}
+
+Event = Tuple
+
+
+def encode_varint(value: int, buffer: bytearray) -> None:
+    """Appends an unsigned integer to a buffer, seven bits per byte with the
+    high bit set on every byte but the last.
+
+    Args:
+        value: The integer to encode.
+        buffer: The buffer to append to.
+    """
+    while value > 0x7F:
+        buffer.append(value & 0x7F | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def decode_varint(data, position: int) -> Tuple[int, int]:
+    """Reads an unsigned integer encoded by encode_varint.
+
+    Args:
+        data: The bytes to read from.
+        position: The position to start reading at.
+
+    Returns:
+        The integer and the position after it.
+    """
+    value = 0
+    shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+def encode_string(value: str, buffer: bytearray) -> None:
+    """Appends a length-prefixed UTF-8 string to a buffer."""
+    encoded = value.encode("utf-8")
+    encode_varint(len(encoded), buffer)
+    buffer += encoded
+
+
+def decode_string(data, position: int) -> Tuple[str, int]:
+    """Reads a string encoded by encode_string.
+
+    Returns:
+        The string and the position after it.
+    """
+    length, position = decode_varint(data, position)
+    return bytes(data[position:position + length]).decode("utf-8"), \
+        position + length
+
+
+class ReplayWriter():
+    """Appends the events of games to a binary replay file.
+
+    Every event is a varint kind followed by its fields, with numbers as
+    varints and names as length-prefixed strings. Events are written as they
+    happen, and the file is flushed at the end of each game.
+
+    A snapshot of the full game state is written at the next checkpoint once
+    the snapshot interval has passed since the last one, unless the interval
+    is 0. The start of every game and every snapshot is listed in an
+    index file next to the replay file, so that readers can seek to any
+    event without replaying the whole file.
+    """
+
+    def __init__(self, path: str, snapshot_interval: int = 32) -> None:
+        self.path = path
+        self.snapshot_interval = snapshot_interval
+        self.game = None
+        self.since_snapshot = 0
+        self.events = 0
+        self.offset = 0
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            # Carry on numbering events from the end of the existing file
+            reader = ReplayReader(path)
+            if not os.path.exists(reader.index_path):
+                reader.build_index()
+            self.events = reader.count_events()
+            self.offset = os.path.getsize(path)
+        self.file = open(path, "ab")  # pylint: disable=R1732
+        self.index = open(path + ".idx", "ab")  # pylint: disable=R1732
+        if self.offset == 0:
+            self.file.write(MAGIC)
+            self.offset = len(MAGIC)
+
+    def write(self, kind: int, *fields) -> None:
+        """Writes one event.
+
+        Args:
+            kind: The kind of event.
+            fields: The fields of the event, as integers or strings.
+        """
+        if kind == GAME:
+            self.index.write(INDEX_ENTRY.pack(self.events, self.offset, GAME))
+            self.since_snapshot = 0
+        self.append(encode_event(kind, fields))
+        self.events += 1
+        self.since_snapshot += 1
+
+    def checkpoint(self) -> None:
+        """Writes a snapshot if one is due. Must only be called between
+        attacks, once the game has moved on from the last one."""
+        if self.game is not None and \
+                0 < self.snapshot_interval <= self.since_snapshot:
+            self.write_snapshot()
+
+    def write_snapshot(self) -> None:
+        """Writes a snapshot of the current state of the game."""
+        self.index.write(INDEX_ENTRY.pack(self.events, self.offset,
+                                          SNAPSHOT))
+        self.append(encode_event(SNAPSHOT, get_snapshot(self.game)))
+        self.since_snapshot = 0
+
+    def append(self, buffer: bytearray) -> None:
+        """Appends encoded bytes to the replay file."""
+        self.file.write(buffer)
+        self.offset += len(buffer)
+
+    def start_game(self,
+                   player_1: str,
+                   player_2: str,
+                   seed="",
+                   game: Game = None) -> None:
+        """Records the start of a game.
+
+        Args:
+            player_1: The name of player 1.
+            player_2: The name of player 2.
+            seed: The seed of the game's random number generator, if known.
+            game: The game being recorded. Snapshots are only written if
+            this is given.
+        """
+        self.game = game
+        self.write(GAME, str(seed), player_1, player_2)
+
+    def coin_toss(self, choice: str, outcome: str) -> None:
+        """Records the coin toss.
+
+        Args:
+            choice: Player 1's choice: "Heads" or "Tails".
+            outcome: The result of the coin flip: "Heads" or "Tails".
+        """
+        self.write(TOSS, COINS.index(choice), COINS.index(outcome))
+
+    def choose_character(self, player: int, character: str,
+                         name: str) -> None:
+        """Records a character choice.
+
+        Args:
+            player: 0 if player 1 chose, or 1 if player 2 chose.
+            character: The name of the character class.
+            name: The name given to the character.
+        """
+        self.write(CHOOSE, player, CHARACTERS.index(character), name)
+
+    def attack(self, strength: str, damage_opponent: int,
+               damage_self: int) -> None:
+        """Records an attack.
+
+        Args:
+            strength: The strength of the attack: "con", "bal" or "agg".
+            damage_opponent: The damage done to the opponent, as returned by
+            Character.attack.
+            damage_self: The damage done to self.
+        """
+        self.write(ATTACK, STRENGTHS.index(strength), damage_opponent,
+                   damage_self)
+
+    def end_game(self) -> None:
+        """Records the end of a game and flushes the files."""
+        self.write(END)
+        self.game = None
+        self.file.flush()
+        self.index.flush()
+
+    def close(self) -> None:
+        """Flushes and closes the files."""
+        self.file.close()
+        self.index.close()
+
+
+class ReplayReader():
+    """Reads the events of games from a binary replay file."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.index_path = path + ".idx"
+
+    def read_events(self, offset: int = None) -> Iterator[Event]:
+        """Reads every event in the file, in order.
+
+        Args:
+            offset: The offset of the event to start from. If not given,
+            reading starts from the first event.
+
+        Returns:
+            An iterator of events, each a tuple of the kind and its fields,
+            with strengths, classes and coin sides decoded to strings.
+        """
+        for _, event in self.read_positions(offset):
+            yield event
+
+    def read_positions(self, offset: int = None) -> Iterator[Tuple[int,
+                                                                   Event]]:
+        """Reads every event in the file along with its offset.
+
+        Args:
+            offset: The offset of the event to start from. If not given,
+            reading starts from the first event.
+
+        Returns:
+            An iterator of the offset of each event and the event.
+        """
+        if os.path.getsize(self.path) == 0:
+            return
+        with open(self.path, "rb") as file, \
+                mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[:len(MAGIC)] != MAGIC:
+                raise ValueError("Not a replay file.")
+            position = len(MAGIC) if offset is None else offset
+            while position < len(data):
+                start = position
+                event, position = ReplayReader.decode_event(data, position)
+                yield start, event
+
+    @staticmethod
+    def decode_event(data, position: int) -> Tuple[Event, int]:
+        """Decodes one event.
+
+        Args:
+            data: The bytes to read from.
+            position: The position of the event.
+
+        Returns:
+            The event and the position after it.
+        """
+        kind, position = decode_varint(data, position)
+        if kind not in EVENT_FIELDS:
+            raise ValueError(f"Unknown replay event kind {kind}.")
+        event = [kind]
+        for field in EVENT_FIELDS[kind]:
+            decoder = decode_string if field == "s" else decode_varint
+            value, position = decoder(data, position)
+            event.append(value)
+        if kind == TOSS:
+            event[1:] = [COINS[event[1]], COINS[event[2]]]
+        elif kind == CHOOSE:
+            event[2] = CHARACTERS[event[2]]
+        elif kind == ATTACK:
+            event[1] = STRENGTHS[event[1]]
+        return tuple(event), position
+
+    def read_games(self) -> Iterator[List[Event]]:
+        """Reads the events of each game in the file. A game which was never
+        finished is returned with the events written so far.
+
+        Returns:
+            An iterator of lists of events, one list per game.
+        """
+        events = []
+        for event in self.read_events():
+            if event[0] == GAME and events:
+                yield events
+                events = []
+            events.append(event)
+            if event[0] == END:
+                yield events
+                events = []
+        if events:
+            yield events
+
+    def build_index(self) -> None:
+        """Writes the index file by reading the whole replay file. Used for
+        replay files written without an index."""
+        with open(self.index_path, "wb") as index:
+            number = 0
+            for offset, event in self.read_positions():
+                if event[0] in (GAME, SNAPSHOT):
+                    index.write(INDEX_ENTRY.pack(number, offset, event[0]))
+                if event[0] != SNAPSHOT:
+                    number += 1
+
+    def find_entry(self, event: int) -> Tuple[int, int, int]:
+        """Finds the last index entry at or before an event by binary search.
+
+        Args:
+            event: The number of the event.
+
+        Returns:
+            The event number, offset and kind of the index entry.
+        """
+        size = os.path.getsize(self.index_path) // INDEX_ENTRY.size
+        if size == 0:
+            raise IndexError("The replay file has no games.")
+        with open(self.index_path, "rb") as file, \
+                mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as index:
+            low, high = 0, size
+            while high - low > 1:
+                middle = (low + high) // 2
+                if INDEX_ENTRY.unpack_from(index, middle *
+                                           INDEX_ENTRY.size)[0] <= event:
+                    low = middle
+                else:
+                    high = middle
+            return INDEX_ENTRY.unpack_from(index, low * INDEX_ENTRY.size)
+
+    def count_events(self) -> int:
+        """Counts the events in the file, not counting snapshots, by reading
+        on from the last index entry.
+
+        Returns:
+            The number of events.
+        """
+        if os.path.getsize(self.index_path) == 0:
+            return 0
+        number, offset, _ = self.find_entry(2**64 - 1)
+        for event in self.read_events(offset):
+            if event[0] != SNAPSHOT:
+                number += 1
+        return number
+
+    def get_game(self, event: int) -> Game:
+        """Rebuilds the state of a game just after one of its events, by
+        starting from the closest earlier snapshot or game start and only
+        replaying the events after it.
+
+        Args:
+            event: The number of the event, counting from 0 across the whole
+            file and not counting snapshots.
+
+        Returns:
+            The game which the event belongs to, in the state after it.
+        """
+        number, offset, _ = self.find_entry(event)
+        game = None
+        for item in self.read_events(offset):
+            if item[0] == SNAPSHOT:
+                game = restore_snapshot(item)
+                continue
+            if number > event:
+                return game
+            game = apply_event(game, item)
+            number += 1
+        if number <= event:
+            raise IndexError("The replay file has no such event.")
+        return game
+
+
+def encode_event(kind: int, fields: Tuple) -> bytearray:
+    """Encodes one event.
+
+    Args:
+        kind: The kind of event.
+        fields: The fields of the event, as integers or strings.
+
+    Returns:
+        The encoded event.
+    """
+    buffer = bytearray()
+    encode_varint(kind, buffer)
+    for field in fields:
+        if isinstance(field, str):
+            encode_string(field, buffer)
+        else:
+            encode_varint(field, buffer)
+    return buffer
+
+
+def get_snapshot(game: Game) -> Tuple:
+    """Gets the fields of a snapshot of a game's full state. The coin toss
+    must have been made.
+
+    Args:
+        game: The game to take a snapshot of.
+
+    Returns:
+        The fields of the snapshot.
+    """
+    fields = [
+        game.player_1.get_name(),
+        game.player_2.get_name(), game.round,
+        0 if game.order[0] is game.player_1 else 1, game.current_player,
+        *game.wins
+    ]
+    for player in (game.player_1, game.player_2):
+        character = player.get_character()
+        if character is None:
+            fields += [0, "", 0, 0]
+        else:
+            fields += [
+                CHARACTER_CLASSES.index(type(character)) + 1,
+                character.get_name(),
+                character.get_health(),
+                character.get_damage_ticks()
+            ]
+    return tuple(fields)
+
+
+def restore_snapshot(event: Event) -> Game:
+    """Builds a game from a snapshot event.
+
+    Args:
+        event: The snapshot event.
+
+    Returns:
+        The game in the state of the snapshot.
+    """
+    game = Game()
+    game.set_players(Player(event[1]), Player(event[2]))
+    game.round = event[3]
+    game.order = [game.player_1, game.player_2] if event[4] == 0 else [
+        game.player_2, game.player_1
+    ]
+    game.current_player = event[5]
+    game.wins = [event[6], event[7]]
+    for player, fields in ((game.player_1, event[8:12]),
+                           (game.player_2, event[12:16])):
+        if fields[0] > 0:
+            player.character = CHARACTER_CLASSES[fields[0] - 1](fields[1])
+            game.claim_character(type(player.character).__name__)
+            player.character.health = fields[2]
+            player.character.damage_per_round = fields[3]
+    return game
+
+
+def apply_event(game: Union[Game, None], event: Event) -> Game:
+    """Applies one event to a game, without any randomness.
+
+    Args:
+        game: The game to apply the event to, or None before a game start.
+        event: The event.
+
+    Returns:
+        The game after the event. A game start returns a new game.
+    """
+    kind = event[0]
+    if kind == GAME:
+        game = Game()
+        game.set_players(Player(event[2]), Player(event[3]))
+    elif kind == TOSS:
+        game.set_coin_toss(event[1], event[2])
+    elif kind == CHOOSE:
+        player = game.get_player_1() if event[1] == 0 else game.get_player_2()
+        game.choose_character(player, event[2], event[3])
+    elif kind == ATTACK:
+        apply_attack(game, *event[1:])
+    return game
+
+
+def replay_game(events: List[Event]) -> Game:
+    """Rebuilds a game from its events, without any randomness.
+
+    Args:
+        events: The events of the game, as read by ReplayReader.
+
+    Returns:
+        The game in the state after its last event.
+    """
+    game = None
+    for event in events:
+        game = apply_event(game, event)
+    return game
+
+
+def apply_attack(game: Game, strength: str, damage_opponent: int,
+                 damage_self: int) -> None:
+    """Applies a recorded attack by the current player and moves the game on
+    in the same way as a live game: to the other player's turn, and to the
+    next round if the attack ended the round.
+
+    Args:
+        game: The game to apply the attack to.
+        strength: The strength of the attack.
+        damage_opponent: The damage done to the opponent.
+        damage_self: The damage done to self.
+    """
+    game.get_current_player().get_character().resolve_attack(
+        game.get_opponent_player().get_character(), strength, damage_opponent,
+        damage_self)
+    game.swap_player()
+    if game.is_round_over():
+        winner = game.resolve_round()
+        if not game.is_game_over():
+            game.next_round(winner is None)
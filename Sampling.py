@@ -0,0 +1,234 @@
+# pylint: disable=C0103
+import math
+import random
+from fractions import Fraction
+from numbers import Real
+from typing import Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+
+
+# Ranges of the uniform multipliers used by Character.attack for damage
+# dealt to the opponent and to self. Conservative attacks do no damage to
+# the attacker.
+OPPONENT_RANGES = {
+    "con": (Fraction("0.4"), Fraction("0.6")),
+    "bal": (Fraction("0.6"), Fraction("0.8")),
+    "agg": (Fraction("0.8"), Fraction("1"))
+}
+SELF_RANGES = {
+    "con": None,
+    "bal": (Fraction("0.4"), Fraction("0.6")),
+    "agg": (Fraction("0.6"), Fraction("0.8"))
+}
+
+Outcome = Union[Real, Tuple[Real, ...]]
+
+
+def roll_distribution(damage: int, low: Fraction,
+                      high: Fraction) -> Dict[int, Fraction]:
+    """Calculates the exact distribution of round(damage * uniform(low,
+    high)).
+
+    Args:
+        damage: The base damage of the character.
+        low: The lower bound of the multiplier.
+        high: The upper bound of the multiplier.
+
+    Returns:
+        A map from each possible amount of damage to its probability.
+    """
+    start = damage * low
+    end = damage * high
+    distribution = {}
+    for value in range(math.floor(start), math.ceil(end) + 1):
+        overlap = min(end, value + Fraction(1, 2)) - max(
+            start, value - Fraction(1, 2))
+        if overlap > 0:
+            distribution[value] = overlap / (end - start)
+    return distribution
+
+
+def attack_distribution(damage: int,
+                        strength: str) -> Dict[Tuple[int, int], Fraction]:
+    """Calculates the exact distribution of the damage done by an attack,
+    not counting damage ticks.
+
+    Args:
+        damage: The base damage of the attacking character.
+        strength: The strength of the attack: "con", "bal" or "agg".
+
+    Returns:
+        A map from each possible pair of damage to the opponent and damage to
+        self to its probability.
+    """
+    opponent = roll_distribution(damage, *OPPONENT_RANGES[strength])
+    if SELF_RANGES[strength] is None:
+        own = {0: Fraction(1)}
+    else:
+        own = roll_distribution(damage, *SELF_RANGES[strength])
+    return {(damage_opponent, damage_self): p * q
+            for damage_opponent, p in opponent.items()
+            for damage_self, q in own.items()}
+
+
+class AliasTable():
+    """Samples a discrete distribution in constant time by the alias method.
+
+    The table has one column per outcome. A draw picks a column uniformly and
+    then either keeps it or takes its alias, so a single uniform random
+    number is needed for each draw, whatever the number of outcomes.
+
+    Outcomes must be numbers, or tuples of numbers of the same length.
+    """
+
+    def __init__(self,
+                 outcomes: Sequence[Outcome],
+                 probabilities: Sequence[Real],
+                 width: int = None) -> None:
+        self.outcomes = list(outcomes)
+        self.probabilities = list(probabilities)
+        # Pad the table with impossible outcomes up to the given width
+        size = max(len(self.outcomes), width or 0)
+        self.outcomes += [self.outcomes[0]] * (size - len(self.outcomes))
+        weights = self.probabilities + [0] * (size -
+                                              len(self.probabilities))
+        # Build the table by Vose's method, in exact arithmetic when the
+        # probabilities are fractions
+        total = sum(weights)
+        scaled = [p * size / total for p in weights]
+        self.probability = [1.0] * size
+        self.alias = list(range(size))
+        small = [i for i, p in enumerate(scaled) if p < 1]
+        large = [i for i, p in enumerate(scaled) if p >= 1]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            self.probability[less] = float(scaled[less])
+            self.alias[less] = more
+            scaled[more] -= 1 - scaled[less]
+            if scaled[more] < 1:
+                small.append(more)
+            else:
+                large.append(more)
+        self.values = np.array(self.outcomes, dtype=np.float64)
+        self.probability_array = np.array(self.probability)
+        self.alias_array = np.array(self.alias, dtype=np.int64)
+
+    def sample(self, rng: random.Random = None) -> Outcome:
+        """Draws one outcome.
+
+        Args:
+            rng: The random number generator to use.
+
+        Returns:
+            The outcome drawn.
+        """
+        draw = (rng if rng is not None else random).random() * len(
+            self.outcomes)
+        column = int(draw)
+        if draw - column < self.probability[column]:
+            return self.outcomes[column]
+        return self.outcomes[self.alias[column]]
+
+    def sample_many(self, generator: np.random.Generator,
+                    size: int) -> np.ndarray:
+        """Draws many outcomes at once.
+
+        Args:
+            generator: The NumPy random number generator to use.
+            size: The number of outcomes to draw.
+
+        Returns:
+            An array of the outcomes drawn, with a row per draw if the
+            outcomes are tuples.
+        """
+        draw = generator.random(size) * len(self.outcomes)
+        column = draw.astype(np.int64)
+        keep = draw - column < self.probability_array[column]
+        return self.values[np.where(keep, column, self.alias_array[column])]
+
+
+class AliasTableSet():
+    """Several alias tables rebuilt to the same width and flattened, so that
+    a batch of draws can each come from a different table.
+
+    Every table must have outcomes of the same shape.
+    """
+
+    def __init__(self, tables: List[AliasTable]) -> None:
+        self.width = max(len(table.probabilities) for table in tables)
+        tables = [
+            AliasTable(table.outcomes[:len(table.probabilities)],
+                       table.probabilities, self.width) for table in tables
+        ]
+        self.probability = np.concatenate(
+            [table.probability_array for table in tables])
+        # Aliases are indexes into the flattened tables
+        self.alias = np.concatenate([
+            table.alias_array + row * self.width
+            for row, table in enumerate(tables)
+        ])
+        self.values = np.concatenate([table.values for table in tables])
+        # Each part of the outcomes as a contiguous array, for fast lookups
+        self.columns = [
+            np.ascontiguousarray(self.values[:, part])
+            for part in range(self.values.shape[1])
+        ] if self.values.ndim > 1 else [self.values]
+
+    def sample_indexes(self, generator: np.random.Generator,
+                       offsets: np.ndarray) -> np.ndarray:
+        """Draws one outcome from each of the given tables, as indexes into
+        the flattened tables.
+
+        Args:
+            generator: The NumPy random number generator to use.
+            offsets: The index of the table to draw from multiplied by the
+            table width, for each draw.
+
+        Returns:
+            An array of indexes into values, or into each of columns.
+        """
+        draw = generator.random(offsets.size)
+        draw *= self.width
+        column = draw.astype(np.int64)
+        draw -= column
+        column += offsets
+        return np.where(draw < self.probability[column], column,
+                        self.alias[column])
+
+    def sample_many(self, generator: np.random.Generator,
+                    rows: np.ndarray) -> np.ndarray:
+        """Draws one outcome from each of the given tables.
+
+        Args:
+            generator: The NumPy random number generator to use.
+            rows: The index of the table to draw from, for each draw.
+
+        Returns:
+            An array of the outcomes drawn, with a row per draw if the
+            outcomes are tuples.
+        """
+        return self.values[self.sample_indexes(generator, rows * self.width)]
+
+
+attack_tables: Dict[Tuple[int, str], AliasTable] = {}
+
+
+def get_attack_table(damage: int, strength: str) -> AliasTable:
+    """Gets the alias table of the damage done by an attack, not counting
+    damage ticks. Tables are built on first use and then cached.
+
+    Args:
+        damage: The base damage of the attacking character.
+        strength: The strength of the attack: "con", "bal" or "agg".
+
+    Returns:
+        An alias table of pairs of damage to the opponent and damage to self.
+    """
+    table = attack_tables.get((damage, strength))
+    if table is None:
+        distribution = attack_distribution(damage, strength)
+        table = AliasTable(list(distribution), list(distribution.values()))
+        attack_tables[(damage, strength)] = table
+    return table
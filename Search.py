@@ -0,0 +1,224 @@
+# pylint: disable=C0103
+import math
+import random
+import time
+from typing import Dict, List, Tuple, Union
+
+from Character import TICKS, Character, Magic
+from Sampling import get_attack_table
+from Solver import CHARACTERS, STRENGTHS
+
+
+# A battle state seen by the side whose turn it is: own character class
+# index, opponent character class index, own health, opponent health, own
+# damage ticks and opponent damage ticks.
+SearchState = Tuple[int, int, int, int, int, int]
+
+
+class MonteCarloSearch():
+    """Chooses attacks by Monte Carlo tree search within a time budget.
+
+    States are held as plain tuples seen from the side whose turn it is, and
+    are stepped by sampling the alias table of each attack rather than by
+    building characters. Identical states share their statistics in a
+    transposition table, whichever side or sequence of attacks reached them,
+    and the table is kept between searches.
+
+    Every attack does damage to the opponent, so no state can be reached
+    from itself and the search graph has no cycles.
+    """
+
+    def __init__(self,
+                 budget: float = 0.05,
+                 exploration: float = 1.4,
+                 max_states: int = 1000000,
+                 rng: random.Random = None) -> None:
+        self.budget = budget
+        self.exploration = exploration
+        self.max_states = max_states
+        self.random = rng if rng is not None else random
+        # Visits, then the count and total score of each attack strength
+        self.table: Dict[SearchState, List[float]] = {}
+        self.iterations = 0
+        # The alias table of each attack, the damage ticks it adds and
+        # whether it is made by a Magic character, indexed by character class
+        # index * 3 + strength index
+        self.outcomes = []
+        for character in CHARACTERS:
+            magic = issubclass(character, Magic)
+            for strength in STRENGTHS:
+                self.outcomes.append(
+                    (get_attack_table(character("").damage, strength),
+                     TICKS[strength] if magic else 0, magic))
+
+    @staticmethod
+    def get_state(character: Character, opponent: Character) -> SearchState:
+        """Converts a pair of live characters to a search state.
+
+        Args:
+            character: The character whose turn it is.
+            opponent: The opposing character.
+
+        Returns:
+            The search state.
+        """
+        return (CHARACTERS.index(type(character)),
+                CHARACTERS.index(type(opponent)), character.get_health(),
+                opponent.get_health(), character.get_damage_ticks(),
+                opponent.get_damage_ticks())
+
+    def step(self, state: SearchState,
+             code: int) -> Tuple[Union[SearchState, None], float]:
+        """Makes one random attack from a search state.
+
+        Args:
+            state: The state before the attack.
+            code: The index of the attack strength.
+
+        Returns:
+            The state after the attack, seen from the opponent, and 0. If the
+            round is over, None and the score of the attacking side instead.
+        """
+        table, ticks, magic = self.outcomes[state[0] * 3 + code]
+        damage_opponent, damage_self = table.sample(self.random)
+        if magic:
+            damage_opponent += state[5]
+        own_health = max(state[2] - damage_self, 0)
+        opponent_health = max(state[3] - damage_opponent, 0)
+        if own_health == 0:
+            return None, 0.5 if opponent_health == 0 else 0.0
+        if opponent_health == 0:
+            return None, 1.0
+        return (state[1], state[0], opponent_health, own_health,
+                state[5] + ticks, state[4]), 0.0
+
+    def rollout(self, state: SearchState) -> float:
+        """Plays random attacks from a state until the round is over.
+
+        Args:
+            state: The state to start from.
+
+        Returns:
+            The score of the side whose turn it is in the starting state.
+        """
+        flip = False
+        while True:
+            state, score = self.step(state, self.random.randrange(3))
+            if state is None:
+                return 1 - score if flip else score
+            flip = not flip
+
+    def select(self, stats: List[float]) -> int:
+        """Picks the attack strength to explore from a state by UCB1.
+
+        Args:
+            stats: The statistics of the state.
+
+        Returns:
+            The index of the attack strength.
+        """
+        for code in range(3):
+            if stats[1 + code] == 0:
+                return code
+        log = math.log(stats[0])
+        return max(range(3),
+                   key=lambda x: stats[4 + x] / stats[1 + x] + self.
+                   exploration * math.sqrt(log / stats[1 + x]))
+
+    def iterate(self, root: SearchState) -> None:
+        """Runs one iteration of the search from a root state."""
+        path = []
+        state = root
+        while True:
+            stats = self.table.get(state)
+            if stats is None:
+                # Expand a new state, scoring it for the previous attacker
+                self.table[state] = [0, 0, 0, 0, 0.0, 0.0, 0.0]
+                score = 1 - self.rollout(state)
+                break
+            code = self.select(stats)
+            path.append((stats, code))
+            state, score = self.step(state, code)
+            if state is None:
+                break
+            score = 0.0
+        for stats, code in reversed(path):
+            stats[0] += 1
+            stats[1 + code] += 1
+            stats[4 + code] += score
+            score = 1 - score
+
+    def search(self,
+               character: Character,
+               opponent: Character,
+               budget: float = None) -> str:
+        """Searches for the best attack until the time budget runs out.
+
+        Args:
+            character: The character whose turn it is.
+            opponent: The opposing character.
+            budget: The time to search for in seconds. If not given, the
+            budget of the search is used.
+
+        Returns:
+            The most explored attack strength: "con", "bal" or "agg".
+        """
+        root = self.get_state(character, opponent)
+        self.run(root, self.budget if budget is None else budget)
+        stats = self.table[root]
+        return STRENGTHS[max(range(3), key=lambda x: stats[1 + x])]
+
+    def run(self, root: SearchState, budget: float) -> None:
+        """Runs iterations from a root state until the time budget runs out.
+        At least one iteration is always run.
+
+        Args:
+            root: The state to search from.
+            budget: The time to search for in seconds.
+        """
+        if len(self.table) >= self.max_states:
+            self.table.clear()
+        deadline = time.perf_counter() + budget
+        while True:
+            self.iterate(root)
+            self.iterations += 1
+            if time.perf_counter() >= deadline:
+                return
+
+    def choose(self, character: Character, opponent: Character) -> str:
+        """Chooses an attack strength within the search's time budget, so
+        that the search can be used as a computer player's policy.
+
+        Args:
+            character: The character which is attacking.
+            opponent: The character being attacked.
+
+        Returns:
+            The best attack strength found: "con", "bal" or "agg".
+        """
+        return self.search(character, opponent)
+
+    def get_value(self, character: str, opponent: str) -> float:
+        """Estimates the expected score of a round by searching from its
+        start, once with each side taking the first turn.
+
+        Args:
+            character: The name of a character class.
+            opponent: The name of the opponent's character class.
+
+        Returns:
+            The estimated score of the round for the character, counting a
+            win as 1 and a draw as 0.5.
+        """
+        names = [x.__name__ for x in CHARACTERS]
+        own = names.index(character)
+        other = names.index(opponent)
+        first = (own, other, 100, 100, 0, 0)
+        second = (other, own, 100, 100, 0, 0)
+        values = []
+        for root in (first, second):
+            self.run(root, self.budget)
+            stats = self.table[root]
+            code = stats.index(max(stats[1:4]), 1, 4) - 1
+            values.append(stats[4 + code] / max(stats[1 + code], 1))
+        return (values[0] + 1 - values[1]) / 2
@@ -0,0 +1,430 @@
+# pylint: disable=C0103
+import asyncio
+import itertools
+import json
+import math
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Set
+
+from Game import Game
+from Leaderboard import Leaderboard
+from Matchmaking import MatchmakingQueue
+from Player import Player
+from SessionStore import SessionStore
+
+
+STRENGTHS = ["con", "bal", "agg"]
+
+
+class ServerError(Exception):
+    """An error in a client's request, which is sent back to the client."""
+
+
+class Session():
+    """One game hosted by the server."""
+
+    def __init__(self, session_id: str, player_1: str,
+                 player_2: str) -> None:
+        self.id = session_id
+        self.game = Game()
+        self.game.set_players(Player(player_1), Player(player_2))
+        self.tossed = False
+        self.finished = False
+        # Given to player 2 to join a game made with create
+        self.token = secrets.token_urlsafe(16)
+
+    def get_seat(self, player: Player) -> int:
+        """Gets the seat of a player in the game.
+
+        Args:
+            player: The player.
+
+        Returns:
+            0 for player 1 and 1 for player 2.
+        """
+        return 0 if player is self.game.get_player_1() else 1
+
+    def get_state(self) -> Dict[str, Any]:
+        """Gets the state of the game, to send to clients.
+
+        Returns:
+            A dictionary of the state of the game.
+        """
+        game = self.game
+        players = []
+        for player in (game.get_player_1(), game.get_player_2()):
+            character = player.get_character()
+            players.append({
+                "name": player.get_name(),
+                "class": type(character).__name__ if character else None,
+                "character": character.get_name() if character else None,
+                "health": character.get_health() if character else None,
+                "ticks": character.get_damage_ticks() if character else None
+            })
+        current = game.get_current_player()
+        winner = game.get_game_winner() if self.finished else None
+        return {
+            "session": self.id,
+            "round": game.round,
+            "wins": list(game.wins),
+            "turn": current.get_name() if current and not self.finished
+            else None,
+            "players": players,
+            "finished": self.finished,
+            "winner": winner.get_name() if winner else None
+        }
+
+
+class Client():
+    """One connection to the server, and the players it controls."""
+
+    def __init__(self) -> None:
+        # The seats this client plays in each session, 0 and 1
+        self.seats: Dict[str, Set[int]] = {}
+
+
+class GameServer():
+    """An asyncio server which hosts many independent games at once.
+
+    Clients send requests as lines of JSON, each with an "op" field, and get
+    one line of JSON back for each request. The ops are:
+        create: Starts a game between "players" (a list of two names), with
+        the client as player 1. The reply has a "token" for player 2.
+        join: Joins a game made with create as player 2, with its "token".
+        toss: Player 1 calls "choice" ("Heads" or "Tails") for the coin toss.
+        choose: The current player picks a "character" class and may give it
+        a "name".
+        attack: The current player attacks with a "strength".
+        state: Gets the state of the game.
+        stats: Gets the counters of the session store.
+        queue: Waits up to "timeout" seconds for an opponent for "player",
+        and starts a game between them, with the client as that player.
+        Players are matched by their rating on the leaderboard, unless a
+        "rating" is given.
+    The other ops need the "session" returned by create or queue. Each
+    connection can only make the moves of the players it created, joined or
+    queued as, and only on their turn. Replies have "ok" set to true, or
+    false with an "error" message.
+
+    Game logic takes microseconds, so it runs on the event loop. Leaderboard
+    writes can block on a database, so they run on a single worker thread,
+    which also keeps them in order.
+
+    Sessions are held in a session store, so abandoned games are evicted once
+    they have been idle for a while or the store is full, and finished games
+    are removed once their result is recorded. Queued players are paired as
+    soon as they join if they can be, and the rest of the queue is paired in
+    a batch at every match interval.
+    """
+
+    def __init__(self,
+                 leaderboard: Leaderboard = None,
+                 store: SessionStore = None,
+                 matchmaker: MatchmakingQueue = None) -> None:
+        self.leaderboard = leaderboard if leaderboard is not None else \
+            Leaderboard()
+        self.sessions = store if store is not None else SessionStore()
+        self.ids = itertools.count(1)
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.server = None
+        # The task answering each connected client
+        self.clients: Dict[asyncio.StreamWriter, asyncio.Task] = {}
+        self.matchmaker = matchmaker if matchmaker is not None else \
+            MatchmakingQueue()
+        # The session each queued player is waiting for
+        self.waiting: Dict[str, asyncio.Future] = {}
+        self.matcher = None
+
+    async def start(self,
+                    host: str = "127.0.0.1",
+                    port: int = 8765,
+                    match_interval: float = 1.0) -> asyncio.AbstractServer:
+        """Starts listening for clients.
+
+        Args:
+            host: The address to listen on.
+            port: The port to listen on, or 0 for any free port.
+            match_interval: The time in seconds between pairing the queue.
+
+        Returns:
+            The asyncio server.
+        """
+        self.server = await asyncio.start_server(self.handle_client, host,
+                                                 port)
+        self.matcher = asyncio.create_task(
+            self.run_matchmaking(match_interval))
+        return self.server
+
+    async def close(self) -> None:
+        """Stops listening, disconnects clients and waits for leaderboard
+        writes to finish."""
+        if self.matcher is not None:
+            self.matcher.cancel()
+        for future in self.waiting.values():
+            if not future.done():
+                future.set_exception(ServerError("The server is closing."))
+        if self.server is not None:
+            self.server.close()
+            for writer in list(self.clients):
+                writer.close()
+            await asyncio.gather(*self.clients.values(),
+                                 return_exceptions=True)
+            await self.server.wait_closed()
+        self.executor.shutdown(wait=True)
+
+    async def handle_client(self, reader: asyncio.StreamReader,
+                            writer: asyncio.StreamWriter) -> None:
+        """Answers the requests of one client until it disconnects."""
+        self.clients[writer] = asyncio.current_task()
+        client = Client()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                reply = await self.handle_line(line, client)
+                writer.write(json.dumps(reply).encode("utf-8") + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.clients.pop(writer, None)
+            writer.close()
+
+    async def handle_line(self, line: bytes,
+                          client: Client) -> Dict[str, Any]:
+        """Answers one request.
+
+        Args:
+            line: The request as a line of JSON.
+            client: The client which sent the request.
+
+        Returns:
+            The reply.
+        """
+        try:
+            try:
+                request = json.loads(line)
+            except ValueError as error:
+                raise ServerError("Requests must be valid JSON.") from error
+            if not isinstance(request, dict):
+                raise ServerError("Requests must be JSON objects.")
+            handler = getattr(self, f"do_{request.get('op')}", None)
+            if handler is None:
+                raise ServerError(f"Unknown op {request.get('op')!r}.")
+            reply = handler(request, client)
+            if asyncio.iscoroutine(reply):
+                reply = await reply
+            return {"ok": True, **reply}
+        except ServerError as error:
+            return {"ok": False, "error": str(error)}
+        except Exception:  # pylint: disable=W0703
+            # Keep the connection open whatever goes wrong with one request
+            return {"ok": False, "error": "The request failed."}
+
+    def get_session(self, request: Dict[str, Any]) -> Session:
+        """Finds the session a request is for."""
+        session_id = request.get("session")
+        session = self.sessions.get(session_id) if isinstance(
+            session_id, str) else None
+        if session is None:
+            raise ServerError("Unknown session.")
+        return session
+
+    @staticmethod
+    def check_turn(session: Session, client: Client, seat: int) -> None:
+        """Checks that a client plays a seat in a session.
+
+        Raises:
+            ServerError: The client does not play the seat.
+        """
+        if seat not in client.seats.get(session.id, ()):
+            raise ServerError("It is not your turn.")
+
+    async def run_matchmaking(self, interval: float) -> None:
+        """Pairs the players in the queue at intervals until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            for player_1, player_2 in self.matchmaker.pair_batch():
+                self.start_match(player_1, player_2)
+
+    def start_match(self, player_1: str, player_2: str) -> Session:
+        """Starts a game between two players from the queue and tells both
+        of them. Neither player can be joined with a token.
+
+        Args:
+            player_1: The name of player 1.
+            player_2: The name of player 2.
+
+        Returns:
+            The new session.
+        """
+        session = Session(str(next(self.ids)), player_1, player_2)
+        session.token = None
+        self.sessions.put(session.id, session)
+        for name in (player_1, player_2):
+            future = self.waiting.pop(name, None)
+            if future is not None and not future.done():
+                future.set_result(session)
+        return session
+
+    def do_create(self, request: Dict[str, Any],
+                  client: Client) -> Dict[str, Any]:
+        """Starts a new game, with the client as player 1."""
+        players = request.get("players", ["Player 1", "Player 2"])
+        if not isinstance(players, list) or len(players) != 2 or \
+                not all(isinstance(x, str) and x for x in players):
+            raise ServerError("Two player names are needed.")
+        session = Session(str(next(self.ids)), *players)
+        self.sessions.put(session.id, session)
+        client.seats.setdefault(session.id, set()).add(0)
+        return {
+            "session": session.id,
+            "token": session.token,
+            "state": session.get_state()
+        }
+
+    def do_join(self, request: Dict[str, Any],
+                client: Client) -> Dict[str, Any]:
+        """Joins a game as player 2. Each token can only be used once."""
+        session = self.get_session(request)
+        token = request.get("token")
+        if session.token is None or not isinstance(
+                token, str) or not secrets.compare_digest(
+                    token, session.token):
+            raise ServerError("The token is not valid for this game.")
+        session.token = None
+        client.seats.setdefault(session.id, set()).add(1)
+        return {"session": session.id, "state": session.get_state()}
+
+    def do_toss(self, request: Dict[str, Any],
+                client: Client) -> Dict[str, Any]:
+        """Makes the coin toss."""
+        session = self.get_session(request)
+        self.check_turn(session, client, 0)
+        if session.tossed:
+            raise ServerError("The coin has already been tossed.")
+        choice = request.get("choice")
+        if choice not in ("Heads", "Tails"):
+            raise ServerError("Choose Heads or Tails.")
+        outcome = session.game.coin_toss(choice)
+        session.tossed = True
+        return {"outcome": outcome, "state": session.get_state()}
+
+    def do_choose(self, request: Dict[str, Any],
+                  client: Client) -> Dict[str, Any]:
+        """Picks a character for the current player."""
+        session = self.get_session(request)
+        game = session.game
+        if not session.tossed:
+            raise ServerError("The coin has not been tossed.")
+        player = game.get_current_player()
+        if player.get_character() is not None:
+            raise ServerError("Both characters have been chosen.")
+        self.check_turn(session, client, session.get_seat(player))
+        choice = request.get("character")
+        name = request.get("name") or choice
+        chosen = isinstance(choice, str) and game.choose_character(
+            player, choice, str(name))
+        if not chosen:
+            raise ServerError("That character is not available.")
+        game.swap_player()
+        return {"state": session.get_state()}
+
+    async def do_attack(self, request: Dict[str, Any],
+                        client: Client) -> Dict[str, Any]:
+        """Makes an attack by the current player. Once the game is over and
+        its result is recorded, the session is removed."""
+        session = self.get_session(request)
+        game = session.game
+        if session.finished:
+            raise ServerError("The game is over.")
+        if game.get_opponent_player() is None or any(
+                x.get_character() is None for x in game.order):
+            raise ServerError("Both characters must be chosen first.")
+        self.check_turn(session, client,
+                        session.get_seat(game.get_current_player()))
+        strength = request.get("strength")
+        if strength not in STRENGTHS:
+            raise ServerError("The strength must be con, bal or agg.")
+        damage = game.get_current_player().get_character().attack(
+            game.get_opponent_player().get_character(), strength)
+        game.swap_player()
+        reply = {"damage": list(damage)}
+        if game.is_round_over():
+            winner = game.resolve_round()
+            reply["round_winner"] = winner.get_name() if winner else None
+            if game.is_game_over():
+                session.finished = True
+                try:
+                    await asyncio.get_running_loop().run_in_executor(
+                        self.executor, self.leaderboard.record_game, game)
+                except Exception as error:
+                    raise ServerError(
+                        "The result could not be recorded.") from error
+                finally:
+                    self.sessions.remove(session.id)
+                    client.seats.pop(session.id, None)
+            else:
+                game.next_round(winner is None)
+        reply["state"] = session.get_state()
+        return reply
+
+    def do_state(self, request: Dict[str, Any],
+                 _: Client) -> Dict[str, Any]:
+        """Gets the state of a game."""
+        return {"state": self.get_session(request).get_state()}
+
+    async def do_queue(self, request: Dict[str, Any],
+                       client: Client) -> Dict[str, Any]:
+        """Waits for an opponent and starts a game with them, with the client
+        as the queued player."""
+        name = request.get("player")
+        rating = request.get("rating")
+        if rating is None and isinstance(name, str):
+            rating = await asyncio.get_running_loop().run_in_executor(
+                self.executor, self.leaderboard.get_rating, name)
+        timeout = request.get("timeout", 60)
+        if not isinstance(name, str) or not name:
+            raise ServerError("A player name is needed.")
+        if not all(
+                isinstance(x, (int, float)) and not isinstance(x, bool)
+                and math.isfinite(x) for x in (rating, timeout)):
+            raise ServerError("The rating and timeout must be numbers.")
+        if name in self.matchmaker:
+            raise ServerError(f"{name} is already in the queue.")
+        self.matchmaker.enqueue(name, rating)
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[name] = future
+        pair = self.matchmaker.pair(name)
+        if pair is not None:
+            self.start_match(pair[1], pair[0])
+        try:
+            session = await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError as error:
+            self.matchmaker.dequeue(name)
+            self.waiting.pop(name, None)
+            raise ServerError("No opponent was found.") from error
+        seat = 0 if session.game.get_player_1().get_name() == name else 1
+        client.seats.setdefault(session.id, set()).add(seat)
+        return {"session": session.id, "state": session.get_state()}
+
+    def do_stats(self, _: Dict[str, Any], __: Client) -> Dict[str, Any]:
+        """Gets the counters of the session store."""
+        return {"stats": self.sessions.get_stats()}
+
+
+async def serve(host: str = "127.0.0.1", port: int = 8765) -> None:
+    """Runs a game server until it is cancelled.
+
+    Args:
+        host: The address to listen on.
+        port: The port to listen on.
+    """
+    server = GameServer()
+    await server.start(host, port)
+    try:
+        await server.server.serve_forever()
+    finally:
+        await server.close()
@@ -0,0 +1,162 @@
+# pylint: disable=C0103
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class SessionStore():
+    """Holds live sessions by id, keeping memory use bounded.
+
+    Sessions are kept in least recently used order. A session which has not
+    been used for longer than the idle TTL is evicted when it is next looked
+    up or when a session is added, and the least recently used session is
+    evicted whenever the store is full. Every eviction is passed to the evict
+    hook, which can persist the session, and a lookup of a session which is
+    not held can be answered by the loader, which can resume it.
+
+    The TTL is in seconds of the given monotonic clock, or None to keep idle
+    sessions until the store is full.
+    """
+
+    def __init__(self,
+                 max_size: int = 10000,
+                 ttl: float = 1800.0,
+                 on_evict: Callable[[Hashable, Any], None] = None,
+                 loader: Callable[[Hashable], Any] = None,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        if max_size < 1:
+            raise ValueError("The store must hold at least one session.")
+        self.max_size = max_size
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self.loader = loader
+        self.clock = clock
+        # Each session and the time it was last used, least recent first
+        self.sessions: "OrderedDict[Hashable, Tuple[Any, float]]" = \
+            OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def __contains__(self, session_id: Hashable) -> bool:
+        return session_id in self.sessions
+
+    def get(self, session_id: Hashable) -> Any:
+        """Looks up a session and marks it as used.
+
+        Args:
+            session_id: The id of the session.
+
+        Returns:
+            The session, or None if it is not held and cannot be loaded.
+        """
+        entry = self.sessions.get(session_id)
+        now = self.clock()
+        if entry is not None and self.is_expired(entry[1], now):
+            self.evict(session_id, expired=True)
+            entry = None
+        if entry is not None:
+            self.hits += 1
+            self.sessions[session_id] = (entry[0], now)
+            self.sessions.move_to_end(session_id)
+            return entry[0]
+        self.misses += 1
+        if self.loader is None:
+            return None
+        session = self.loader(session_id)
+        if session is not None:
+            self.loads += 1
+            self.put(session_id, session)
+        return session
+
+    def put(self, session_id: Hashable, session: Any) -> None:
+        """Adds or replaces a session, marking it as used. Expired sessions
+        are evicted first, then the least recently used sessions until there
+        is room.
+
+        Args:
+            session_id: The id of the session.
+            session: The session.
+        """
+        now = self.clock()
+        self.sessions.pop(session_id, None)
+        self.expire(now)
+        while len(self.sessions) >= self.max_size:
+            self.evict(next(iter(self.sessions)))
+        self.sessions[session_id] = (session, now)
+
+    def remove(self, session_id: Hashable) -> Any:
+        """Removes a session without passing it to the evict hook, such as
+        when its game is over.
+
+        Args:
+            session_id: The id of the session.
+
+        Returns:
+            The session, or None if it was not held.
+        """
+        entry = self.sessions.pop(session_id, None)
+        return entry[0] if entry is not None else None
+
+    def expire(self, now: float = None) -> int:
+        """Evicts every session which has been idle for longer than the TTL.
+
+        Args:
+            now: The current time on the store's clock.
+
+        Returns:
+            The number of sessions evicted.
+        """
+        if self.ttl is None:
+            return 0
+        now = self.clock() if now is None else now
+        count = 0
+        # Sessions are in order of last use, so stop at the first live one
+        while self.sessions:
+            session_id, (_, used) = next(iter(self.sessions.items()))
+            if not self.is_expired(used, now):
+                break
+            self.evict(session_id, expired=True)
+            count += 1
+        return count
+
+    def evict(self, session_id: Hashable, expired: bool = False) -> None:
+        """Removes a session and passes it to the evict hook.
+
+        Args:
+            session_id: The id of the session.
+            expired: Whether the session is being evicted for being idle.
+        """
+        session, _ = self.sessions.pop(session_id)
+        self.evictions += 1
+        if expired:
+            self.expirations += 1
+        if self.on_evict is not None:
+            self.on_evict(session_id, session)
+
+    def is_expired(self, used: float, now: float) -> bool:
+        """Checks whether a session last used at a time has been idle for
+        longer than the TTL."""
+        return self.ttl is not None and now - used > self.ttl
+
+    def get_stats(self) -> Dict[str, int]:
+        """Gets the store's counters.
+
+        Returns:
+            The number of lookups which found a session, lookups which did
+            not, sessions resumed by the loader, sessions evicted, of which
+            for being idle, and sessions held.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "loads": self.loads,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "size": len(self.sessions)
+        }
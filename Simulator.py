@@ -0,0 +1,235 @@
+# pylint: disable=C0103
+from typing import Sequence, Type, Union
+
+import numpy as np
+
+from Character import Character, Magic
+from Sampling import AliasTableSet, get_attack_table
+
+
+STRENGTH_CODES = {"con": 0, "bal": 1, "agg": 2}
+
+# Damage ticks added to the opponent of a Magic character, indexed by
+# strength code.
+TICKS = np.array([1, 2, 3])
+
+Characters = Union[Type[Character], Sequence[Type[Character]]]
+Strengths = Union[str, int, Sequence[int], np.ndarray]
+
+
+class BattleSimulator():
+    """Simulates many independent battles (single rounds) in lockstep.
+
+    The state of every battle is held in arrays, and each step makes one
+    attack in every battle which is still in progress. The damage of every
+    attack is drawn from the same alias tables as Character.attack, so the
+    results are statistically the same as calling it on each battle.
+
+    Internally, the battles in progress are held in attacker and defender
+    arrays which swap over after every step, and finished battles are
+    compacted away once enough of them have built up.
+    """
+
+    def __init__(self,
+                 characters_1: Characters,
+                 characters_2: Characters,
+                 battles: int,
+                 rng: np.random.Generator = None) -> None:
+        self.random = rng if rng is not None else np.random.default_rng()
+        self.battles = battles
+        self.damage = np.stack([
+            self._column(characters_1, lambda x: x("").damage),
+            self._column(characters_2, lambda x: x("").damage)
+        ], axis=1).astype(np.float64)
+        # One alias table per base damage and strength, found at offset
+        # (damage index * 3 + strength code) * table width
+        damages, damage_index = np.unique(self.damage, return_inverse=True)
+        self.damage_index = damage_index.reshape(self.damage.shape)
+        self.tables = AliasTableSet([
+            get_attack_table(int(damage), strength)
+            for damage in damages for strength in STRENGTH_CODES
+        ])
+        self.magic = np.stack([
+            self._column(characters_1, lambda x: issubclass(x, Magic)),
+            self._column(characters_2, lambda x: issubclass(x, Magic))
+        ], axis=1)
+        self._health = np.zeros((battles, 2), dtype=np.int32)
+        self._damage_per_round = np.zeros((battles, 2), dtype=np.int32)
+        self._current = np.zeros(battles, dtype=np.int8)
+        self.strength = np.zeros((battles, 2), dtype=np.int64)
+        self.attacks = 0
+        self.reset()
+
+    @property
+    def health(self) -> np.ndarray:
+        """The health of each character, with a row per battle and a column
+        per side."""
+        self._store()
+        return self._health
+
+    @property
+    def damage_per_round(self) -> np.ndarray:
+        """The damage ticks of each character, with a row per battle and a
+        column per side."""
+        self._store()
+        return self._damage_per_round
+
+    @property
+    def current(self) -> np.ndarray:
+        """The side whose turn it is in each battle."""
+        self._store()
+        return self._current
+
+    def _column(self, characters: Characters, attribute) -> np.ndarray:
+        """Builds a column of per-battle values from character classes."""
+        if isinstance(characters, type):
+            return np.full(self.battles, attribute(characters))
+        if len(characters) != self.battles:
+            raise ValueError("One character class is needed per battle.")
+        values = {x: attribute(x) for x in set(characters)}
+        return np.array([values[x] for x in characters])
+
+    def _strengths(self, strength: Strengths) -> np.ndarray:
+        """Converts a strength or strengths to an array of strength codes."""
+        if isinstance(strength, str):
+            strength = STRENGTH_CODES[strength]
+        return np.broadcast_to(np.asarray(strength, dtype=np.int64),
+                               (self.battles, ))
+
+    def reset(self, first: Union[int, np.ndarray] = None) -> None:
+        """Resets every battle to full health and no damage ticks.
+
+        Args:
+            first: The side (0 or 1) which attacks first in each battle. If
+            not given, each battle is decided by a coin toss.
+        """
+        self._health.fill(100)
+        self._damage_per_round.fill(0)
+        if first is None:
+            first = self.random.integers(0, 2, self.battles)
+        self._current[:] = first
+        self._load(np.arange(self.battles))
+
+    def set_strengths(self, strength_1: Strengths,
+                      strength_2: Strengths) -> None:
+        """Sets the attack strength used by each side.
+
+        Args:
+            strength_1: The attack strength of side 0, as a strength name, a
+            strength code or an array of strength codes, one per battle.
+            strength_2: The attack strength of side 1, in the same form.
+        """
+        self._store()
+        self.strength[:, 0] = self._strengths(strength_1)
+        self.strength[:, 1] = self._strengths(strength_2)
+        self._load(self.index[self.alive])
+
+    def _load(self, index: np.ndarray) -> None:
+        """Loads the given battles into the attacker and defender arrays."""
+        sides = [self._current[index].astype(np.int64)]
+        sides.append(1 - sides[0])
+        self.index = index
+        self.alive = np.ones(index.size, dtype=bool)
+        self.sides = sides
+        # Per-side arrays: element 0 is the attacker, element 1 the defender
+        self.side_health = []
+        self.side_ticks = []
+        self.side_table = []
+        self.side_tick_increase = []
+        for side in sides:
+            strength = self.strength[index, side]
+            self.side_health.append(self._health[index, side].astype(float))
+            self.side_ticks.append(
+                self._damage_per_round[index, side].astype(float))
+            self.side_table.append(
+                (self.damage_index[index, side] * 3 + strength) *
+                self.tables.width)
+            self.side_tick_increase.append(
+                np.where(self.magic[index, side], TICKS[strength], 0))
+
+    def _store(self) -> None:
+        """Writes the attacker and defender arrays back to the per-battle
+        arrays."""
+        for role, side in enumerate(self.sides):
+            self._health[self.index, side] = self.side_health[role]
+            self._damage_per_round[self.index, side] = self.side_ticks[role]
+        self._current[self.index] = self.sides[0]
+
+    def _swap(self) -> None:
+        """Swaps the attacker and defender arrays."""
+        for arrays in (self.sides, self.side_health, self.side_ticks,
+                       self.side_table, self.side_tick_increase):
+            arrays.reverse()
+
+    def step(self) -> None:
+        """Makes one attack in every battle which is still in progress."""
+        size = self.index.size
+        if size == 0:
+            return
+        alive = self.alive
+
+        # Draw the damage of every attack in this step in one batch
+        draws = self.tables.sample_indexes(self.random, self.side_table[0])
+        damage_opponent = self.tables.columns[0][draws]
+        damage_self = self.tables.columns[1][draws]
+
+        # A character only has damage ticks if its opponent is Magic, so the
+        # ticks can be added and increased without checking the attacker
+        damage_opponent += self.side_ticks[1]
+        damage_opponent *= alive
+        damage_self *= alive
+        self.side_ticks[1] += self.side_tick_increase[0] * alive
+
+        # Take damage, without letting health go below zero
+        np.maximum(self.side_health[1] - damage_opponent, 0,
+                   out=self.side_health[1])
+        np.maximum(self.side_health[0] - damage_self, 0,
+                   out=self.side_health[0])
+
+        self.attacks += int(np.count_nonzero(alive))
+        alive &= self.side_health[0] > 0
+        alive &= self.side_health[1] > 0
+        self._swap()
+
+        # Drop finished battles once they make up half of the arrays
+        remaining = np.count_nonzero(alive)
+        if remaining * 2 <= size:
+            self._store()
+            self._load(self.index[alive])
+
+    def is_dead(self) -> np.ndarray:
+        """Determine which characters are dead.
+
+        Returns:
+            A boolean array with a row per battle and a column per side.
+        """
+        return self.health <= 0
+
+    def get_results(self) -> np.ndarray:
+        """Gets the result of every battle.
+
+        Returns:
+            An array with 0 where side 0 won, 1 where side 1 won, 2 where the
+            battle was a draw and -1 where the battle is still in progress.
+        """
+        dead = self.is_dead()
+        results = np.full(self.battles, -1, dtype=np.int8)
+        results[dead[:, 1]] = 0
+        results[dead[:, 0]] = 1
+        results[dead[:, 0] & dead[:, 1]] = 2
+        return results
+
+    def run(self, strength_1: Strengths, strength_2: Strengths) -> np.ndarray:
+        """Steps every battle until all of them are over.
+
+        Args:
+            strength_1: The attack strength of side 0.
+            strength_2: The attack strength of side 1.
+
+        Returns:
+            The result of every battle, as returned by get_results.
+        """
+        self.set_strengths(strength_1, strength_2)
+        while self.index.size > 0:
+            self.step()
+        return self.get_results()
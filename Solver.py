@@ -0,0 +1,537 @@
+# pylint: disable=C0103
+import os
+import pickle
+import sys
+import zlib
+from itertools import combinations, permutations
+from typing import Dict, List, Tuple, Type
+
+from Character import TICKS, Assault, Character, Health, Magic
+from Sampling import attack_distribution
+
+
+CHARACTERS = [Assault, Health, Magic]
+UNIFORM_POLICY = {"con": 1 / 3, "bal": 1 / 3, "agg": 1 / 3}
+STRENGTHS = ["con", "bal", "agg"]
+
+# Outcomes of a round
+WIN_1 = 0
+WIN_2 = 1
+DRAW = 2
+
+State = Tuple[int, int, int, int, int]
+Value = Tuple[float, float, float, float, float, float]
+
+
+class BattleSolver():
+    """Calculates exact outcome probabilities for a matchup of two character
+    classes, where each side picks its attack strength at random with fixed
+    probabilities.
+
+    A battle state is the health of both characters, the damage ticks of
+    both characters and the side whose turn it is. The value of a state is
+    the probability of each outcome of the round (side 1 wins, side 2 wins
+    or a draw), split by which side takes the first turn of the next round.
+    Values are calculated by memoised recursion over every state which can
+    be reached from the start of a round.
+    """
+
+    def __init__(self,
+                 character_1: Type[Character],
+                 character_2: Type[Character],
+                 policy_1: Dict[str, float] = None,
+                 policy_2: Dict[str, float] = None) -> None:
+        self.character_1 = character_1
+        self.character_2 = character_2
+        self.policy_1 = policy_1 if policy_1 is not None else UNIFORM_POLICY
+        self.policy_2 = policy_2 if policy_2 is not None else UNIFORM_POLICY
+        self.transitions = [
+            self.get_transitions(character_1, self.policy_1),
+            self.get_transitions(character_2, self.policy_2)
+        ]
+        self.table: Dict[State, Value] = {}
+
+    @staticmethod
+    def get_transitions(character: Type[Character],
+                        policy: Dict[str, float]) -> List[Tuple]:
+        """Lists the possible results of one attack by a character.
+
+        Args:
+            character: The class of the attacking character.
+            policy: The probability of the character using each strength.
+
+        Returns:
+            A list of tuples of the probability, the damage to the opponent,
+            the damage to self, the damage ticks added to the opponent and
+            whether the opponent's damage ticks are added to the damage.
+        """
+        damage = character("").damage
+        magic = issubclass(character, Magic)
+        transitions = []
+        for strength, weight in policy.items():
+            if weight == 0:
+                continue
+            ticks = TICKS[strength] if magic else 0
+            for (damage_opponent, damage_self), probability in \
+                    attack_distribution(damage, strength).items():
+                transitions.append((weight * float(probability),
+                                    damage_opponent, damage_self, ticks,
+                                    magic))
+        return transitions
+
+    @staticmethod
+    def get_next_state(state: State, transition: Tuple) -> State:
+        """Applies one result of an attack to a battle state.
+
+        Args:
+            state: The battle state before the attack.
+            transition: The result of the attack, as listed by
+            get_transitions.
+
+        Returns:
+            The battle state after the attack.
+        """
+        health_1, health_2, ticks_1, ticks_2, turn = state
+        _, damage_opponent, damage_self, ticks, magic = transition
+        if turn == 0:
+            if magic:
+                damage_opponent += ticks_2
+            return (max(health_1 - damage_self, 0),
+                    max(health_2 - damage_opponent, 0), ticks_1,
+                    ticks_2 + ticks, 1)
+        if magic:
+            damage_opponent += ticks_1
+        return (max(health_1 - damage_opponent, 0),
+                max(health_2 - damage_self, 0), ticks_1 + ticks, ticks_2, 0)
+
+    def get_value(self, state: State) -> Value:
+        """Calculates the value of a battle state.
+
+        Args:
+            state: The health of side 1, the health of side 2, the damage
+            ticks of side 1, the damage ticks of side 2 and the side (0 or 1)
+            whose turn it is.
+
+        Returns:
+            The probability of each round outcome and next starting side, at
+            index outcome * 2 + side.
+        """
+        value = self.table.get(state)
+        if value is not None:
+            return value
+        turn = state[4]
+        totals = [0.0] * 6
+        for transition in self.transitions[turn]:
+            next_state = self.get_next_state(state, transition)
+            if next_state[0] == 0 or next_state[1] == 0:
+                # The other side takes the first turn of the next round
+                if next_state[0] == 0 and next_state[1] == 0:
+                    outcome = DRAW
+                else:
+                    outcome = WIN_1 if next_state[1] == 0 else WIN_2
+                totals[outcome * 2 + 1 - turn] += transition[0]
+            else:
+                for index, result in enumerate(self.get_value(next_state)):
+                    totals[index] += transition[0] * result
+        value = tuple(totals)
+        self.table[state] = value
+        return value
+
+    def solve(self) -> None:
+        """Calculates the value of every state which can be reached from the
+        start of a round."""
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(limit, 10000))
+        try:
+            self.get_value((100, 100, 0, 0, 0))
+            self.get_value((100, 100, 0, 0, 1))
+        finally:
+            sys.setrecursionlimit(limit)
+
+    def get_round_probabilities(self,
+                                health_1: int = 100,
+                                health_2: int = 100,
+                                ticks_1: int = 0,
+                                ticks_2: int = 0,
+                                turn: int = 0) -> Tuple[float, float, float]:
+        """Gets the probability of each outcome of the round from a battle
+        state.
+
+        Returns:
+            The probability of side 1 winning, side 2 winning and a draw.
+        """
+        value = self.get_value((health_1, health_2, ticks_1, ticks_2, turn))
+        return (value[0] + value[1], value[2] + value[3],
+                value[4] + value[5])
+
+    def get_game_probabilities(self) -> Tuple[float, float, float]:
+        """Gets the probability of each outcome of a whole game, starting
+        with the coin toss.
+
+        A game ends when the third round is over, and drawn rounds before
+        then are replayed. The side which takes the first turn of a round is
+        the one which did not make the last attack of the round before.
+
+        Returns:
+            The probability of side 1 winning, side 2 winning and a draw.
+        """
+        rounds = [self.get_value((100, 100, 0, 0, side)) for side in (0, 1)]
+        results = [self.get_game_value(rounds, 0, 0, side) for side in (0, 1)]
+        return tuple((results[0][x] + results[1][x]) / 2 for x in range(3))
+
+    def get_game_value(self, rounds: List[Value], decided: int, wins_1: int,
+                       starter: int) -> Tuple[float, float, float]:
+        """Calculates the outcome probabilities of the rest of a game.
+
+        Args:
+            rounds: The values of the start of a round, for each starting
+            side.
+            decided: The number of rounds won so far.
+            wins_1: The number of rounds won so far by side 1.
+            starter: The side which takes the first turn of the next round.
+
+        Returns:
+            The probability of side 1 winning, side 2 winning and a draw.
+        """
+        if decided == 2:
+            return self.get_final_round_value(rounds[starter], wins_1)
+
+        # Drawn rounds are replayed, so the values for both starting sides
+        # depend on each other
+        decisive = []
+        for side in (0, 1):
+            totals = [0.0, 0.0, 0.0]
+            for index in range(WIN_1 * 2, WIN_2 * 2 + 2):
+                outcome, next_starter = divmod(index, 2)
+                result = self.get_game_value(rounds, decided + 1,
+                                             wins_1 + (outcome == WIN_1),
+                                             next_starter)
+                for x in range(3):
+                    totals[x] += rounds[side][index] * result[x]
+            decisive.append(totals)
+        return self.include_draws(rounds, decisive)[starter]
+
+    @staticmethod
+    def include_draws(rounds: List[Value],
+                      decisive: List[List[float]]) -> List[Tuple]:
+        """Accounts for drawn rounds being replayed.
+
+        The value G(s) of a game whose next round is started by side s is
+        X(s) + D(s, 0) G(0) + D(s, 1) G(1), where X(s) comes from decisive
+        rounds and D(s, t) is the probability of a draw after which side t
+        starts. The two equations are solved for each game outcome.
+
+        Args:
+            rounds: The values of the start of a round, for each starting
+            side.
+            decisive: X(s) for each starting side.
+
+        Returns:
+            G(s) for each starting side.
+        """
+        a = 1 - rounds[0][DRAW * 2]
+        b = -rounds[0][DRAW * 2 + 1]
+        c = -rounds[1][DRAW * 2]
+        d = 1 - rounds[1][DRAW * 2 + 1]
+        determinant = a * d - b * c
+        return [
+            tuple((d * decisive[0][x] - b * decisive[1][x]) / determinant
+                  for x in range(3)),
+            tuple((a * decisive[1][x] - c * decisive[0][x]) / determinant
+                  for x in range(3))
+        ]
+
+    @staticmethod
+    def get_final_round_value(round_value: Value,
+                              wins_1: int) -> Tuple[float, float, float]:
+        """Calculates the outcome probabilities of a game from the start of
+        its final round.
+
+        Args:
+            round_value: The value of the start of the final round.
+            wins_1: The number of rounds won so far by side 1.
+
+        Returns:
+            The probability of side 1 winning, side 2 winning and a draw.
+        """
+        totals = [0.0, 0.0, 0.0]
+        for outcome in (WIN_1, WIN_2, DRAW):
+            final_1 = wins_1 + (outcome == WIN_1)
+            final_2 = 2 - wins_1 + (outcome == WIN_2)
+            if final_1 > final_2:
+                result = WIN_1
+            elif final_2 > final_1:
+                result = WIN_2
+            else:
+                result = DRAW
+            totals[result] += round_value[outcome * 2] + round_value[outcome *
+                                                                     2 + 1]
+        return tuple(totals)
+
+    def save(self, path: str) -> None:
+        """Saves the solved table to a file.
+
+        Args:
+            path: The path of the file to save to.
+        """
+        with open(path, "wb") as file:
+            pickle.dump(
+                {
+                    "characters": (self.character_1.__name__,
+                                   self.character_2.__name__),
+                    "policies": (self.policy_1, self.policy_2),
+                    "table": self.table
+                }, file, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(path: str) -> "BattleSolver":
+        """Loads a solved table from a file.
+
+        Args:
+            path: The path of the file to load from.
+
+        Returns:
+            A solver holding the loaded table.
+        """
+        with open(path, "rb") as file:
+            data = pickle.load(file)
+        classes = {character.__name__: character for character in CHARACTERS}
+        solver = BattleSolver(classes[data["characters"][0]],
+                              classes[data["characters"][1]],
+                              *data["policies"])
+        solver.table = data["table"]
+        return solver
+
+
+def solve_matchups(
+        directory: str,
+        policy_1: Dict[str, float] = None,
+        policy_2: Dict[str, float] = None
+) -> Dict[Tuple[str, str], BattleSolver]:
+    """Solves every matchup of two different character classes. Tables
+    which have already been saved with the same policies are loaded instead
+    of being solved again.
+
+    Args:
+        directory: The directory to save the tables in.
+        policy_1: The probability of side 1 using each strength.
+        policy_2: The probability of side 2 using each strength.
+
+    Returns:
+        A map from each pair of character class names to its solver.
+    """
+    solvers = {}
+    for character_1, character_2 in permutations(CHARACTERS, 2):
+        names = (character_1.__name__, character_2.__name__)
+        path = os.path.join(directory, f"{names[0]}-{names[1]}.pickle")
+        solver = BattleSolver(character_1, character_2, policy_1, policy_2)
+        if os.path.exists(path):
+            saved = BattleSolver.load(path)
+            if (saved.policy_1, saved.policy_2) == (solver.policy_1,
+                                                    solver.policy_2):
+                solver = saved
+        if not solver.table:
+            solver.solve()
+            solver.save(path)
+        solvers[names] = solver
+    return solvers
+
+
+class PolicySolver():
+    """Finds the best attack strength in every battle state of a matchup.
+
+    Both sides are assumed to play as well as possible. The value of a
+    state to the side whose turn it is is its expected score for the round,
+    counting a win as 1, a draw as 0.5 and a loss as 0, so the value of a
+    state to the other side is 1 minus this. Values are calculated by
+    expectimax over every state which can be reached from the start of a
+    round.
+    """
+
+    def __init__(self, character_1: Type[Character],
+                 character_2: Type[Character]) -> None:
+        self.character_1 = character_1
+        self.character_2 = character_2
+        self.transitions = [{
+            strength: BattleSolver.get_transitions(character, {strength: 1})
+            for strength in STRENGTHS
+        } for character in (character_1, character_2)]
+        self.values: Dict[State, float] = {}
+        self.actions: Dict[State, int] = {}
+
+    def get_value(self, state: State) -> float:
+        """Calculates the value of a battle state to the side whose turn it
+        is, and records the best attack strength for that side.
+
+        Args:
+            state: The health of side 1, the health of side 2, the damage
+            ticks of side 1, the damage ticks of side 2 and the side (0 or 1)
+            whose turn it is.
+
+        Returns:
+            The expected score of the side whose turn it is.
+        """
+        value = self.values.get(state)
+        if value is not None:
+            return value
+        turn = state[4]
+        best = -1.0
+        for code, strength in enumerate(STRENGTHS):
+            total = 0.0
+            for transition in self.transitions[turn][strength]:
+                next_state = BattleSolver.get_next_state(state, transition)
+                own_health = next_state[turn]
+                opponent_health = next_state[1 - turn]
+                if own_health == 0:
+                    total += transition[0] * (0.5
+                                              if opponent_health == 0 else 0)
+                elif opponent_health == 0:
+                    total += transition[0]
+                else:
+                    total += transition[0] * (1 - self.get_value(next_state))
+            if total > best:
+                best = total
+                self.actions[state] = code
+        self.values[state] = best
+        return best
+
+    def solve(self) -> None:
+        """Calculates the best attack strength in every state which can be
+        reached from the start of a round."""
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(limit, 10000))
+        try:
+            self.get_value((100, 100, 0, 0, 0))
+            self.get_value((100, 100, 0, 0, 1))
+        finally:
+            sys.setrecursionlimit(limit)
+
+
+class PolicyTable():
+    """A compact lookup table of the best attack strength in every battle
+    state, for every matchup of character classes.
+
+    Each matchup, seen from the side choosing the attack, has a byte array
+    with one entry per combination of own health, opponent health and
+    damage ticks. Only one side of a matchup can have damage ticks, as only
+    the opponent of a Magic character gets them. Each entry is 0 for an
+    unreachable state, or 1 plus the index of the best strength.
+    """
+
+    def __init__(self) -> None:
+        self.tables: Dict[Tuple[str, str], Tuple[int, bytearray]] = {}
+        self.values: Dict[Tuple[str, str], float] = {}
+
+    def add_solver(self, solver: PolicySolver) -> None:
+        """Adds the solved matchup to the table, from both sides.
+
+        Args:
+            solver: A solved policy solver.
+        """
+        names = [solver.character_1.__name__, solver.character_2.__name__]
+        for side in (0, 1):
+            states = [(state, code)
+                      for state, code in solver.actions.items()
+                      if state[4] == side]
+            size = max(state[2] + state[3] for state, _ in states) + 1
+            table = bytearray(101 * 101 * size)
+            for state, code in states:
+                table[((state[side] * 101 + state[1 - side]) * size +
+                       state[2] + state[3])] = code + 1
+            self.tables[(names[side], names[1 - side])] = (size, table)
+            # The value of a round to this side, whoever takes the first turn
+            first = solver.values[(100, 100, 0, 0, side)]
+            second = 1 - solver.values[(100, 100, 0, 0, 1 - side)]
+            self.values[(names[side], names[1 - side])] = (first + second) / 2
+
+    def choose(self, character: Character, opponent: Character) -> str:
+        """Looks up the best attack strength for a character.
+
+        Args:
+            character: The character which is attacking.
+            opponent: The character being attacked.
+
+        Returns:
+            The best attack strength: "con", "bal" or "agg".
+        """
+        size, table = self.tables[(type(character).__name__,
+                                   type(opponent).__name__)]
+        ticks = character.get_damage_ticks() + opponent.get_damage_ticks()
+        code = table[(character.get_health() * 101 + opponent.get_health()) *
+                     size + min(ticks, size - 1)]
+        return STRENGTHS[code - 1] if code > 0 else "bal"
+
+    def get_value(self, character: str, opponent: str) -> float:
+        """Gets the expected score of a round with best play.
+
+        Args:
+            character: The name of a character class.
+            opponent: The name of the opponent's character class.
+
+        Returns:
+            The expected score of the round for the character, counting a
+            win as 1 and a draw as 0.5. Matchups missing from the table are
+            counted as even.
+        """
+        return self.values.get((character, opponent), 0.5)
+
+    def save(self, path: str) -> None:
+        """Saves the table to a compressed file.
+
+        Args:
+            path: The path of the file to save to.
+        """
+        data = pickle.dumps(
+            {
+                "tables": {
+                    key: (size, bytes(table))
+                    for key, (size, table) in self.tables.items()
+                },
+                "values": self.values
+            }, pickle.HIGHEST_PROTOCOL)
+        with open(path, "wb") as file:
+            file.write(zlib.compress(data, 9))
+
+    @staticmethod
+    def load(path: str) -> "PolicyTable":
+        """Loads a table from a compressed file.
+
+        Args:
+            path: The path of the file to load from.
+
+        Returns:
+            The loaded table.
+        """
+        with open(path, "rb") as file:
+            data = pickle.loads(zlib.decompress(file.read()))
+        policy = PolicyTable()
+        policy.tables = {
+            key: (size, bytearray(table))
+            for key, (size, table) in data["tables"].items()
+        }
+        policy.values = data["values"]
+        return policy
+
+    @staticmethod
+    def load_or_solve(path: str) -> "PolicyTable":
+        """Loads a table from a file, or solves every matchup and saves the
+        table to the file if it does not exist yet.
+
+        Args:
+            path: The path of the file.
+
+        Returns:
+            The table.
+        """
+        if os.path.exists(path):
+            return PolicyTable.load(path)
+        policy = PolicyTable()
+        for character_1, character_2 in combinations(CHARACTERS, 2):
+            solver = PolicySolver(character_1, character_2)
+            solver.solve()
+            policy.add_solver(solver)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        policy.save(path)
+        return policy
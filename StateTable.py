@@ -0,0 +1,150 @@
+# pylint: disable=C0103
+from array import array
+from typing import Tuple
+
+from Character import Assault, Health, Magic
+from Game import Game
+from Player import Player
+
+
+CHARACTERS = [Assault, Health, Magic]
+
+
+class GameStateTable():
+    """Holds the state of many games in contiguous typed columns.
+
+    Each game is a row, with the health, damage ticks and character class of
+    both players, the round number, the playing order, whose turn it is and
+    the number of rounds won by each player. A row takes 15 bytes, so far
+    more games can be held in memory than as Game objects. Player and
+    character names are not stored.
+    """
+
+    def __init__(self) -> None:
+        self.health_1 = array("h")
+        self.health_2 = array("h")
+        self.ticks_1 = array("H")
+        self.ticks_2 = array("H")
+        # Index of each character class in CHARACTERS, or -1 if not chosen
+        self.class_1 = array("b")
+        self.class_2 = array("b")
+        self.round = array("B")
+        # 0 if player 1 goes first, 1 if player 2 does, or -1 if undecided
+        self.first = array("b")
+        self.current = array("B")
+        self.wins_1 = array("B")
+        self.wins_2 = array("B")
+        self.columns = [
+            self.health_1, self.health_2, self.ticks_1, self.ticks_2,
+            self.class_1, self.class_2, self.round, self.first, self.current,
+            self.wins_1, self.wins_2
+        ]
+
+    def __len__(self) -> int:
+        return len(self.round)
+
+    def get_size(self) -> int:
+        """Gets the memory used by the rows of the table.
+
+        Returns:
+            The number of bytes used by the columns' contents.
+        """
+        return sum(column.itemsize * len(column) for column in self.columns)
+
+    def append(self, game: Game) -> int:
+        """Adds a game to the end of the table.
+
+        Args:
+            game: The game to add.
+
+        Returns:
+            The index of the game's row.
+        """
+        for column in self.columns:
+            column.append(0)
+        self.store(len(self) - 1, game)
+        return len(self) - 1
+
+    def store(self, index: int, game: Game) -> None:
+        """Overwrites a row of the table with the state of a game.
+
+        Args:
+            index: The index of the row.
+            game: The game to store.
+        """
+        for player, health, ticks, classes in (
+                (game.get_player_1(), self.health_1, self.ticks_1,
+                 self.class_1),
+                (game.get_player_2(), self.health_2, self.ticks_2,
+                 self.class_2)):
+            character = player.get_character() if player else None
+            if character is None:
+                health[index], ticks[index], classes[index] = 0, 0, -1
+            else:
+                health[index] = character.get_health()
+                ticks[index] = character.get_damage_ticks()
+                classes[index] = CHARACTERS.index(type(character))
+        self.round[index] = game.round
+        if game.order == [None, None]:
+            self.first[index] = -1
+        else:
+            self.first[index] = 0 if game.order[0] is game.player_1 else 1
+        self.current[index] = game.current_player
+        self.wins_1[index], self.wins_2[index] = game.wins
+
+    def load(self, index: int, game: Game) -> Game:
+        """Restores the state of a game from a row of the table.
+
+        The game must already have both players. Characters are created
+        where a player has none or one of a different class, and are named
+        after their class.
+
+        Args:
+            index: The index of the row.
+            game: The game to restore into.
+
+        Returns:
+            The game.
+        """
+        game.reset_available_characters()
+        for player, health, ticks, classes in (
+                (game.get_player_1(), self.health_1, self.ticks_1,
+                 self.class_1),
+                (game.get_player_2(), self.health_2, self.ticks_2,
+                 self.class_2)):
+            if classes[index] < 0:
+                player.character = None
+                continue
+            character_class = CHARACTERS[classes[index]]
+            game.claim_character(character_class.__name__)
+            if not isinstance(player.get_character(), character_class):
+                player.character = character_class(character_class.__name__,
+                                                   player.random)
+            player.character.health = health[index]
+            player.character.damage_per_round = ticks[index]
+        game.round = self.round[index]
+        if self.first[index] < 0:
+            game.order = [None, None]
+        elif self.first[index] == 0:
+            game.order = [game.player_1, game.player_2]
+        else:
+            game.order = [game.player_2, game.player_1]
+        game.current_player = self.current[index]
+        game.wins = [self.wins_1[index], self.wins_2[index]]
+        return game
+
+    def get_game(self,
+                 index: int,
+                 names: Tuple[str, str] = ("Player 1", "Player 2")) -> Game:
+        """Builds a new game from a row of the table.
+
+        Args:
+            index: The index of the row.
+            names: The names to give player 1 and player 2.
+
+        Returns:
+            The new game.
+        """
+        game = Game()
+        game.set_players(Player(names[0]), Player(names[1]))
+        return self.load(index, game)
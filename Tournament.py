@@ -0,0 +1,142 @@
+# pylint: disable=C0103
+from concurrent.futures import ProcessPoolExecutor
+from itertools import permutations, product
+from typing import Dict, List, Tuple
+
+from Engine import Engine, Strategy
+from Game import Game
+
+
+CHARACTERS = ["Assault", "Health", "Magic"]
+
+Pairing = Tuple[str, str, str, str]
+
+
+class AssignedStrategy(Strategy):
+    """Wraps a strategy so that it always picks a given character class."""
+
+    def __init__(self, strategy: Strategy, character: str) -> None:
+        self.strategy = strategy
+        self.character = character
+
+    def choose_coin(self, rng) -> str:
+        return self.strategy.choose_coin(rng)
+
+    def choose_character(self, available: List[str], rng) -> str:
+        return self.character
+
+    def choose_attack(self, game: Game, rng) -> str:
+        return self.strategy.choose_attack(game, rng)
+
+
+def play_chunk(task: Tuple[int, int, Pairing, Strategy, Strategy,
+                           int]) -> Tuple[Pairing, List[int]]:
+    """Plays one chunk of games for a pairing. Used by the worker processes.
+
+    Every chunk has its own engine, seeded from the tournament seed, the
+    pairing and the chunk number, so the results of a chunk do not depend on
+    which worker plays it.
+
+    Args:
+        task: The tournament seed, the chunk number, the pairing, the
+        strategies of player 1 and player 2 and the number of games to play.
+
+    Returns:
+        The pairing, and the number of games won by player 1, won by player 2
+        and drawn.
+    """
+    seed, chunk, pairing, strategy_1, strategy_2, games = task
+    engine = Engine(seed=f"{seed}:{':'.join(pairing)}:{chunk}")
+    return pairing, engine.run(AssignedStrategy(strategy_1, pairing[0]),
+                               AssignedStrategy(strategy_2, pairing[2]),
+                               games)
+
+
+class Tournament():
+    """Plays every pairing of character classes and strategies against each
+    other across a pool of worker processes.
+
+    The same seed always gives the same results, whatever the number of
+    workers.
+    """
+
+    def __init__(self,
+                 strategies: Dict[str, Strategy],
+                 seed: int = 0,
+                 workers: int = None,
+                 chunk_size: int = 1000) -> None:
+        self.strategies = strategies
+        self.seed = seed
+        self.workers = workers
+        self.chunk_size = chunk_size
+
+    def get_pairings(self) -> List[Pairing]:
+        """Gets every pairing played in the tournament.
+
+        Returns:
+            A list of pairings, each of which is a tuple of player 1's
+            character class, player 1's strategy, player 2's character class
+            and player 2's strategy.
+        """
+        return [(character_1, strategy_1, character_2, strategy_2)
+                for character_1, character_2 in permutations(CHARACTERS, 2)
+                for strategy_1, strategy_2 in product(self.strategies,
+                                                      repeat=2)]
+
+    def get_tasks(self, games: int) -> List[Tuple]:
+        """Splits the tournament into chunks of games.
+
+        Args:
+            games: The number of games to play for each pairing.
+
+        Returns:
+            A list of tasks to pass to play_chunk.
+        """
+        tasks = []
+        for pairing in self.get_pairings():
+            for chunk, start in enumerate(range(0, games, self.chunk_size)):
+                tasks.append(
+                    (self.seed, chunk, pairing, self.strategies[pairing[1]],
+                     self.strategies[pairing[3]],
+                     min(self.chunk_size, games - start)))
+        return tasks
+
+    def run(self, games: int) -> Dict[Pairing, List[int]]:
+        """Plays the tournament.
+
+        Args:
+            games: The number of games to play for each pairing.
+
+        Returns:
+            A dictionary from each pairing to the number of games won by
+            player 1, won by player 2 and drawn.
+        """
+        tasks = self.get_tasks(games)
+        results = {pairing: [0, 0, 0] for pairing in self.get_pairings()}
+        if self.workers == 1:
+            chunks = map(play_chunk, tasks)
+        else:
+            with ProcessPoolExecutor(self.workers) as executor:
+                chunks = list(executor.map(play_chunk, tasks))
+        for pairing, counts in chunks:
+            for index, count in enumerate(counts):
+                results[pairing][index] += count
+        return results
+
+    @staticmethod
+    def get_win_rates(
+            results: Dict[Pairing, List[int]]) -> Dict[Pairing, float]:
+        """Converts tournament results to player 1's win rate in each
+        pairing.
+
+        Args:
+            results: The results returned by run.
+
+        Returns:
+            A dictionary from each pairing to the fraction of games won by
+            player 1.
+        """
+        return {
+            pairing: counts[0] / max(sum(counts), 1)
+            for pairing, counts in results.items()
+        }
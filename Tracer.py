@@ -0,0 +1,223 @@
+# pylint: disable=C0103
+import contextlib
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator
+
+
+class Tracer():
+    """Writes a timeline of calls to a file as Chrome trace events, which can
+    be opened in Perfetto or chrome://tracing as a flame chart.
+
+    Each call is written as one complete event when it returns, so calls made
+    inside it nest under it on the timeline. Events are written straight to a
+    buffered file rather than kept in memory, so a trace of any length uses
+    the same memory. Calls scheduled to run later are linked to the call
+    which scheduled them by a flow arrow.
+    """
+
+    def __init__(self,
+                 path: str,
+                 buffer_size: int = 1 << 16,
+                 clock: Callable[[], float] = time.perf_counter) -> None:
+        self.path = path
+        self.clock = clock
+        self.start = clock()
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        self.flows = itertools.count(1)
+        self.count = 0
+        # pylint: disable=R1732
+        self.file = open(path, "w", encoding="utf-8", buffering=buffer_size)
+        self.file.write("[")
+        self.write({
+            "name": "process_name",
+            "ph": "M",
+            "args": {
+                "name": "Battle Game"
+            }
+        })
+
+    def get_time(self, moment: float = None) -> float:
+        """Converts a time on the tracer's clock to a trace timestamp.
+
+        Args:
+            moment: The time, or None for now.
+
+        Returns:
+            The microseconds since the tracer was created.
+        """
+        moment = self.clock() if moment is None else moment
+        return round((moment - self.start) * 1e6, 3)
+
+    def write(self, event: Dict[str, Any]) -> None:
+        """Writes an event to the trace, from the current thread.
+
+        Args:
+            event: The trace event, without its process and thread.
+        """
+        event["pid"] = self.pid
+        event["tid"] = threading.get_ident()
+        text = json.dumps(event, separators=(",", ":"))
+        with self.lock:
+            if self.file is None:
+                return
+            self.file.write(("\n" if self.count == 0 else ",\n") + text)
+            self.count += 1
+
+    def complete(self,
+                 name: str,
+                 category: str,
+                 start: float,
+                 end: float,
+                 args: Dict[str, Any] = None) -> None:
+        """Writes a call which has finished.
+
+        Args:
+            name: The name of the call.
+            category: The category of the call, such as "render".
+            start: The time the call started on the tracer's clock.
+            end: The time the call ended on the tracer's clock.
+            args: Details shown with the call.
+        """
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": self.get_time(start),
+            "dur": round((end - start) * 1e6, 3)
+        }
+        if args:
+            event["args"] = args
+        self.write(event)
+
+    @contextlib.contextmanager
+    def span(self,
+             name: str,
+             category: str,
+             args: Dict[str, Any] = None) -> Iterator[Dict[str, Any]]:
+        """Traces the code run inside a with statement.
+
+        Args:
+            name: The name of the span.
+            category: The category of the span.
+            args: Details shown with the span.
+
+        Yields:
+            The details of the span, which can be added to before it ends.
+        """
+        args = {} if args is None else args
+        start = self.clock()
+        try:
+            yield args
+        except Exception as error:
+            args["error"] = repr(error)
+            raise
+        finally:
+            self.complete(name, category, start, self.clock(), args)
+
+    def wrap(self, name: str, category: str, function: Callable) -> Callable:
+        """Wraps a function so that every call to it is traced.
+
+        Args:
+            name: The name to trace the calls under.
+            category: The category of the calls.
+            function: The function.
+
+        Returns:
+            The wrapped function.
+        """
+
+        @functools.wraps(function)
+        def traced(*args, **kwargs):
+            with self.span(name, category):
+                return function(*args, **kwargs)
+
+        return traced
+
+    def instrument(self,
+                   target: Any,
+                   names: Iterable[str],
+                   category: str,
+                   prefix: str = None) -> None:
+        """Traces calls to methods of one object. The object's current
+        methods are wrapped, so this can be combined with Metrics.instrument
+        if it is called afterwards.
+
+        Args:
+            target: The object.
+            names: The names of the methods.
+            category: The category of the calls.
+            prefix: The prefix of the names the calls are traced under, or
+            None to use the name of the object's class.
+        """
+        prefix = type(target).__name__ if prefix is None else prefix
+        for name in names:
+            setattr(target, name,
+                    self.wrap(f"{prefix}.{name}", category,
+                              getattr(target, name)))
+
+    def defer(self, name: str, delay: int, function: Callable) -> Callable:
+        """Traces a function which is scheduled to be called after a delay,
+        such as by a widget's after method. Call this when scheduling it.
+
+        The call is linked by a flow arrow to the call which scheduled it,
+        and records how much later than the delay it started.
+
+        Args:
+            name: The name to trace the call under.
+            delay: The delay in milliseconds.
+            function: The function.
+
+        Returns:
+            The function to schedule in its place.
+        """
+        flow = next(self.flows)
+        scheduled = self.clock()
+        self.write({
+            "name": name,
+            "cat": "after",
+            "ph": "s",
+            "id": flow,
+            "ts": self.get_time(scheduled)
+        })
+
+        @functools.wraps(function)
+        def deferred(*args, **kwargs):
+            start = self.clock()
+            self.write({
+                "name": name,
+                "cat": "after",
+                "ph": "f",
+                "bp": "e",
+                "id": flow,
+                "ts": self.get_time(start)
+            })
+            late = round((start - scheduled) * 1000 - delay, 3)
+            with self.span(name, "after", {
+                    "delay_ms": delay,
+                    "late_ms": late
+            }):
+                return function(*args, **kwargs)
+
+        return deferred
+
+    def flush(self) -> None:
+        """Writes any buffered events to the file."""
+        with self.lock:
+            if self.file is not None:
+                self.file.flush()
+
+    def close(self) -> None:
+        """Finishes the trace and closes the file. Later events are
+        ignored."""
+        with self.lock:
+            if self.file is None:
+                return
+            self.file.write("\n]\n")
+            self.file.close()
+            self.file = None
@@ -1,4 +1,6 @@
-from typing import Any, Callable, List, Union
+import base64
+from tkinter import PhotoImage
+from typing import Any, Callable, Dict, List, Union
 
 from guizero import App, Box, PushButton
 
@@ -58,3 +60,50 @@ class HoverablePushButton():
         """Enables the button widget."""
         self.widget.enable()
         self.widget.bg = HoverablePushButton.DEFAULT_COLOUR
+
+
+class ImageCache():
+    """Shares decoded images between Picture widgets.
+
+    Each image file is read from disk once per process. Tk images belong to
+    a single Tk instance, so each image is decoded once for each App and
+    then reused by every Picture in that App.
+    """
+    files: Dict[str, bytes] = {}
+    images: Dict[str, PhotoImage] = {}
+    master = None
+
+    @staticmethod
+    def get(app: App, path: str) -> PhotoImage:
+        """Gets the decoded image for a file, loading it if needed.
+
+        Args:
+            app: The App which the image will be shown in.
+            path: The path of the image file.
+
+        Returns:
+            The decoded image, which can be passed to a Picture widget.
+        """
+        if ImageCache.master is not app.tk:
+            ImageCache.images = {}
+            ImageCache.master = app.tk
+        image = ImageCache.images.get(path)
+        if image is None:
+            if path not in ImageCache.files:
+                with open(path, "rb") as file:
+                    ImageCache.files[path] = base64.b64encode(file.read())
+            image = PhotoImage(master=app.tk, data=ImageCache.files[path])
+            ImageCache.images[path] = image
+        return image
+
+    @staticmethod
+    def preload(app: App, paths: List[str]) -> None:
+        """Decodes images ahead of time so that the first render which
+        shows them does not have to.
+
+        Args:
+            app: The App which the images will be shown in.
+            paths: The paths of the image files.
+        """
+        for path in paths:
+            ImageCache.get(app, path)
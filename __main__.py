@@ -1,17 +1,87 @@
+import asyncio
 import subprocess
 import sys
 
+import Benchmark
 from Driver import Driver
+from Metrics import Metrics
+from Server import serve
+from Tracer import Tracer
+
+
+def get_argument(flag: str, default: str) -> str:
+    """Gets the value given after a command line flag. The next argument is
+    only taken if it is not itself a flag.
+
+    Args:
+        flag: The flag.
+        default: The value to use if none is given.
+
+    Returns:
+        The value.
+    """
+    position = sys.argv.index(flag) + 1
+    if position < len(sys.argv) and not sys.argv[position].startswith("-"):
+        return sys.argv[position]
+    return default
+
 
 if __name__ == "__main__":
-    if "-t" in sys.argv:
-        subprocess.call(
-            ["coverage", "run", "-m", "unittest", "LogicTests.py"])
-        subprocess.call(["coverage", "report"])
-        if "-g" in sys.argv:
-            subprocess(["coverage", "run", "-m", "unittest", "GUITests.py"])
-        subprocess.call(["coverage", "report"])
-    elif "-l" in sys.argv:
-        subprocess.call(["pylama", "."])
-    else:
-        Driver()
+    # Collect metrics about the GUI, written to a file in the Prometheus
+    # text format every 10 seconds, optionally taking the path of the file
+    metrics = None
+    if "-i" in sys.argv:
+        path = get_argument("-i", "metrics.prom")
+        metrics = Metrics()
+        metrics.start(path)
+    # Record a timeline of the GUI as Chrome trace events, optionally taking
+    # the path of the file
+    tracer = None
+    if "-e" in sys.argv:
+        tracer = Tracer(get_argument("-e", "trace.json"))
+    # Close the trace and write the metrics however the program stops, so
+    # the trace is always valid JSON
+    try:
+        if "-t" in sys.argv:
+            subprocess.call(
+                ["coverage", "run", "-m", "unittest", "LogicTests.py"])
+            subprocess.call(["coverage", "report"])
+            if "-g" in sys.argv:
+                subprocess(
+                    ["coverage", "run", "-m", "unittest", "GUITests.py"])
+            subprocess.call(["coverage", "report"])
+        elif "-l" in sys.argv:
+            subprocess.call(["pylama", "."])
+        elif "-b" in sys.argv:
+            # Run the benchmarks, saving them as the new baseline if asked
+            sys.exit(Benchmark.main(save_baseline="baseline" in sys.argv))
+        elif "-s" in sys.argv:
+            # Host games over the network, optionally on a given port
+            port = get_argument("-s", "8765")
+            if not port.isdigit() or not 0 < int(port) < 65536:
+                sys.exit(f"Invalid port: {port}")
+            asyncio.run(serve("0.0.0.0", int(port)))
+        elif "-m" in sys.argv:
+            # Search for each of the computer's attacks, optionally taking the
+            # time budget in milliseconds
+            budget = get_argument("-m", "50")
+            try:
+                budget = float(budget)
+            except ValueError:
+                sys.exit(f"Invalid time budget: {budget}")
+            if not 0 < budget < float("inf"):
+                sys.exit(f"Invalid time budget: {budget}")
+            Driver(computer_opponent=True,
+                   search_budget=budget / 1000,
+                   metrics=metrics,
+                   tracer=tracer)
+        elif "-c" in sys.argv:
+            Driver(computer_opponent=True, metrics=metrics, tracer=tracer)
+        else:
+            Driver(metrics=metrics, tracer=tracer)
+    finally:
+        if metrics is not None:
+            metrics.stop()
+            metrics.flush(path)
+        if tracer is not None:
+            tracer.close()